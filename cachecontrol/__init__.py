@@ -10,8 +10,9 @@ Make it easy to import from cachecontrol without long namespaces.
 import importlib.metadata
 
 from cachecontrol.adapter import CacheControlAdapter
+from cachecontrol.async_controller import AsyncCacheController
 from cachecontrol.controller import CacheController
-from cachecontrol.wrapper import CacheControl
+from cachecontrol.wrapper import CacheControl, PrefetchResult, prefetch
 
 __author__ = "Eric Larson"
 __email__ = "eric@ionrock.org"
@@ -24,6 +25,9 @@ __all__ = [
     "CacheControlAdapter",
     "CacheController",
     "CacheControl",
+    "AsyncCacheController",
+    "PrefetchResult",
+    "prefetch",
 ]
 
 import logging
@@ -0,0 +1,375 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Inspect, clean up, export, import and migrate an existing FileCache or
+Redis cache.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import sys
+from argparse import ArgumentParser, ArgumentTypeError
+from collections import Counter
+from typing import IO, TYPE_CHECKING, Callable
+
+from cachecontrol.controller import CacheController
+from cachecontrol.maintenance import (
+    STATES,
+    CacheReport,
+    FileCacheScanner,
+    RedisCacheScanner,
+    delete_where,
+    scan,
+    url_matches,
+)
+from cachecontrol.migrate import migrate_file_cache
+from cachecontrol.serialize import Serializer
+from cachecontrol.snapshot import export_snapshot, import_snapshot
+from cachecontrol.writer import BackgroundWriter
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+
+    from cachecontrol.cache import BaseCache
+    from cachecontrol.maintenance import CacheScanner, EntryInfo
+    from cachecontrol.migrate import MigrationProgress
+
+
+def states_arg(value: str) -> set[str]:
+    states = set(value.split(","))
+    unknown = states - set(STATES)
+    if unknown:
+        raise ArgumentTypeError(f"unknown states: {', '.join(sorted(unknown))}")
+    return states
+
+
+def get_args(argv: list[str] | None = None) -> Namespace:
+    parser = ArgumentParser(description=__doc__)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--dir", help="the directory of a FileCache or SeparateBodyFileCache"
+    )
+    source.add_argument("--redis", metavar="URL", help="a Redis server")
+    parser.add_argument(
+        "--prefix", default="", help="the RedisCache key prefix, if any"
+    )
+    parser.add_argument(
+        "--hash-keys",
+        action="store_true",
+        help="the Redis cache hashes its keys (hash_keys=True)",
+    )
+    parser.add_argument(
+        "--separate-body",
+        action="store_true",
+        help="import into a SeparateBodyFileCache or SeparateBodyRedisCache",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stats = commands.add_parser(
+        "stats", help="count the entries, their size, age and state"
+    )
+    stats.add_argument(
+        "--top", type=int, default=10, help="how many of the largest hosts to show"
+    )
+    stats.add_argument("--json", action="store_true", help="print the stats as JSON")
+
+    prune = commands.add_parser(
+        "prune", help="delete the entries that can't be used anymore"
+    )
+    prune.add_argument(
+        "--stale",
+        action="store_true",
+        help="also delete stale entries that could be revalidated",
+    )
+    prune.add_argument("--dry-run", action="store_true")
+
+    dump = commands.add_parser(
+        "dump", help="print the entries whose URL matches, as JSON lines"
+    )
+    dump.add_argument("pattern", help="a glob pattern, e.g. 'https://example.com/*'")
+
+    delete = commands.add_parser("delete", help="delete the entries whose URL matches")
+    delete.add_argument("pattern", help="a glob pattern, e.g. 'https://example.com/*'")
+    delete.add_argument("--dry-run", action="store_true")
+
+    for name, description in [
+        ("export", "write the entries to a snapshot file"),
+        ("import", "store the entries of a snapshot file"),
+    ]:
+        command = commands.add_parser(name, help=description)
+        command.add_argument("file", help="the snapshot file, or - for stdin/stdout")
+        command.add_argument(
+            "--states",
+            type=states_arg,
+            default={"fresh", "stale"},
+            help="the states of the entries to include (default: fresh,stale)",
+        )
+        command.add_argument(
+            "--pattern", help="only include the entries whose URL matches this"
+        )
+
+    migrate = commands.add_parser(
+        "migrate", help="copy the entries of a file cache (--dir) into another cache"
+    )
+    target = migrate.add_mutually_exclusive_group(required=True)
+    target.add_argument("--to-dir", help="the directory of the target FileCache")
+    target.add_argument("--to-redis", metavar="URL", help="the target Redis server")
+    migrate.add_argument("--to-prefix", default="", help="the target key prefix")
+    migrate.add_argument(
+        "--to-separate-body",
+        action="store_true",
+        help="migrate into a SeparateBodyFileCache or SeparateBodyRedisCache",
+    )
+    migrate.add_argument(
+        "--to-hash-keys",
+        action="store_true",
+        help="hash the keys of the target Redis cache (hash_keys=True)",
+    )
+    migrate.add_argument(
+        "--states",
+        type=states_arg,
+        default={"fresh", "stale"},
+        help="the states of the entries to migrate (default: fresh,stale)",
+    )
+    migrate.add_argument(
+        "--workers", type=int, help="worker processes (default: one per CPU)"
+    )
+    return parser.parse_args(argv)
+
+
+def get_scanner(args: Namespace) -> CacheScanner:
+    if args.redis:
+        import redis
+
+        return RedisCacheScanner(
+            redis.Redis.from_url(args.redis), args.prefix, hash_keys=args.hash_keys
+        )
+    return FileCacheScanner(args.dir)
+
+
+def make_cache(
+    directory: str | None,
+    redis_url: str | None,
+    prefix: str,
+    separate_body: bool,
+    hash_keys: bool = False,
+) -> BaseCache:
+    if redis_url:
+        import redis
+
+        from cachecontrol.caches import RedisCache, SeparateBodyRedisCache
+
+        redis_class = SeparateBodyRedisCache if separate_body else RedisCache
+        return redis_class(redis.Redis.from_url(redis_url), prefix, hash_keys=hash_keys)
+
+    from cachecontrol.caches import FileCache, SeparateBodyFileCache
+
+    assert directory is not None
+    file_class = SeparateBodyFileCache if separate_body else FileCache
+    return file_class(directory)
+
+
+def get_cache(args: Namespace) -> BaseCache:
+    return make_cache(
+        args.dir, args.redis, args.prefix, args.separate_body, args.hash_keys
+    )
+
+
+def counting(
+    predicate: Callable[[EntryInfo], bool], counts: Counter[str]
+) -> Callable[[EntryInfo], bool]:
+    """``predicate``, counting the entries it sees and those without a URL."""
+
+    def check(info: EntryInfo) -> bool:
+        if info.kind == "entry":
+            counts["entries"] += 1
+            counts["without_url"] += info.url is None
+        return predicate(info)
+
+    return check
+
+
+def warn_without_url(entries: int, without_url: int) -> None:
+    if entries and without_url == entries:
+        print(
+            f"Warning: none of the {entries} entries record their URL, so "
+            "none could be matched or grouped by host. Entries record it when "
+            "stored with Serializer(record_url=True); a Redis cache without "
+            "hash_keys has it in the keys.",
+            file=sys.stderr,
+        )
+
+
+def print_progress(progress: MigrationProgress) -> None:
+    print(
+        f"[{progress.partitions_done:3}/{progress.partitions}] "
+        f"{progress.entries} entries, {progress.skipped} skipped, "
+        f"{progress.size / 1e6:.1f} MB read, "
+        f"{progress.entries_per_second:.0f} entries/s, "
+        f"{progress.bytes_per_second / 1e6:.1f} MB/s",
+        file=sys.stderr,
+    )
+
+
+def snapshot_filter(args: Namespace) -> Callable[[EntryInfo], bool]:
+    matches = url_matches(args.pattern) if args.pattern else None
+    return lambda info: info.state in args.states and (matches is None or matches(info))
+
+
+def open_snapshot(name: str, mode: str) -> IO[bytes]:
+    if name == "-":
+        stream = sys.stdin if mode == "rb" else sys.stdout
+        # Don't close the standard streams when done.
+        return open(stream.fileno(), mode, closefd=False)
+    return open(name, mode)
+
+
+def entry_json(info: EntryInfo) -> str:
+    return json.dumps(
+        {
+            "url": info.url,
+            "handle": info.handle,
+            "status": info.status,
+            "size": info.size,
+            "state": info.state,
+            "age": info.age,
+            "ttl": info.ttl,
+            "headers": dict(info.headers or {}),
+        }
+    )
+
+
+def print_stats(report: CacheReport, top: int) -> None:
+    stats = report.as_dict(top)
+    print(f"Records: {sum(stats['records'].values())} ({report.size} bytes)")
+    for kind, count in sorted(stats["records"].items()):
+        print(f"  {kind}: {count}")
+    print("Entries by state:")
+    for state, count in stats["states"].items():
+        print(f"  {state}: {count}")
+    print(f"Entries without a URL: {stats['without_url']}")
+    print("Largest hosts:")
+    for host, totals in stats["hosts"].items():
+        print(f"  {host}: {totals['entries']} entries, {totals['size']} bytes")
+    for name, title in [("ages", "Age"), ("ttls", "Time to live (fresh entries)")]:
+        print(f"{title}, in seconds:")
+        for bound, count in stats[name].items():
+            print(f"  <= {bound}: {count}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = get_args(argv)
+
+    if args.command == "migrate":
+        if args.redis:
+            sys.exit("migrate copies a file cache; give its --dir")
+        totals = migrate_file_cache(
+            args.dir,
+            functools.partial(
+                make_cache,
+                args.to_dir,
+                args.to_redis,
+                args.to_prefix,
+                args.to_separate_body,
+                args.to_hash_keys,
+            ),
+            states=args.states,
+            workers=args.workers,
+            progress=print_progress,
+        )
+        print(
+            f"Migrated {totals.entries} entries in {totals.elapsed:.1f}s",
+            file=sys.stderr,
+        )
+        if totals.without_url:
+            sys.exit(
+                f"{totals.without_url} entries were not migrated: they don't "
+                "record their URL, and the target doesn't store entries by "
+                "the hash of their key (use --to-dir, or --to-redis with "
+                "--to-hash-keys)"
+            )
+        return
+
+    if args.command == "import":
+        writer = BackgroundWriter(block=True)
+        controller = CacheController(
+            get_cache(args), serializer=Serializer(record_url=True), writer=writer
+        )
+        try:
+            with open_snapshot(args.file, "rb") as fp:
+                result = import_snapshot(fp, controller, snapshot_filter(args))
+        finally:
+            writer.close()
+        print(
+            f"Imported {result.entries} entries ({result.size} bytes), "
+            f"skipped {result.skipped}",
+            file=sys.stderr,
+        )
+        return
+
+    scanner = get_scanner(args)
+
+    if args.command == "stats":
+        report = CacheReport()
+        for info in scan(scanner):
+            report.add(info)
+        if args.json:
+            print(json.dumps(report.as_dict(args.top), indent=2))
+        else:
+            print_stats(report, args.top)
+        warn_without_url(report.kinds["entry"], report.without_url)
+        return
+
+    counts: Counter[str] = Counter()
+    if args.command == "dump":
+        matches = counting(url_matches(args.pattern), counts)
+        for info in scan(scanner):
+            if matches(info):
+                print(entry_json(info))
+        warn_without_url(counts["entries"], counts["without_url"])
+        return
+
+    if args.command == "export":
+        with open_snapshot(args.file, "wb") as fp:
+            result = export_snapshot(scanner, fp, snapshot_filter(args))
+        print(
+            f"Exported {result.entries} entries ({result.size} bytes), "
+            f"skipped {result.skipped}",
+            file=sys.stderr,
+        )
+        if result.without_url:
+            print(
+                f"Warning: {result.without_url} entries were not exported: "
+                "they don't record their URL, and their keys don't hold it "
+                "(store them with Serializer(record_url=True))",
+                file=sys.stderr,
+            )
+        if not result.entries:
+            sys.exit("No entries were exported")
+        return
+
+    if args.command == "prune":
+        states = {"dead", "stale"} if args.stale else {"dead"}
+        deleted = delete_where(
+            scanner, lambda info: info.state in states, dry_run=args.dry_run
+        )
+    else:
+        deleted = delete_where(
+            scanner, counting(url_matches(args.pattern), counts), args.dry_run
+        )
+
+    count = size = 0
+    for info in deleted:
+        count += 1
+        size += info.size
+    verb = "Would delete" if args.dry_run else "Deleted"
+    print(f"{verb} {count} entries ({size} bytes)", file=sys.stderr)
+    warn_without_url(counts["entries"], counts["without_url"])
+
+
+if __name__ == "__main__":
+    main()
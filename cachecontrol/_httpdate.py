@@ -0,0 +1,100 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Parse HTTP-dates (the Date, Expires and Last-Modified headers).
+
+RFC 9110 allows three fixed formats, which are handled without a general
+purpose parser. Anything else falls back to ``email.utils.parsedate_tz``,
+which is what was used for every date before.
+"""
+
+from __future__ import annotations
+
+import calendar
+import functools
+import re
+from email.utils import parsedate_tz
+
+# How many distinct date strings to remember; origins send the same Date
+# to every request within a second.
+DATE_CACHE_SIZE = 256
+
+_MONTH_NAMES = "Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec"
+_MONTHS = {month: number for number, month in enumerate(_MONTH_NAMES.split("|"), 1)}
+# Days in the year before the first of each month, in a common year.
+_DAYS_BEFORE_MONTH = (0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+_DAY_NAME = "(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)"
+_CLOCK = r"(\d\d):(\d\d):(\d\d)"
+
+# Sun, 06 Nov 1994 08:49:37 GMT
+_IMF_FIXDATE = re.compile(
+    rf"{_DAY_NAME}, (\d\d) ({_MONTH_NAMES}) (\d{{4}}) {_CLOCK} GMT\Z"
+)
+# Sunday, 06-Nov-94 08:49:37 GMT
+_RFC850_DATE = re.compile(
+    rf"{_DAY_NAME}[a-z]*, (\d\d)-({_MONTH_NAMES})-(\d\d) {_CLOCK} GMT\Z"
+)
+# Sun Nov  6 08:49:37 1994
+_ASCTIME_DATE = re.compile(
+    rf"{_DAY_NAME} ({_MONTH_NAMES}) ([ \d]\d) {_CLOCK} (\d{{4}})\Z"
+)
+
+
+def _timestamp(
+    year: int, month: int, day: str, hour: str, minute: str, second: str
+) -> int:
+    # calendar.timegm, without building a time tuple.
+    leap_day = month > 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    prior = year - 1
+    days = (
+        prior * 365
+        + prior // 4
+        - prior // 100
+        + prior // 400
+        - 719162  # days from 0001-01-01 to 1970-01-01
+        + _DAYS_BEFORE_MONTH[month]
+        + leap_day
+        + int(day)
+        - 1
+    )
+    return days * 86400 + int(hour) * 3600 + int(minute) * 60 + int(second)
+
+
+def _parse_fixed(value: str) -> int | None:
+    match = _IMF_FIXDATE.match(value)
+    if match is not None:
+        day, month, year, hour, minute, second = match.groups()
+        return _timestamp(int(year), _MONTHS[month], day, hour, minute, second)
+
+    match = _RFC850_DATE.match(value)
+    if match is not None:
+        day, month, short_year, hour, minute, second = match.groups()
+        # The same two-digit year rule as email.utils.
+        year = int(short_year)
+        year += 1900 if year > 68 else 2000
+        return _timestamp(year, _MONTHS[month], day, hour, minute, second)
+
+    match = _ASCTIME_DATE.match(value)
+    if match is not None:
+        month, day, hour, minute, second, year = match.groups()
+        return _timestamp(int(year), _MONTHS[month], day, hour, minute, second)
+
+    return None
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_http_date(value: str) -> int | None:
+    """
+    Return the Unix timestamp of the HTTP-date ``value``, or None if it
+    can't be parsed.
+    """
+    timestamp = _parse_fixed(value)
+    if timestamp is not None:
+        return timestamp
+
+    time_tuple = parsedate_tz(value)
+    if time_tuple is None:
+        return None
+    return calendar.timegm(time_tuple[:6])
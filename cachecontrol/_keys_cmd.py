@@ -0,0 +1,129 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Report how many existing cache keys a ``CacheKeyBuilder`` would merge.
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+from argparse import ArgumentParser
+from typing import TYPE_CHECKING, Iterator
+
+from cachecontrol.caches.redis_cache import _GLOB_SPECIAL
+from cachecontrol.keys import TRACKING_PARAMS, CacheKeyBuilder, collapse_report
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+
+
+def get_args(argv: list[str] | None = None) -> Namespace:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help="files with one cached URL per line (default: standard input)",
+    )
+    parser.add_argument(
+        "--redis",
+        metavar="URL",
+        help="read the keys of a RedisCache from this Redis server instead",
+    )
+    parser.add_argument(
+        "--prefix", default="", help="the RedisCache key prefix, if any"
+    )
+    parser.add_argument(
+        "--drop",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="drop query parameters matching this glob pattern (repeatable)",
+    )
+    parser.add_argument(
+        "--drop-tracking",
+        action="store_true",
+        help="drop common tracking parameters: " + ", ".join(TRACKING_PARAMS),
+    )
+    parser.add_argument(
+        "--no-sort", action="store_true", help="keep the query parameter order"
+    )
+    parser.add_argument(
+        "--keep-percent-encoding",
+        action="store_true",
+        help="don't normalize percent-encodings",
+    )
+    parser.add_argument(
+        "--keep-default-port", action="store_true", help="keep :80 and :443"
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="how many of the largest merged groups to show",
+    )
+    return parser.parse_args(argv)
+
+
+# The key of one variant of a URL whose responses vary; see
+# CacheController.variant_key.
+_VARIANT_KEY = re.compile(r"#vary=[0-9a-f]{56}$")
+
+
+def read_keys(args: Namespace) -> Iterator[str]:
+    """
+    The cached URLs, once each: the keys of the variants of a URL are
+    skipped, since the URL itself is the key of their vary index.
+    """
+    for key in _read_all_keys(args):
+        if not _VARIANT_KEY.search(key):
+            yield key
+
+
+def _read_all_keys(args: Namespace) -> Iterator[str]:
+    if args.redis:
+        import redis
+
+        conn = redis.Redis.from_url(args.redis)
+        match = _GLOB_SPECIAL.sub(r"\\\1", args.prefix) + "*"
+        for key in conn.scan_iter(match=match):
+            name = key.decode()[len(args.prefix) :]
+            # Skip the body keys of a SeparateBodyRedisCache.
+            if not name.endswith(":body"):
+                yield name
+        return
+
+    for name in args.files or ["-"]:
+        with sys.stdin if name == "-" else open(name) as f:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = get_args(argv)
+    builder = CacheKeyBuilder(
+        sort_query=not args.no_sort,
+        drop_params=args.drop + (list(TRACKING_PARAMS) if args.drop_tracking else []),
+        normalize_percent_encoding=not args.keep_percent_encoding,
+        remove_default_port=not args.keep_default_port,
+    )
+    report = collapse_report(read_keys(args), builder)
+
+    share = report.collapsed / report.keys if report.keys else 0.0
+    print(f"Existing keys: {report.keys}")
+    print(f"New keys:      {report.new_keys}")
+    print(f"Collapsed:     {report.collapsed} ({share:.1%})")
+
+    groups = sorted(report.groups.items(), key=lambda item: -len(item[1]))
+    for new_key, old_keys in groups[: args.top]:
+        print()
+        print(f"{new_key} <- {len(old_keys)} keys")
+        for old_key in old_keys:
+            print(f"  {old_key}")
+
+
+if __name__ == "__main__":
+    main()
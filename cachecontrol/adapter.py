@@ -3,24 +3,43 @@
 # SPDX-License-Identifier: Apache-2.0
 from __future__ import annotations
 
+import contextlib
 import functools
+import time
 import weakref
 import zlib
-from typing import TYPE_CHECKING, Any, Collection, Mapping
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Collection,
+    Iterable,
+    Iterator,
+    Mapping,
+)
 
+from requests import Response
 from requests.adapters import HTTPAdapter
+from requests.utils import get_encoding_from_headers
 
 from cachecontrol.cache import DictCache
 from cachecontrol.controller import PERMANENT_REDIRECT_STATUSES, CacheController
 from cachecontrol.filewrapper import CallbackFileWrapper
+from cachecontrol.tracing import SpanListener
 
 if TYPE_CHECKING:
-    from requests import PreparedRequest, Response
+    from typing import Literal
+
+    from requests import PreparedRequest
     from urllib3 import HTTPResponse
 
     from cachecontrol.cache import BaseCache
     from cachecontrol.heuristics import BaseHeuristic
-    from cachecontrol.serialize import Serializer
+    from cachecontrol.refresh import BackgroundRefresher
+    from cachecontrol.serialize import CachedEntry, Serializer
+    from cachecontrol.stats import CacheListener
+    from cachecontrol.tracing import Span, Tracer
+    from cachecontrol.writer import BackgroundWriter
 
 
 class CacheControlAdapter(HTTPAdapter):
@@ -35,16 +54,36 @@ class CacheControlAdapter(HTTPAdapter):
         heuristic: BaseHeuristic | None = None,
         cacheable_methods: Collection[str] | None = None,
         *args: Any,
+        refresher: BackgroundRefresher | None = None,
+        writer: BackgroundWriter | None = None,
+        key_builder: Callable[[str], str] | None = None,
+        listeners: Iterable[CacheListener] | None = None,
+        tracer: Tracer | None = None,
         **kw: Any,
     ) -> None:
         super().__init__(*args, **kw)
         self.cache = DictCache() if cache is None else cache
         self.heuristic = heuristic
         self.cacheable_methods = cacheable_methods or ("GET",)
+        self.refresher = refresher
+        self.tracer = tracer
+        self.span_listener: SpanListener | None = None
+        if tracer is not None:
+            self.span_listener = SpanListener()
+            listeners = [*(listeners or ()), self.span_listener]
 
         controller_factory = controller_class or CacheController
+        # Only pass the optional arguments that are set, so custom
+        # controllers that don't know about them keep working.
+        controller_kw: dict[str, Any] = {}
+        if writer is not None:
+            controller_kw["writer"] = writer
+        if key_builder is not None:
+            controller_kw["key_builder"] = key_builder
+        if listeners is not None:
+            controller_kw["listeners"] = listeners
         self.controller = controller_factory(
-            self.cache, cache_etags=cache_etags, serializer=serializer
+            self.cache, cache_etags=cache_etags, serializer=serializer, **controller_kw
         )
 
     def send(
@@ -61,14 +100,75 @@ class CacheControlAdapter(HTTPAdapter):
         Send a request. Use the request information to see if it
         exists in the cache and cache the response if we need to and can.
         """
+        if self.tracer is None:
+            return self._send(
+                request, stream, timeout, verify, cert, proxies, cacheable_methods
+            )
+        with self._span("cachecontrol.send", request):
+            return self._send(
+                request, stream, timeout, verify, cert, proxies, cacheable_methods
+            )
+
+    @contextlib.contextmanager
+    def _span(self, name: str, request: PreparedRequest) -> Iterator[Span]:
+        """Start a span for ``request``, recording the cache events on it."""
+        assert self.tracer is not None and self.span_listener is not None
+        attributes = {
+            "http.request.method": request.method or "",
+            "url.full": request.url or "",
+            "cachecontrol.backend": type(self.cache).__name__,
+        }
+        with (
+            self.tracer.start_as_current_span(name, attributes=attributes) as span,
+            self.span_listener.activate(span),
+        ):
+            yield span
+
+    def _send(
+        self,
+        request: PreparedRequest,
+        stream: bool,
+        timeout: None | float | tuple[float, float] | tuple[float, None],
+        verify: bool | str,
+        cert: (None | bytes | str | tuple[bytes | str, bytes | str]),
+        proxies: Mapping[str, str] | None,
+        cacheable_methods: Collection[str] | None,
+    ) -> Response:
         cacheable = cacheable_methods or self.cacheable_methods
         if request.method in cacheable:
+            cached_response: HTTPResponse | CachedEntry | Literal[False] | None
             try:
-                cached_response = self.controller.cached_request(request)
+                if not stream and self._supports_fast_hits():
+                    cached_response = self.controller.cached_entry(request)
+                else:
+                    cached_response = self.controller.cached_request(request)
             except zlib.error:
                 cached_response = None
             if cached_response:
-                return self.build_response(request, cached_response, from_cache=True)
+                if self.refresher is not None:
+                    self.refresher.record_hit(
+                        self,
+                        request,
+                        cached_response,
+                        timeout=timeout,
+                        verify=verify,
+                        cert=cert,
+                        proxies=proxies,
+                    )
+                listener = self.controller.listener
+                start = time.perf_counter() if listener is not None else 0.0
+                if isinstance(cached_response, tuple) and cached_response.is_identity:
+                    resp = self.build_cached_response(request, cached_response)
+                else:
+                    if isinstance(cached_response, tuple):
+                        # Let urllib3 take care of decoding the body.
+                        cached_response = cached_response.to_response()
+                    resp = self.build_response(
+                        request, cached_response, from_cache=True
+                    )
+                if listener is not None:
+                    listener.timing("build_response", time.perf_counter() - start)
+                return resp
 
             # check for etags and add headers if appropriate
             request.headers.update(self.controller.conditional_headers(request))
@@ -77,6 +177,34 @@ class CacheControlAdapter(HTTPAdapter):
 
         return resp
 
+    def _supports_fast_hits(self) -> bool:
+        # Subclasses that customize build_response must see every response.
+        return (
+            type(self).build_response is CacheControlAdapter.build_response
+            and self.controller._supports_entries()
+        )
+
+    def build_cached_response(
+        self, request: PreparedRequest, entry: CachedEntry
+    ) -> Response:
+        """
+        Build a response for a cache hit straight from the cache entry,
+        without going through a urllib3 response.
+        """
+        resp = Response()
+        resp.raw = _LazyRaw(entry)
+        resp.status_code = entry.status
+        resp.headers = entry.headers
+        resp.encoding = get_encoding_from_headers(entry.headers)
+        resp.reason = entry.reason
+        resp.url = request.url  # type: ignore[assignment]
+        resp.request = request
+        resp.connection = self
+        resp._content = entry.body
+        resp._content_consumed = True  # type: ignore[attr-defined]
+        resp.from_cache = True  # type: ignore[attr-defined]
+        return resp
+
     def build_response(  # type: ignore[override]
         self,
         request: PreparedRequest,
@@ -95,7 +223,7 @@ class CacheControlAdapter(HTTPAdapter):
             # Check for any heuristics that might update headers
             # before trying to cache.
             if self.heuristic:
-                response = self.heuristic.apply(response)
+                response = self.heuristic.apply_to(request, response)
 
             # apply any expiration heuristics
             if response.status == 304:
@@ -125,11 +253,14 @@ class CacheControlAdapter(HTTPAdapter):
             else:
                 # Wrap the response file with a wrapper that will cache the
                 #   response when the stream has been consumed.
+                store = (
+                    self.controller.cache_response
+                    if self.tracer is None
+                    else self._traced_cache_response
+                )
                 response._fp = CallbackFileWrapper(  # type: ignore[assignment]
                     response._fp,  # type: ignore[arg-type]
-                    functools.partial(
-                        self.controller.cache_response, request, weakref.ref(response)
-                    ),
+                    functools.partial(store, request, weakref.ref(response)),
                 )
                 if response.chunked:
                     super_update_chunk_length = response.__class__._update_chunk_length
@@ -154,14 +285,55 @@ class CacheControlAdapter(HTTPAdapter):
         # See if we should invalidate the cache.
         if request.method in self.invalidating_methods and resp.ok:
             assert request.url is not None
-            cache_url = self.controller.cache_url(request.url)
-            self.cache.delete(cache_url)
+            cache_url = self.controller.cache_key(request.url)
+            self.controller._cache_delete(cache_url)
 
         # Give the request a from_cache attr to let people use it
         resp.from_cache = from_cache  # type: ignore[attr-defined]
 
         return resp
 
+    def _traced_cache_response(
+        self,
+        request: PreparedRequest,
+        response_ref: weakref.ReferenceType[HTTPResponse],
+        body: bytes | None = None,
+    ) -> None:
+        # The body is only complete after send() returned, so the store
+        # gets a span of its own.
+        with self._span("cachecontrol.store", request) as span:
+            if body is not None:
+                span.set_attribute("cachecontrol.entry_size", len(body))
+            self.controller.cache_response(request, response_ref, body)
+
     def close(self) -> None:
+        if self.refresher is not None:
+            self.refresher.close()
+        if self.controller.writer is not None:
+            self.controller.writer.close()
         self.cache.close()
         super().close()  # type: ignore[no-untyped-call]
+
+
+class _LazyRaw:
+    """
+    Stands in for the urllib3 response behind a response built from a
+    cache entry, only creating it when it is actually used.
+    """
+
+    # Checked by requests when extracting cookies; cached responses have none.
+    _original_response = None
+
+    def __init__(self, entry: CachedEntry) -> None:
+        self._entry = entry
+        self._response: HTTPResponse | None = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._response is None:
+            self._response = self._entry.to_response()
+        return getattr(self._response, name)
+
+    def release_conn(self) -> None:
+        # There is no connection; don't build a response just to say so.
+        if self._response is not None:
+            self._response.release_conn()
@@ -0,0 +1,264 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+The caching algorithms of ``CacheController`` for asyncio code.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Callable, Collection, Iterable
+
+from cachecontrol.cache import AsyncDictCache, AsyncSeparateBodyBaseCache, BaseCache
+from cachecontrol.controller import CacheController, _vary_names
+from cachecontrol.serialize import loads_vary_index
+
+if TYPE_CHECKING:
+    from typing import Literal
+
+    from requests import PreparedRequest
+    from urllib3 import HTTPResponse
+
+    from cachecontrol.cache import AsyncBaseCache
+    from cachecontrol.serialize import Serializer
+    from cachecontrol.stats import CacheListener
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCacheController:
+    """
+    An asyncio interface to see if a request should be cached or not.
+
+    Every decision is delegated to a ``CacheController`` (or an instance of
+    ``controller_class``), the ``policy``; this class only performs the
+    cache reads and writes those decisions call for, on an
+    ``AsyncBaseCache``.
+    """
+
+    def __init__(
+        self,
+        cache: AsyncBaseCache | None = None,
+        cache_etags: bool = True,
+        serializer: Serializer | None = None,
+        status_codes: Collection[int] | None = None,
+        controller_class: type[CacheController] | None = None,
+        key_builder: Callable[[str], str] | None = None,
+        listeners: Iterable[CacheListener] | None = None,
+    ):
+        self.cache = AsyncDictCache() if cache is None else cache
+        controller_factory = controller_class or CacheController
+        controller_kw: dict[str, Any] = {}
+        if key_builder is not None:
+            controller_kw["key_builder"] = key_builder
+        if listeners is not None:
+            controller_kw["listeners"] = listeners
+        # The policy never touches its own cache; BaseCache makes sure any
+        # attempt to do so fails loudly.
+        self.policy = controller_factory(
+            BaseCache(),
+            cache_etags=cache_etags,
+            serializer=serializer,
+            status_codes=status_codes,
+            **controller_kw,
+        )
+
+    @property
+    def serializer(self) -> Serializer:
+        return self.policy.serializer
+
+    def cache_url(self, uri: str) -> str:
+        return self.policy.cache_url(uri)
+
+    def cache_key(self, uri: str) -> str:
+        return self.policy.cache_key(uri)
+
+    def entry_key(self, request: PreparedRequest) -> str:
+        return self.policy.entry_key(request)
+
+    async def _load_from_cache(self, request: PreparedRequest) -> HTTPResponse | None:
+        """
+        Load a cached response, or return None if it's not available.
+        """
+        # Partial content is never served from the cache.
+        if "Range" in request.headers:
+            return None
+
+        assert request.url is not None
+        cache_url = self.cache_key(request.url)
+        key, cache_data = cache_url, None
+        listener = self.policy.listener
+        start = time.perf_counter() if listener is not None else 0.0
+
+        # See CacheController._read_cache.
+        vary = self.policy._known_vary(cache_url)
+        if vary is not None:
+            key = self.policy.variant_key(cache_url, vary, request.headers)
+            cache_data = await self.cache.get(key)
+
+        if cache_data is None:
+            key, cache_data = cache_url, await self.cache.get(cache_url)
+            index = loads_vary_index(cache_data)
+            self.policy._remember_vary(cache_url, index and index[0])
+            if index is not None and index[0] != vary:
+                key = self.policy.variant_key(cache_url, index[0], request.headers)
+                cache_data = await self.cache.get(key)
+            elif index is not None:
+                cache_data = None
+
+        body_file = None
+        if cache_data is not None and isinstance(
+            self.cache, AsyncSeparateBodyBaseCache
+        ):
+            body_file = await self.cache.get_body(key)
+
+        if listener is not None:
+            listener.timing("backend_get", time.perf_counter() - start)
+        if cache_data is None:
+            logger.debug("No cache entry available")
+            return None
+
+        return self.policy._deserialize(request, cache_data, body_file)
+
+    async def cached_request(
+        self, request: PreparedRequest
+    ) -> HTTPResponse | Literal[False]:
+        """
+        Return a cached response if it exists in the cache, otherwise
+        return False.
+        """
+        with self.policy._timer("lookup"):
+            assert request.url is not None
+            cache_url = self.cache_key(request.url)
+            logger.debug('Looking up "%s" in the cache', cache_url)
+            cc = self.policy.parse_cache_control(request.headers)
+            listener = self.policy.listener
+            if not self.policy._request_allows_cache(cc):
+                if listener is not None:
+                    listener.bypass(request)
+                return False
+
+            resp = await self._load_from_cache(request)
+            if not resp:
+                if listener is not None:
+                    listener.miss(request)
+                return False
+
+            fresh, purge = self.policy._check_freshness(cc, resp)
+            if purge:
+                await self.cache_delete(self.entry_key(request))
+            if listener is not None:
+                self.policy._notify_lookup(request, resp, fresh)
+            return resp if fresh else False
+
+    async def conditional_headers(self, request: PreparedRequest) -> dict[str, str]:
+        return self.policy._conditional_headers(await self._load_from_cache(request))
+
+    async def _cache_set(
+        self,
+        cache_url: str,
+        request: PreparedRequest,
+        response: HTTPResponse,
+        body: bytes | None = None,
+        expires_time: int | None = None,
+    ) -> None:
+        """
+        Store the data in the cache, with an index of the variants for
+        responses that vary on request headers.
+        """
+        vary = _vary_names(response.headers)
+        self.policy._remember_vary(cache_url, vary or None)
+        if vary:
+            variant = self.policy.variant_key(cache_url, vary, request.headers)
+            index, dropped = self.policy._update_vary_index(
+                await self.cache.get(cache_url), vary, variant
+            )
+            for key in dropped:
+                await self.cache.delete(key)
+            await self.cache.set(cache_url, index, expires=expires_time)
+            cache_url = variant
+        else:
+            # Replacing a vary index: its variants can't be reached anymore.
+            old_index = loads_vary_index(await self.cache.get(cache_url))
+            if old_index is not None:
+                for key in old_index[1]:
+                    await self.cache.delete(key)
+
+        separate_body = isinstance(self.cache, AsyncSeparateBodyBaseCache)
+        with self.policy._timer("serialize"):
+            # A separate body goes in on its own; the metadata only gets a
+            # placeholder empty string.
+            data = self.serializer.dumps(
+                request, response, b"" if separate_body else body
+            )
+        with self.policy._timer("backend_set"):
+            await self.cache.set(cache_url, data, expires=expires_time)
+            if isinstance(self.cache, AsyncSeparateBodyBaseCache) and body is not None:
+                await self.cache.set_body(cache_url, body)
+
+    async def cache_response(
+        self,
+        request: PreparedRequest,
+        response: HTTPResponse,
+        body: bytes | None = None,
+        status_codes: Collection[int] | None = None,
+    ) -> None:
+        """
+        Store ``response`` (whose content is ``body``) if it is cacheable.
+        """
+        with self.policy._timer("store"):
+            plan = self.policy._plan_cache_response(
+                request, response, body, status_codes
+            )
+            if plan is None:
+                return
+
+            if not plan.store:
+                if await self.cache.get(plan.cache_url):
+                    logger.debug('Purging existing cache entry to honor "no-store"')
+                    await self.cache_delete(plan.cache_url)
+                return
+
+            if self.policy.listener is not None:
+                self.policy.listener.stored(request, plan.cache_url)
+            await self._cache_set(
+                plan.cache_url, request, response, plan.body, plan.expires_time
+            )
+
+    async def update_cached_response(
+        self, request: PreparedRequest, response: HTTPResponse
+    ) -> HTTPResponse:
+        """On a 304, refresh the cached response's headers and return it, or
+        return ``response`` itself if nothing was cached.
+        """
+        with self.policy._timer("revalidate"):
+            assert request.url is not None
+            cache_url = self.cache_key(request.url)
+            cached_response = await self._load_from_cache(request)
+
+            if not cached_response:
+                return response
+
+            self.policy._merge_not_modified(cached_response, response)
+            if self.policy.listener is not None:
+                self.policy.listener.revalidated(request)
+            await self._cache_set(cache_url, request, cached_response)
+
+            return cached_response
+
+    async def cache_delete(self, key: str) -> None:
+        """Delete the entry under ``key``, and all variants it indexes."""
+        self.policy._remember_vary(key, None)
+        index = loads_vary_index(await self.cache.get(key))
+        if index is not None:
+            for variant in index[1]:
+                await self.cache.delete(variant)
+        await self.cache.delete(key)
+        if self.policy.listener is not None:
+            self.policy.listener.purged(key)
+
+    async def close(self) -> None:
+        await self.cache.close()
@@ -73,3 +73,60 @@ class SeparateBodyBaseCache(BaseCache):
         Return the body as file-like object.
         """
         raise NotImplementedError()
+
+
+class AsyncBaseCache:
+    """
+    The asyncio counterpart of ``BaseCache``, for use with an
+    ``AsyncCacheController``.
+    """
+
+    async def get(self, key: str) -> bytes | None:
+        raise NotImplementedError()
+
+    async def set(
+        self, key: str, value: bytes, expires: int | datetime | None = None
+    ) -> None:
+        raise NotImplementedError()
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError()
+
+    async def close(self) -> None:
+        pass
+
+
+class AsyncDictCache(AsyncBaseCache):
+    def __init__(self, init_dict: MutableMapping[str, bytes] | None = None) -> None:
+        self.lock = Lock()
+        self.data = init_dict or {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self.data.get(key, None)
+
+    async def set(
+        self, key: str, value: bytes, expires: int | datetime | None = None
+    ) -> None:
+        with self.lock:
+            self.data.update({key: value})
+
+    async def delete(self, key: str) -> None:
+        with self.lock:
+            if key in self.data:
+                self.data.pop(key)
+
+
+class AsyncSeparateBodyBaseCache(AsyncBaseCache):
+    """
+    The asyncio counterpart of ``SeparateBodyBaseCache``: the body is stored
+    with ``set_body()`` and loaded with ``get_body()``.
+    """
+
+    async def set_body(self, key: str, body: bytes) -> None:
+        raise NotImplementedError()
+
+    async def get_body(self, key: str) -> IO[bytes] | None:
+        """
+        Return the body as file-like object.
+        """
+        raise NotImplementedError()
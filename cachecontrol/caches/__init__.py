@@ -2,7 +2,36 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
-from cachecontrol.caches.file_cache import FileCache, SeparateBodyFileCache
-from cachecontrol.caches.redis_cache import RedisCache
+from cachecontrol.caches.file_cache import (
+    AsyncFileCache,
+    AsyncSeparateBodyFileCache,
+    FileCache,
+    SeparateBodyFileCache,
+)
+from cachecontrol.caches.redis_cache import (
+    AsyncRedisCache,
+    RedisCache,
+    RedisInvalidationChannel,
+    SeparateBodyRedisCache,
+)
+from cachecontrol.caches.shm_cache import SharedMemoryCache
+from cachecontrol.caches.tiered_cache import (
+    InvalidationChannel,
+    LocalInvalidationChannel,
+    TieredCache,
+)
 
-__all__ = ["FileCache", "SeparateBodyFileCache", "RedisCache"]
+__all__ = [
+    "FileCache",
+    "SeparateBodyFileCache",
+    "RedisCache",
+    "SeparateBodyRedisCache",
+    "SharedMemoryCache",
+    "TieredCache",
+    "InvalidationChannel",
+    "LocalInvalidationChannel",
+    "RedisInvalidationChannel",
+    "AsyncFileCache",
+    "AsyncSeparateBodyFileCache",
+    "AsyncRedisCache",
+]
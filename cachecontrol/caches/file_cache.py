@@ -3,6 +3,7 @@
 # SPDX-License-Identifier: Apache-2.0
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import os
 import tempfile
@@ -10,7 +11,12 @@ from textwrap import dedent
 from typing import IO, TYPE_CHECKING
 from pathlib import Path
 
-from cachecontrol.cache import BaseCache, SeparateBodyBaseCache
+from cachecontrol.cache import (
+    AsyncBaseCache,
+    AsyncSeparateBodyBaseCache,
+    BaseCache,
+    SeparateBodyBaseCache,
+)
 from cachecontrol.controller import CacheController
 
 if TYPE_CHECKING:
@@ -136,6 +142,66 @@ class SeparateBodyFileCache(_FileCacheMixin, SeparateBodyBaseCache):
         self._delete(key, ".body")
 
 
+class _AsyncFileCacheMixin:
+    """
+    Shared implementation for both asyncio FileCache variants.
+
+    The standard library has no asynchronous file I/O, so each operation
+    runs the matching synchronous FileCache method in a worker thread.
+    """
+
+    _cache: FileCache | SeparateBodyFileCache
+
+    async def get(self, key: str) -> bytes | None:
+        return await asyncio.to_thread(self._cache.get, key)
+
+    async def set(
+        self, key: str, value: bytes, expires: int | datetime | None = None
+    ) -> None:
+        await asyncio.to_thread(self._cache.set, key, value, expires)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._cache.delete, key)
+
+
+class AsyncFileCache(_AsyncFileCacheMixin, AsyncBaseCache):
+    """The asyncio counterpart of ``FileCache``."""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        forever: bool = False,
+        filemode: int = 0o0600,
+        dirmode: int = 0o0700,
+        lock_class: type[BaseFileLock] | None = None,
+    ) -> None:
+        self._cache = FileCache(directory, forever, filemode, dirmode, lock_class)
+
+
+class AsyncSeparateBodyFileCache(_AsyncFileCacheMixin, AsyncSeparateBodyBaseCache):
+    """The asyncio counterpart of ``SeparateBodyFileCache``."""
+
+    _cache: SeparateBodyFileCache
+
+    def __init__(
+        self,
+        directory: str | Path,
+        forever: bool = False,
+        filemode: int = 0o0600,
+        dirmode: int = 0o0700,
+        lock_class: type[BaseFileLock] | None = None,
+    ) -> None:
+        self._cache = SeparateBodyFileCache(
+            directory, forever, filemode, dirmode, lock_class
+        )
+
+    async def get_body(self, key: str) -> IO[bytes] | None:
+        return await asyncio.to_thread(self._cache.get_body, key)
+
+    async def set_body(self, key: str, body: bytes) -> None:
+        await asyncio.to_thread(self._cache.set_body, key, body)
+
+
 def url_to_file_path(url: str, filecache: FileCache) -> str:
     """Return the file cache path based on the URL.
 
@@ -4,45 +4,307 @@
 from __future__ import annotations
 
 
+import hashlib
+import io
+import re
 from datetime import datetime, timezone
-from typing import TYPE_CHECKING
+from typing import IO, TYPE_CHECKING, Callable
 
-from cachecontrol.cache import BaseCache
+from cachecontrol.cache import AsyncBaseCache, BaseCache, SeparateBodyBaseCache
+from cachecontrol.caches.tiered_cache import InvalidationChannel
 
 if TYPE_CHECKING:
     from redis import Redis
+    from redis.asyncio import Redis as AsyncRedis
+    from redis.client import PubSub, PubSubWorkerThread
 
 
-class RedisCache(BaseCache):
-    def __init__(self, conn: Redis[bytes]) -> None:
-        self.conn = conn
+# Characters with a special meaning in a Redis glob-style MATCH pattern.
+_GLOB_SPECIAL = re.compile(r"([*?\[\]\\])")
 
-    def get(self, key: str) -> bytes | None:
-        return self.conn.get(key)
 
-    def set(
-        self, key: str, value: bytes, expires: int | datetime | None = None
+class _RedisCacheMixin:
+    """Key and expiry handling shared by the Redis caches."""
+
+    def __init__(
+        self,
+        prefix: str = "",
+        clear_batch_size: int = 1000,
+        hash_keys: bool = False,
     ) -> None:
+        self.prefix = prefix
+        self.clear_batch_size = clear_batch_size
+        self.hash_keys = hash_keys
+
+    def _key(self, key: str) -> str:
+        if self.hash_keys:
+            key = hashlib.sha224(key.encode()).hexdigest()
+        return self.prefix + key
+
+    def _clear_match(self) -> str:
+        return _GLOB_SPECIAL.sub(r"\\\1", self.prefix) + "*"
+
+    @staticmethod
+    def _ttl(expires: int | datetime | None) -> int | None:
+        """Convert an ``expires`` argument into a TTL in seconds."""
         if not expires:
-            self.conn.set(key, value)
-        elif isinstance(expires, datetime):
+            return None
+        if isinstance(expires, datetime):
             now_utc = datetime.now(timezone.utc)
             if expires.tzinfo is None:
                 now_utc = now_utc.replace(tzinfo=None)
             delta = expires - now_utc
-            self.conn.setex(key, int(delta.total_seconds()), value)
+            return int(delta.total_seconds())
+        return expires
+
+
+class RedisCache(_RedisCacheMixin, BaseCache):
+    def __init__(
+        self,
+        conn: Redis[bytes],
+        prefix: str = "",
+        clear_batch_size: int = 1000,
+        hash_keys: bool = False,
+    ) -> None:
+        super().__init__(prefix, clear_batch_size, hash_keys)
+        self.conn = conn
+
+    def get(self, key: str) -> bytes | None:
+        return self.conn.get(self._key(key))
+
+    def set(
+        self, key: str, value: bytes, expires: int | datetime | None = None
+    ) -> None:
+        key = self._key(key)
+        ttl = self._ttl(expires)
+        if ttl is None:
+            self.conn.set(key, value)
         else:
-            self.conn.setex(key, expires, value)
+            self.conn.setex(key, ttl, value)
 
     def delete(self, key: str) -> None:
-        self.conn.delete(key)
+        self.conn.delete(self._key(key))
 
     def clear(self) -> None:
-        """Helper for clearing all the keys in a database. Use with
-        caution!"""
-        for key in self.conn.keys():
-            self.conn.delete(key)
+        """Delete every key under this cache's prefix.
+
+        Keys are found with an incremental ``SCAN`` and removed with batched
+        ``UNLINK`` calls, so the server is never blocked for the whole
+        keyspace. Without a prefix this clears the entire database, so use
+        with caution!
+        """
+        batch: list[bytes] = []
+        for key in self.conn.scan_iter(
+            match=self._clear_match(), count=self.clear_batch_size
+        ):
+            batch.append(key)
+            if len(batch) >= self.clear_batch_size:
+                self._unlink(batch)
+                batch = []
+        if batch:
+            self._unlink(batch)
+
+    def _unlink(self, keys: list[bytes]) -> None:
+        # One UNLINK per key keeps each command in a single hash slot (so this
+        # also works against Redis Cluster) while the pipeline still sends the
+        # whole batch in a single round trip.
+        pipe = self.conn.pipeline(transaction=False)
+        for key in keys:
+            pipe.unlink(key)
+        pipe.execute()
 
     def close(self) -> None:
         """Redis uses connection pooling, no need to close the connection."""
         pass
+
+
+class SeparateBodyRedisCache(RedisCache, SeparateBodyBaseCache):
+    """
+    Memory-efficient RedisCache: the body is stored under its own key, so
+    header-only reads and updates (such as refreshing an entry after a 304)
+    don't transfer the body, and large bodies are streamed back in
+    ``body_chunk_size`` pieces with ``GETRANGE`` rather than loaded whole.
+    """
+
+    body_suffix = ":body"
+
+    def __init__(
+        self,
+        conn: Redis[bytes],
+        prefix: str = "",
+        clear_batch_size: int = 1000,
+        hash_keys: bool = False,
+        body_chunk_size: int = 1024 * 1024,
+    ) -> None:
+        super().__init__(conn, prefix, clear_batch_size, hash_keys)
+        self.body_chunk_size = body_chunk_size
+
+    def _body_key(self, key: str) -> str:
+        return self._key(key) + self.body_suffix
+
+    def set(
+        self, key: str, value: bytes, expires: int | datetime | None = None
+    ) -> None:
+        # Keep the body's lifetime in step with the metadata; this matters
+        # when only the metadata is rewritten after a revalidation.
+        ttl = self._ttl(expires)
+        pipe = self.conn.pipeline(transaction=False)
+        if ttl is None:
+            pipe.set(self._key(key), value)
+            pipe.persist(self._body_key(key))
+        else:
+            pipe.setex(self._key(key), ttl, value)
+            pipe.expire(self._body_key(key), ttl)
+        pipe.execute()
+
+    def set_body(self, key: str, body: bytes) -> None:
+        # The metadata is always written first, so it carries the TTL the
+        # body should share.
+        ttl = self.conn.pttl(self._key(key))
+        self.conn.set(self._body_key(key), body, px=ttl if ttl > 0 else None)
+
+    def get_body(self, key: str) -> IO[bytes] | None:
+        name = self._body_key(key)
+        length: int = self.conn.strlen(name)  # type: ignore[no-untyped-call]
+        if length <= self.body_chunk_size:
+            body = self.conn.get(name)
+            return None if body is None else io.BytesIO(body)
+        return io.BufferedReader(
+            _RedisBodyReader(self.conn, name, length, self.body_chunk_size),
+            buffer_size=self.body_chunk_size,
+        )
+
+    def delete(self, key: str) -> None:
+        pipe = self.conn.pipeline(transaction=False)
+        pipe.delete(self._key(key))
+        pipe.delete(self._body_key(key))
+        pipe.execute()
+
+
+class _RedisBodyReader(io.RawIOBase):
+    """Read-only file object over a Redis string, fetched with GETRANGE."""
+
+    def __init__(
+        self, conn: Redis[bytes], name: str, length: int, chunk_size: int
+    ) -> None:
+        self.conn = conn
+        self.key = name
+        self.length = length
+        self.chunk_size = chunk_size
+        self.pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def _getrange(self, size: int) -> bytes:
+        size = min(size, self.length - self.pos)
+        if size <= 0:
+            return b""
+        data: bytes = self.conn.getrange(  # type: ignore[no-untyped-call]
+            self.key, self.pos, self.pos + size - 1
+        )
+        self.pos += len(data)
+        return data
+
+    def readinto(self, buffer: memoryview) -> int:  # type: ignore[override]
+        data = self._getrange(min(len(buffer), self.chunk_size))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def readall(self) -> bytes:
+        chunks = []
+        while data := self._getrange(self.chunk_size):
+            chunks.append(data)
+        return b"".join(chunks)
+
+
+class AsyncRedisCache(_RedisCacheMixin, AsyncBaseCache):
+    """The asyncio counterpart of ``RedisCache``, using ``redis.asyncio``."""
+
+    def __init__(
+        self,
+        conn: AsyncRedis[bytes],
+        prefix: str = "",
+        clear_batch_size: int = 1000,
+        hash_keys: bool = False,
+    ) -> None:
+        super().__init__(prefix, clear_batch_size, hash_keys)
+        self.conn = conn
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.conn.get(self._key(key))
+
+    async def set(
+        self, key: str, value: bytes, expires: int | datetime | None = None
+    ) -> None:
+        key = self._key(key)
+        ttl = self._ttl(expires)
+        if ttl is None:
+            await self.conn.set(key, value)
+        else:
+            await self.conn.setex(key, ttl, value)
+
+    async def delete(self, key: str) -> None:
+        await self.conn.delete(self._key(key))
+
+    async def clear(self) -> None:
+        """Delete every key under this cache's prefix; see ``RedisCache.clear``."""
+        batch: list[bytes] = []
+        async for key in self.conn.scan_iter(
+            match=self._clear_match(), count=self.clear_batch_size
+        ):
+            batch.append(key)
+            if len(batch) >= self.clear_batch_size:
+                await self._unlink(batch)
+                batch = []
+        if batch:
+            await self._unlink(batch)
+
+    async def _unlink(self, keys: list[bytes]) -> None:
+        pipe = self.conn.pipeline(transaction=False)
+        for key in keys:
+            pipe.unlink(key)
+        await pipe.execute()
+
+
+class RedisInvalidationChannel(InvalidationChannel):
+    """
+    Broadcast invalidations with Redis pub/sub.
+
+    Messages are received on a background thread that is started by the
+    first ``subscribe`` call. Pub/sub delivery is at most once: while the
+    connection is down, invalidations are lost, so pair this with a
+    ``TieredCache`` ``ttl`` that bounds how stale a copy may get.
+    """
+
+    def __init__(
+        self, conn: Redis[bytes], channel: str = "cachecontrol:invalidate"
+    ) -> None:
+        self.conn = conn
+        self.channel = channel
+        self.subscribers: list[Callable[[str], None]] = []
+        self._pubsub: PubSub | None = None
+        self._thread: PubSubWorkerThread | None = None
+
+    def publish(self, key: str) -> None:
+        self.conn.publish(self.channel, key)
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        self.subscribers.append(callback)
+        if self._pubsub is None:
+            self._pubsub = self.conn.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{self.channel: self._handle})
+            self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def _handle(self, message: dict[str, bytes]) -> None:
+        key = message["data"].decode()
+        for callback in list(self.subscribers):
+            callback(key)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
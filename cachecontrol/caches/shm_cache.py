@@ -0,0 +1,393 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+A cache shared by every process on a host through a memory-mapped file.
+
+The file holds a fixed-size hash table whose entries point into slabs of
+a few fixed sizes. Readers never take a lock: every index entry and slab
+carries a sequence number that writers make odd while they modify it, so
+a reader that sees the number change (or odd) simply retries. Writers
+serialize on a single lock, held only for the few memory copies a write
+takes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import time
+from datetime import datetime, timezone
+from textwrap import dedent
+from threading import Lock
+from typing import TYPE_CHECKING
+
+from cachecontrol.cache import BaseCache
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+MAGIC = b"CCSHM001"
+
+# magic, number of buckets, number of slab classes
+HEADER = struct.Struct("<8sII")
+HEADER_SIZE = 64
+
+# slab size, number of slabs, offset of the first slab, free list head,
+# eviction cursor
+SLAB_CLASS = struct.Struct("<IIQiI")
+MAX_SLAB_CLASSES = 16
+
+# seq, slab class, slab number, key hash
+BUCKET = struct.Struct("<IiiQ")
+
+# seq, owning bucket, next free slab, key length, value length, expiry
+SLAB = struct.Struct("<IiiIId")
+
+EMPTY = -1
+DELETED = -2
+
+# How many buckets past its home bucket a key may be stored in.
+MAX_PROBE = 16
+
+# How often a reader retries when it keeps racing with a writer before
+# treating the lookup as a miss.
+MAX_RETRIES = 8
+
+DEFAULT_SLAB_SIZES = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _key_hash(key: bytes) -> int:
+    # Python's own hash() is randomized per process, so it can't be used for
+    # a table shared between processes.
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+class SharedMemoryCache(BaseCache):
+    """
+    Store entries in a memory-mapped file shared by all processes that open
+    the same ``path``, such as the workers of a pre-forking server.
+
+    ``size`` bytes of slabs are split evenly between the ``slab_sizes``
+    classes. An entry is stored in a slab of the smallest class its key and
+    value fit in; entries larger than the biggest slab are not cached. When
+    a class runs out of slabs, its slabs are reused in round-robin order.
+    Put ``path`` on a memory-backed filesystem such as ``/dev/shm`` to keep
+    the data off disk.
+
+    The layout is fixed when the file is created; later processes opening
+    the file use the layout stored in it and ignore their own arguments.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        size: int = 64 * 1024 * 1024,
+        slab_sizes: tuple[int, ...] = DEFAULT_SLAB_SIZES,
+    ) -> None:
+        try:
+            import fcntl
+        except ImportError:
+            notice = dedent(
+                """
+            NOTE: The SharedMemoryCache relies on POSIX file locks and is
+            not available on this platform.
+            """
+            )
+            raise ImportError(notice)
+
+        if not 0 < len(slab_sizes) <= MAX_SLAB_CLASSES:
+            raise ValueError(
+                f"Between 1 and {MAX_SLAB_CLASSES} slab sizes must be given."
+            )
+
+        self._fcntl = fcntl
+        self.path = path
+        self.lock = Lock()
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._write_lock():
+            if os.fstat(self.fd).st_size == 0:
+                self._create(size, sorted(slab_sizes))
+            self.mm = mmap.mmap(self.fd, 0)
+        self._load_layout()
+
+    def _write_lock(self) -> _WriteLock:
+        return _WriteLock(self)
+
+    def _create(self, size: int, slab_sizes: list[int]) -> None:
+        per_class = size // len(slab_sizes)
+        nslabs = [max(1, per_class // (SLAB.size + s)) for s in slab_sizes]
+        nbuckets = 2 * sum(nslabs)
+
+        offset = HEADER_SIZE + MAX_SLAB_CLASSES * SLAB_CLASS.size
+        offset += nbuckets * BUCKET.size
+        header = bytearray(offset)
+        HEADER.pack_into(header, 0, MAGIC, nbuckets, len(slab_sizes))
+        classes = []
+        for cls, (slab_size, count) in enumerate(zip(slab_sizes, nslabs)):
+            SLAB_CLASS.pack_into(
+                header,
+                HEADER_SIZE + cls * SLAB_CLASS.size,
+                slab_size,
+                count,
+                offset,
+                0,
+                0,
+            )
+            classes.append((slab_size, count, offset))
+            offset += count * (SLAB.size + slab_size)
+
+        bucket_start = HEADER_SIZE + MAX_SLAB_CLASSES * SLAB_CLASS.size
+        for bucket in range(nbuckets):
+            BUCKET.pack_into(
+                header, bucket_start + bucket * BUCKET.size, 0, EMPTY, 0, 0
+            )
+
+        os.ftruncate(self.fd, offset)
+        os.pwrite(self.fd, header, 0)
+
+        # Chain every slab of each class into its free list.
+        for slab_size, count, start in classes:
+            stride = SLAB.size + slab_size
+            for slab in range(count):
+                nxt = slab + 1 if slab + 1 < count else EMPTY
+                os.pwrite(
+                    self.fd, SLAB.pack(0, EMPTY, nxt, 0, 0, 0.0), start + slab * stride
+                )
+
+    def _load_layout(self) -> None:
+        magic, self.nbuckets, nclasses = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a SharedMemoryCache file.")
+        self.bucket_start = HEADER_SIZE + MAX_SLAB_CLASSES * SLAB_CLASS.size
+        self.classes: list[tuple[int, int, int]] = []
+        for cls in range(nclasses):
+            slab_size, count, start, _, _ = SLAB_CLASS.unpack_from(
+                self.mm, HEADER_SIZE + cls * SLAB_CLASS.size
+            )
+            self.classes.append((slab_size, count, start))
+
+    # Offsets
+
+    def _bucket_offset(self, bucket: int) -> int:
+        return self.bucket_start + bucket * BUCKET.size
+
+    def _slab_offset(self, cls: int, slab: int) -> int:
+        slab_size, _, start = self.classes[cls]
+        return start + slab * (SLAB.size + slab_size)
+
+    # Lock-free reads
+
+    def _read_bucket(self, bucket: int) -> tuple[int, int, int] | None:
+        offset = self._bucket_offset(bucket)
+        for _ in range(MAX_RETRIES):
+            seq, cls, slab, hashed = BUCKET.unpack_from(self.mm, offset)
+            if seq & 1:
+                continue
+            if BUCKET.unpack_from(self.mm, offset)[0] == seq:
+                return cls, slab, hashed
+        return None
+
+    def _read_slab(self, cls: int, slab: int, key: bytes) -> bytes | None:
+        offset = self._slab_offset(cls, slab)
+        for _ in range(MAX_RETRIES):
+            seq, _, _, key_len, value_len, expires = SLAB.unpack_from(self.mm, offset)
+            if seq & 1:
+                continue
+            start = offset + SLAB.size
+            stored_key = self.mm[start : start + key_len]
+            value = self.mm[start + key_len : start + key_len + value_len]
+            if SLAB.unpack_from(self.mm, offset)[0] != seq:
+                continue
+            if stored_key != key or (expires and expires <= time.time()):
+                return None
+            return value
+        return None
+
+    def get(self, key: str) -> bytes | None:
+        encoded = key.encode()
+        hashed = _key_hash(encoded)
+        for probe in range(MAX_PROBE):
+            entry = self._read_bucket((hashed + probe) % self.nbuckets)
+            if entry is None:
+                return None
+            cls, slab, bucket_hash = entry
+            if cls == EMPTY:
+                return None
+            if cls == DELETED or bucket_hash != hashed:
+                continue
+            value = self._read_slab(cls, slab, encoded)
+            if value is not None:
+                return value
+        return None
+
+    # Writes, always with the write lock held
+
+    def _write_bucket(self, bucket: int, cls: int, slab: int, hashed: int) -> None:
+        offset = self._bucket_offset(bucket)
+        seq = BUCKET.unpack_from(self.mm, offset)[0]
+        struct.pack_into("<I", self.mm, offset, seq + 1)
+        BUCKET.pack_into(self.mm, offset, seq + 1, cls, slab, hashed)
+        struct.pack_into("<I", self.mm, offset, seq + 2)
+
+    def _write_slab(
+        self,
+        cls: int,
+        slab: int,
+        bucket: int,
+        nxt: int,
+        key: bytes = b"",
+        value: bytes = b"",
+        expires: float = 0.0,
+    ) -> None:
+        offset = self._slab_offset(cls, slab)
+        seq = SLAB.unpack_from(self.mm, offset)[0]
+        struct.pack_into("<I", self.mm, offset, seq + 1)
+        SLAB.pack_into(
+            self.mm, offset, seq + 1, bucket, nxt, len(key), len(value), expires
+        )
+        start = offset + SLAB.size
+        self.mm[start : start + len(key)] = key
+        self.mm[start + len(key) : start + len(key) + len(value)] = value
+        struct.pack_into("<I", self.mm, offset, seq + 2)
+
+    def _free_slab(self, cls: int, slab: int) -> None:
+        class_offset = HEADER_SIZE + cls * SLAB_CLASS.size
+        slab_size, count, start, head, cursor = SLAB_CLASS.unpack_from(
+            self.mm, class_offset
+        )
+        self._write_slab(cls, slab, EMPTY, head)
+        SLAB_CLASS.pack_into(
+            self.mm, class_offset, slab_size, count, start, slab, cursor
+        )
+
+    def _allocate_slab(self, cls: int) -> int:
+        class_offset = HEADER_SIZE + cls * SLAB_CLASS.size
+        slab_size, count, start, head, cursor = SLAB_CLASS.unpack_from(
+            self.mm, class_offset
+        )
+        if head != EMPTY:
+            nxt = SLAB.unpack_from(self.mm, self._slab_offset(cls, head))[2]
+            SLAB_CLASS.pack_into(
+                self.mm, class_offset, slab_size, count, start, nxt, cursor
+            )
+            return int(head)
+
+        # Out of free slabs: evict the slab under the cursor.
+        slab = int(cursor)
+        owner = SLAB.unpack_from(self.mm, self._slab_offset(cls, slab))[1]
+        if owner >= 0:
+            self._write_bucket(owner, DELETED, 0, 0)
+        SLAB_CLASS.pack_into(
+            self.mm, class_offset, slab_size, count, start, head, (cursor + 1) % count
+        )
+        return slab
+
+    def _find(self, encoded: bytes, hashed: int) -> tuple[int | None, int | None]:
+        """Return the bucket holding ``encoded``, and the first reusable one."""
+        reusable = None
+        for probe in range(MAX_PROBE):
+            bucket = (hashed + probe) % self.nbuckets
+            _, cls, slab, bucket_hash = BUCKET.unpack_from(
+                self.mm, self._bucket_offset(bucket)
+            )
+            if cls < 0:
+                if reusable is None:
+                    reusable = bucket
+                if cls == EMPTY:
+                    break
+                continue
+            if bucket_hash == hashed:
+                offset = self._slab_offset(cls, slab)
+                key_len = SLAB.unpack_from(self.mm, offset)[3]
+                start = offset + SLAB.size
+                if self.mm[start : start + key_len] == encoded:
+                    return bucket, reusable
+        return None, reusable
+
+    def _remove(self, bucket: int) -> None:
+        _, cls, slab, _ = BUCKET.unpack_from(self.mm, self._bucket_offset(bucket))
+        self._write_bucket(bucket, DELETED, 0, 0)
+        self._free_slab(cls, slab)
+
+    def set(
+        self, key: str, value: bytes, expires: int | datetime | None = None
+    ) -> None:
+        encoded = key.encode()
+        hashed = _key_hash(encoded)
+        if isinstance(expires, datetime):
+            if expires.tzinfo is None:
+                expires = expires.replace(tzinfo=timezone.utc)
+            deadline = expires.timestamp()
+        else:
+            deadline = time.time() + expires if expires else 0.0
+
+        size = len(encoded) + len(value)
+        cls = next(
+            (
+                i
+                for i, (slab_size, _, _) in enumerate(self.classes)
+                if size <= slab_size
+            ),
+            None,
+        )
+
+        with self._write_lock():
+            existing, reusable = self._find(encoded, hashed)
+            if cls is None:
+                # Too big to cache; make sure an older copy isn't served.
+                if existing is not None:
+                    self._remove(existing)
+                return
+
+            if existing is not None:
+                bucket = existing
+                _, old_cls, old_slab, _ = BUCKET.unpack_from(
+                    self.mm, self._bucket_offset(bucket)
+                )
+            else:
+                old_cls = old_slab = EMPTY
+                if reusable is None:
+                    # Every bucket in the probe window is taken: make room at
+                    # the home bucket.
+                    reusable = hashed % self.nbuckets
+                    self._remove(reusable)
+                bucket = reusable
+
+            slab = self._allocate_slab(cls)
+            self._write_slab(cls, slab, bucket, EMPTY, encoded, bytes(value), deadline)
+            self._write_bucket(bucket, cls, slab, hashed)
+            if old_cls >= 0 and (old_cls, old_slab) != (cls, slab):
+                self._free_slab(old_cls, old_slab)
+
+    def delete(self, key: str) -> None:
+        encoded = key.encode()
+        with self._write_lock():
+            existing, _ = self._find(encoded, _key_hash(encoded))
+            if existing is not None:
+                self._remove(existing)
+
+    def close(self) -> None:
+        if not self.mm.closed:
+            self.mm.close()
+            os.close(self.fd)
+
+
+class _WriteLock:
+    """Exclude writers in this process (threads) and in other processes."""
+
+    def __init__(self, cache: SharedMemoryCache) -> None:
+        self.cache = cache
+
+    def __enter__(self) -> None:
+        self.cache.lock.acquire()
+        # POSIX record locks belong to the process, so unlike flock() they
+        # also exclude forked children sharing the same file descriptor.
+        self.cache._fcntl.lockf(self.cache.fd, self.cache._fcntl.LOCK_EX)
+
+    def __exit__(self, *args: object) -> None:
+        self.cache._fcntl.lockf(self.cache.fd, self.cache._fcntl.LOCK_UN)
+        self.cache.lock.release()
@@ -0,0 +1,203 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+A two-tier cache: a bounded in-process LRU in front of any other cache.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Callable
+
+from cachecontrol.cache import BaseCache
+
+
+class InvalidationChannel:
+    """
+    Broadcasts deleted cache keys to every ``TieredCache`` subscribed to
+    the channel, possibly in other processes, so they can drop their
+    in-memory copies.
+    """
+
+    def publish(self, key: str) -> None:
+        raise NotImplementedError()
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        pass
+
+
+class LocalInvalidationChannel(InvalidationChannel):
+    """
+    An in-process channel that calls its subscribers synchronously. Useful
+    for tests and for several tiered caches sharing one backend in a
+    single process.
+    """
+
+    def __init__(self) -> None:
+        self.subscribers: list[Callable[[str], None]] = []
+
+    def publish(self, key: str) -> None:
+        for callback in list(self.subscribers):
+            callback(key)
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        self.subscribers.append(callback)
+
+
+class TieredCacheStats:
+    """Lookup counters for a ``TieredCache``."""
+
+    def __init__(self) -> None:
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.l1_hits + self.l2_hits + self.misses
+
+    @property
+    def l1_hit_rate(self) -> float:
+        """Fraction of all lookups answered from memory."""
+        return self.l1_hits / self.lookups if self.lookups else 0.0
+
+    @property
+    def l2_hit_rate(self) -> float:
+        """Fraction of lookups that missed memory but hit the backend."""
+        l2_lookups = self.l2_hits + self.misses
+        return self.l2_hits / l2_lookups if l2_lookups else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"<TieredCacheStats l1_hits={self.l1_hits} l2_hits={self.l2_hits} "
+            f"misses={self.misses}>"
+        )
+
+
+class TieredCache(BaseCache):
+    """
+    Keep the most recently used entries of ``backend`` in memory.
+
+    Lookups are answered from memory when possible and otherwise read
+    through to the backend, promoting what they find. ``set`` writes
+    through to both tiers and ``delete`` removes the entry from both.
+
+    The memory tier holds at most ``max_entries`` entries and, if given,
+    ``max_bytes`` bytes, evicting the least recently used entries first.
+    Entries never outlive the expiry passed to ``set``; ``ttl`` optionally
+    bounds how long any entry (including promoted ones, whose backend
+    expiry is unknown) stays in memory.
+
+    If an invalidation ``channel`` is given, ``delete`` is broadcast on it
+    and deletes received from it evict the in-memory copy. Invalidations
+    are handled as they arrive, so lookups do no extra work.
+    """
+
+    def __init__(
+        self,
+        backend: BaseCache,
+        max_entries: int = 1024,
+        max_bytes: int | None = None,
+        ttl: int | None = None,
+        channel: InvalidationChannel | None = None,
+    ) -> None:
+        self.backend = backend
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = TieredCacheStats()
+        self.lock = Lock()
+        self._entries: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+        self._size = 0
+        # Bumped on every delete so a concurrent read-through can tell that
+        # the value it fetched may already be stale.
+        self._generation = 0
+        self.channel = channel
+        if channel is not None:
+            channel.subscribe(self.invalidate)
+
+    def _deadline(self, expires: int | datetime | None) -> float | None:
+        now = time.time()
+        deadline = None if self.ttl is None else now + self.ttl
+        if isinstance(expires, datetime):
+            if expires.tzinfo is None:
+                expires = expires.replace(tzinfo=timezone.utc)
+            expiry: float | None = expires.timestamp()
+        elif expires:
+            expiry = now + expires
+        else:
+            expiry = None
+        if expiry is not None and (deadline is None or expiry < deadline):
+            deadline = expiry
+        return deadline
+
+    def _remember(self, key: str, value: bytes, deadline: float | None) -> None:
+        # Must be called with the lock held.
+        self._forget(key)
+        if self.max_bytes is not None and len(value) > self.max_bytes:
+            return
+        self._entries[key] = (value, deadline)
+        self._size += len(value)
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._size > self.max_bytes
+        ):
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _forget(self, key: str) -> None:
+        # Must be called with the lock held.
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+    def get(self, key: str) -> bytes | None:
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, deadline = entry
+                if deadline is None or deadline > time.time():
+                    self._entries.move_to_end(key)
+                    self.stats.l1_hits += 1
+                    return value
+                self._forget(key)
+            generation = self._generation
+
+        stored = self.backend.get(key)
+        with self.lock:
+            if stored is None:
+                self.stats.misses += 1
+            else:
+                self.stats.l2_hits += 1
+                if generation == self._generation:
+                    self._remember(key, stored, self._deadline(None))
+        return stored
+
+    def set(
+        self, key: str, value: bytes, expires: int | datetime | None = None
+    ) -> None:
+        self.backend.set(key, value, expires=expires)
+        with self.lock:
+            self._remember(key, value, self._deadline(expires))
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(key)
+        self.invalidate(key)
+        if self.channel is not None:
+            self.channel.publish(key)
+
+    def invalidate(self, key: str) -> None:
+        """Drop the in-memory copy of ``key``, leaving the backend alone."""
+        with self.lock:
+            self._forget(key)
+            self._generation += 1
+
+    def close(self) -> None:
+        self.backend.close()
@@ -8,18 +8,39 @@ The httplib2 algorithms ported for use with requests.
 
 from __future__ import annotations
 
-import calendar
+import functools
+import hashlib
+import io
 import logging
 import re
 import time
 import weakref
-from email.utils import parsedate_tz
-from typing import TYPE_CHECKING, Collection, Mapping
+from collections import OrderedDict
+from contextlib import AbstractContextManager, nullcontext
+from threading import Lock
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Callable,
+    Collection,
+    Iterable,
+    Mapping,
+    NamedTuple,
+    TypeVar,
+)
 
 from requests.structures import CaseInsensitiveDict
 
+from cachecontrol._httpdate import parse_http_date
 from cachecontrol.cache import DictCache, SeparateBodyBaseCache
-from cachecontrol.serialize import Serializer
+from cachecontrol.serialize import (
+    CachedEntry,
+    Serializer,
+    dumps_vary_index,
+    loads_vary_index,
+    normalize_header_value,
+)
+from cachecontrol.stats import ListenerGroup
 
 if TYPE_CHECKING:
     from typing import Literal
@@ -28,6 +49,8 @@ if TYPE_CHECKING:
     from urllib3 import HTTPResponse
 
     from cachecontrol.cache import BaseCache
+    from cachecontrol.stats import CacheListener
+    from cachecontrol.writer import BackgroundWriter
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +58,48 @@ URI = re.compile(r"^(([^:/?#]+):)?(//([^/?#]*))?([^?#]*)(\?([^#]*))?(#(.*))?")
 
 PERMANENT_REDIRECT_STATUSES = (301, 308)
 
+# How long responses with an ETag are kept at least, for revalidation.
+ETAG_MIN_EXPIRY = 14 * 86400
+
+KNOWN_DIRECTIVES: dict[str, tuple[type[int] | None, bool]] = {
+    # https://tools.ietf.org/html/rfc7234#section-5.2
+    "max-age": (int, True),
+    "max-stale": (int, False),
+    "min-fresh": (int, True),
+    "no-cache": (None, False),
+    "no-store": (None, False),
+    "no-transform": (None, False),
+    "only-if-cached": (None, False),
+    "must-revalidate": (None, False),
+    "public": (None, False),
+    "private": (None, False),
+    "proxy-revalidate": (None, False),
+    "s-maxage": (int, True),
+}
+
+# How many distinct URLs and Cache-Control values to remember the
+# normalized and parsed forms of.
+URL_CACHE_SIZE = 4096
+CACHE_CONTROL_CACHE_SIZE = 512
+
+# How many URLs to remember the Vary header names of, and how many
+# variants to keep per URL.
+VARY_MEMO_SIZE = 4096
+MAX_VARIANTS = 64
+
+
+class StorePlan(NamedTuple):
+    """What caching a response calls for.
+
+    ``store`` is False when an existing entry for ``cache_url`` must be
+    purged instead (the response or request said "no-store").
+    """
+
+    cache_url: str
+    store: bool
+    body: bytes | None = None
+    expires_time: int | None = None
+
 
 def parse_uri(uri: str) -> tuple[str, str, str, str, str]:
     """Parses a URI using the regex given in Appendix B of RFC 3986.
@@ -47,6 +112,103 @@ def parse_uri(uri: str) -> tuple[str, str, str, str, str]:
     return (groups[1], groups[3], groups[4], groups[6], groups[8])
 
 
+@functools.lru_cache(maxsize=URL_CACHE_SIZE)
+def _urlnorm(uri: str) -> str:
+    (scheme, authority, path, query, fragment) = parse_uri(uri)
+    if not scheme or not authority:
+        raise Exception("Only absolute URIs are allowed. uri = %s" % uri)
+
+    scheme = scheme.lower()
+    authority = authority.lower()
+
+    if not path:
+        path = "/"
+
+    # Could do syntax based normalization of the URI before
+    # computing the digest. See Section 6.2.2 of Std 66.
+    request_uri = query and "?".join([path, query]) or path
+    defrag_uri = scheme + "://" + authority + request_uri
+
+    return defrag_uri
+
+
+@functools.lru_cache(maxsize=CACHE_CONTROL_CACHE_SIZE)
+def _parse_cache_control(cc_headers: str) -> dict[str, int | None]:
+    retval: dict[str, int | None] = {}
+
+    for cc_directive in cc_headers.split(","):
+        if not cc_directive.strip():
+            continue
+
+        parts = cc_directive.split("=", 1)
+        directive = parts[0].strip()
+
+        try:
+            typ, required = KNOWN_DIRECTIVES[directive]
+        except KeyError:
+            logger.debug("Ignoring unknown cache-control directive: %s", directive)
+            continue
+
+        if not typ or not required:
+            retval[directive] = None
+        if typ:
+            try:
+                retval[directive] = typ(parts[1].strip())
+            except IndexError:
+                if required:
+                    logger.debug(
+                        "Missing value for cache-control directive: %s",
+                        directive,
+                    )
+            except ValueError:
+                logger.debug(
+                    "Invalid value for cache-control directive %s, must be %s",
+                    directive,
+                    typ.__name__,
+                )
+
+    return retval
+
+
+def _vary_names(headers: Mapping[str, str]) -> tuple[str, ...]:
+    vary = headers.get("vary", "")
+    return tuple(sorted({name.strip().lower() for name in vary.split(",")} - {""}))
+
+
+def _body_size(resp: HTTPResponse | CachedEntry) -> int:
+    if isinstance(resp, CachedEntry):
+        return len(resp.body)
+    fp = getattr(resp, "_fp", None)
+    if isinstance(fp, io.BytesIO):
+        return fp.getbuffer().nbytes
+    length = resp.headers.get("content-length", "")
+    return int(length) if length.isdigit() else 0
+
+
+_Loaded = TypeVar("_Loaded", "HTTPResponse", CachedEntry)
+
+
+class _PhaseTimer:
+    __slots__ = ("listener", "phase", "start")
+
+    def __init__(self, listener: CacheListener, phase: str) -> None:
+        self.listener = listener
+        self.phase = phase
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.listener.timing(self.phase, time.perf_counter() - self.start)
+
+
+_NO_TIMER = nullcontext()
+
+
+def _ignore_uncacheable(request: PreparedRequest, reason: str) -> None:
+    pass
+
+
 class CacheController:
     """An interface to see if request should cached or not."""
 
@@ -56,126 +218,224 @@ class CacheController:
         cache_etags: bool = True,
         serializer: Serializer | None = None,
         status_codes: Collection[int] | None = None,
+        writer: BackgroundWriter | None = None,
+        key_builder: Callable[[str], str] | None = None,
+        listeners: Iterable[CacheListener] | None = None,
     ):
         self.cache = DictCache() if cache is None else cache
         self.cache_etags = cache_etags
         self.serializer = serializer or Serializer()
         self.cacheable_status_codes = status_codes or (200, 203, 300, 301, 308)
+        self.writer = writer
+        self.key_builder = key_builder
+        self._vary_lock = Lock()
+        # cache key -> the header names its stored responses vary on
+        self._vary_memo: OrderedDict[str, tuple[str, ...]] = OrderedDict()
+        self._listeners: list[CacheListener] = []
+        # What events are sent to; None while nobody listens.
+        self.listener: CacheListener | None = None
+        for listener in listeners or ():
+            self.add_listener(listener)
+
+    def add_listener(self, listener: CacheListener) -> None:
+        """Send the events of this controller to ``listener`` as well."""
+        self._listeners.append(listener)
+        self._update_listener()
+
+    def remove_listener(self, listener: CacheListener) -> None:
+        self._listeners.remove(listener)
+        self._update_listener()
+
+    def _timer(self, phase: str) -> AbstractContextManager[None]:
+        """
+        Time the ``with`` block as ``phase``, for the listeners' ``timing``
+        event.
+        """
+        if self.listener is None:
+            return _NO_TIMER
+        return _PhaseTimer(self.listener, phase)
+
+    def _update_listener(self) -> None:
+        if len(self._listeners) > 1:
+            self.listener = ListenerGroup(self._listeners)
+        else:
+            self.listener = self._listeners[0] if self._listeners else None
 
     @classmethod
     def _urlnorm(cls, uri: str) -> str:
         """Normalize the URL to create a safe key for the cache"""
-        (scheme, authority, path, query, fragment) = parse_uri(uri)
-        if not scheme or not authority:
-            raise Exception("Only absolute URIs are allowed. uri = %s" % uri)
-
-        scheme = scheme.lower()
-        authority = authority.lower()
-
-        if not path:
-            path = "/"
-
-        # Could do syntax based normalization of the URI before
-        # computing the digest. See Section 6.2.2 of Std 66.
-        request_uri = query and "?".join([path, query]) or path
-        defrag_uri = scheme + "://" + authority + request_uri
-
-        return defrag_uri
+        return _urlnorm(uri)
 
     @classmethod
     def cache_url(cls, uri: str) -> str:
         return cls._urlnorm(uri)
 
-    def parse_cache_control(self, headers: Mapping[str, str]) -> dict[str, int | None]:
-        known_directives = {
-            # https://tools.ietf.org/html/rfc7234#section-5.2
-            "max-age": (int, True),
-            "max-stale": (int, False),
-            "min-fresh": (int, True),
-            "no-cache": (None, False),
-            "no-store": (None, False),
-            "no-transform": (None, False),
-            "only-if-cached": (None, False),
-            "must-revalidate": (None, False),
-            "public": (None, False),
-            "private": (None, False),
-            "proxy-revalidate": (None, False),
-            "s-maxage": (int, True),
-        }
-
-        cc_headers = headers.get("cache-control", headers.get("Cache-Control", ""))
-
-        retval: dict[str, int | None] = {}
-
-        for cc_directive in cc_headers.split(","):
-            if not cc_directive.strip():
-                continue
-
-            parts = cc_directive.split("=", 1)
-            directive = parts[0].strip()
+    def cache_key(self, uri: str) -> str:
+        """
+        The key ``uri`` is cached under: ``key_builder(uri)`` if there is a
+        key builder, otherwise ``cache_url(uri)``.
+        """
+        if self.key_builder is not None:
+            return self.key_builder(uri)
+        return self.cache_url(uri)
 
-            try:
-                typ, required = known_directives[directive]
-            except KeyError:
-                logger.debug("Ignoring unknown cache-control directive: %s", directive)
-                continue
-
-            if not typ or not required:
-                retval[directive] = None
-            if typ:
-                try:
-                    retval[directive] = typ(parts[1].strip())
-                except IndexError:
-                    if required:
-                        logger.debug(
-                            "Missing value for cache-control directive: %s",
-                            directive,
-                        )
-                except ValueError:
-                    logger.debug(
-                        "Invalid value for cache-control directive %s, must be %s",
-                        directive,
-                        typ.__name__,
-                    )
+    def variant_key(
+        self, cache_url: str, vary: Collection[str], headers: Mapping[str, str]
+    ) -> str:
+        """
+        The key of the variant of ``cache_url`` that a request with
+        ``headers`` selects, when its responses vary on the header names
+        ``vary``.
+        """
+        selecting = []
+        for name in vary:
+            value = normalize_header_value(headers.get(name))
+            selecting.append(name if value is None else f"{name}={value}")
+        digest = hashlib.sha224("\n".join(selecting).encode()).hexdigest()
+        return f"{cache_url}#vary={digest}"
+
+    def entry_key(self, request: PreparedRequest) -> str:
+        """
+        The key the cache entry for ``request`` is stored under, as far as
+        this controller knows: the variant key for URLs it has seen varied
+        responses for, otherwise ``cache_key(request.url)``.
+        """
+        assert request.url is not None
+        cache_url = self.cache_key(request.url)
+        vary = self._known_vary(cache_url)
+        if vary is None:
+            return cache_url
+        return self.variant_key(cache_url, vary, request.headers)
+
+    def _known_vary(self, cache_url: str) -> tuple[str, ...] | None:
+        with self._vary_lock:
+            return self._vary_memo.get(cache_url)
+
+    def _remember_vary(self, cache_url: str, vary: tuple[str, ...] | None) -> None:
+        with self._vary_lock:
+            if vary is None:
+                self._vary_memo.pop(cache_url, None)
+                return
+            self._vary_memo[cache_url] = vary
+            self._vary_memo.move_to_end(cache_url)
+            if len(self._vary_memo) > VARY_MEMO_SIZE:
+                self._vary_memo.popitem(last=False)
+
+    def _update_vary_index(
+        self, index_data: bytes | None, vary: tuple[str, ...], variant: str
+    ) -> tuple[bytes, list[str]]:
+        """
+        Add ``variant`` to the vary index ``index_data``, returning the new
+        index and the variant keys that dropped out of it.
+        """
+        variants = [variant]
+        dropped: list[str] = []
+        index = loads_vary_index(index_data)
+        if index is not None:
+            old_vary, old_variants = index
+            if old_vary == vary:
+                variants += [key for key in old_variants if key != variant]
+            else:
+                # The header names changed, so the keys did too.
+                dropped = old_variants
+        dropped += variants[MAX_VARIANTS:]
+        return dumps_vary_index(vary, variants[:MAX_VARIANTS]), dropped
 
-        return retval
+    def parse_cache_control(self, headers: Mapping[str, str]) -> dict[str, int | None]:
+        cc_headers = headers.get("cache-control", headers.get("Cache-Control", ""))
+        if not cc_headers:
+            return {}
+        # The parsed directives are shared by every caller; hand out a copy.
+        return dict(_parse_cache_control(cc_headers))
 
     def _load_from_cache(self, request: PreparedRequest) -> HTTPResponse | None:
         """
         Load a cached response, or return None if it's not available.
         """
+        cached = self._read_cache(request)
+        if cached is None:
+            return None
+        return self._deserialize(request, *cached)
+
+    def _load_entry(self, request: PreparedRequest) -> CachedEntry | None:
+        """
+        Load a decoded cache entry, or return None if it's not available.
+        """
+        cached = self._read_cache(request)
+        if cached is None:
+            return None
+        listener = self.listener
+        start = time.perf_counter() if listener is not None else 0.0
+        result = self.serializer.loads_entry(request, *cached)
+        if listener is not None:
+            listener.timing("deserialize", time.perf_counter() - start)
+        if result is None:
+            logger.debug("Cache entry deserialization failed, entry ignored")
+        return result
+
+    def _read_cache(
+        self, request: PreparedRequest
+    ) -> tuple[bytes, IO[bytes] | None] | None:
         # We do not support caching of partial content: so if the request contains a
         # Range header then we don't want to load anything from the cache.
         if "Range" in request.headers:
             return None
 
-        cache_url = request.url
-        assert cache_url is not None
-        cache_data = self.cache.get(cache_url)
+        assert request.url is not None
+        cache_url = self.cache_key(request.url)
+        key, cache_data = cache_url, None
+
+        # For a URL known to vary, go straight to the variant; the index
+        # under cache_url only has to be read if that misses.
+        listener = self.listener
+        start = time.perf_counter() if listener is not None else 0.0
+
+        vary = self._known_vary(cache_url)
+        if vary is not None:
+            key = self.variant_key(cache_url, vary, request.headers)
+            cache_data = self.cache.get(key)
+
+        if cache_data is None:
+            key, cache_data = cache_url, self.cache.get(cache_url)
+            index = loads_vary_index(cache_data)
+            self._remember_vary(cache_url, index and index[0])
+            if index is not None and index[0] != vary:
+                key = self.variant_key(cache_url, index[0], request.headers)
+                cache_data = self.cache.get(key)
+            elif index is not None:
+                cache_data = None
+
+        body_file = None
+        if cache_data is not None and isinstance(self.cache, SeparateBodyBaseCache):
+            body_file = self.cache.get_body(key)
+
+        if listener is not None:
+            listener.timing("backend_get", time.perf_counter() - start)
         if cache_data is None:
             logger.debug("No cache entry available")
             return None
+        return cache_data, body_file
 
-        if isinstance(self.cache, SeparateBodyBaseCache):
-            body_file = self.cache.get_body(cache_url)
-        else:
-            body_file = None
-
+    def _deserialize(
+        self,
+        request: PreparedRequest,
+        cache_data: bytes,
+        body_file: IO[bytes] | None = None,
+    ) -> HTTPResponse | None:
+        listener = self.listener
+        start = time.perf_counter() if listener is not None else 0.0
         result = self.serializer.loads(request, cache_data, body_file)
+        if listener is not None:
+            listener.timing("deserialize", time.perf_counter() - start)
         if result is None:
             logger.debug("Cache entry deserialization failed, entry ignored")
         return result
 
-    def cached_request(self, request: PreparedRequest) -> HTTPResponse | Literal[False]:
+    def _request_allows_cache(self, cc: Mapping[str, int | None]) -> bool:
         """
-        Return a cached response if it exists in the cache, otherwise
-        return False.
+        Check whether the request's Cache-Control directives allow it to be
+        answered from the cache at all.
         """
-        assert request.url is not None
-        cache_url = self.cache_url(request.url)
-        logger.debug('Looking up "%s" in the cache', cache_url)
-        cc = self.parse_cache_control(request.headers)
-
         # Bail out if the request insists on fresh data
         if "no-cache" in cc:
             logger.debug('Request header has "no-cache", cache bypassed')
@@ -185,44 +445,104 @@ class CacheController:
             logger.debug('Request header has "max_age" as 0, cache bypassed')
             return False
 
-        # Check whether we can load the response from the cache:
-        resp = self._load_from_cache(request)
-        if not resp:
-            return False
+        return True
 
-        # If we have a cached permanent redirect, return it immediately. We
-        # don't need to test our response for other headers b/c it is
-        # intrinsically "cacheable" as it is Permanent.
-        #
-        # See:
-        #   https://tools.ietf.org/html/rfc7231#section-6.4.2
-        #
-        # Client can try to refresh the value by repeating the request
-        # with cache busting headers as usual (ie no-cache).
-        if int(resp.status) in PERMANENT_REDIRECT_STATUSES:
-            msg = (
-                "Returning cached permanent redirect response "
-                "(ignoring date and etag information)"
-            )
-            logger.debug(msg)
-            return resp
+    def cached_request(self, request: PreparedRequest) -> HTTPResponse | Literal[False]:
+        """
+        Return a cached response if it exists in the cache, otherwise
+        return False.
+        """
+        return self._lookup(request, self._load_from_cache)
 
-        headers: CaseInsensitiveDict[str] = CaseInsensitiveDict(resp.headers)
-        if not headers or "date" not in headers:
-            if "etag" not in headers:
-                # Without date or etag, the cached response can never be used
-                # and should be deleted.
-                logger.debug("Purging cached response: no date or etag")
-                self.cache.delete(cache_url)
-            logger.debug("Ignoring cached response: no date")
-            return False
+    def _has_fresh(self, request: PreparedRequest) -> bool:
+        """
+        Whether a fresh response to ``request`` is cached, without counting
+        the lookup as a hit or miss.
+        """
+        return bool(self._lookup(request, self._load_from_cache, notify=False))
+
+    def _supports_entries(self) -> bool:
+        """
+        Whether ``cached_entry`` can stand in for ``cached_request``, which
+        is only the case when neither this controller nor its serializer
+        customize how responses are loaded.
+        """
+        cls, serializer_cls = type(self), type(self.serializer)
+        return (
+            cls.cached_request is CacheController.cached_request
+            and cls._load_from_cache is CacheController._load_from_cache
+            and cls._deserialize is CacheController._deserialize
+            and serializer_cls.loads is Serializer.loads
+            and serializer_cls.prepare_response is Serializer.prepare_response
+        )
+
+    def cached_entry(self, request: PreparedRequest) -> CachedEntry | Literal[False]:
+        """
+        Like ``cached_request``, but return the decoded cache entry rather
+        than a urllib3 response built from it.
+        """
+        return self._lookup(request, self._load_entry)
 
+    def _lookup(
+        self,
+        request: PreparedRequest,
+        load: Callable[[PreparedRequest], _Loaded | None],
+        notify: bool = True,
+    ) -> _Loaded | Literal[False]:
+        """
+        Find a fresh cached response for ``request``, loading it with
+        ``load``, and tell the listener how that went unless ``notify`` is
+        false.
+        """
+        listener = self.listener if notify else None
+        start = time.perf_counter() if listener is not None else 0.0
+        assert request.url is not None
+        cache_url = self.cache_key(request.url)
+        logger.debug('Looking up "%s" in the cache', cache_url)
+
+        found: _Loaded | Literal[False] = False
+        cc = self.parse_cache_control(request.headers)
+        if not self._request_allows_cache(cc):
+            if listener is not None:
+                listener.bypass(request)
+        # Check whether we can load the response from the cache:
+        elif not (resp := load(request)):
+            if listener is not None:
+                listener.miss(request)
+        else:
+            fresh, purge = self._check_freshness(cc, resp)
+            if purge:
+                self._cache_delete(self.entry_key(request))
+            if fresh:
+                found = resp
+            if listener is not None:
+                self._notify_lookup(request, resp, fresh)
+
+        if listener is not None:
+            listener.timing("lookup", time.perf_counter() - start)
+        return found
+
+    def _notify_lookup(
+        self, request: PreparedRequest, resp: HTTPResponse | CachedEntry, fresh: bool
+    ) -> None:
+        assert self.listener is not None
+        if fresh:
+            self.listener.hit(request, _body_size(resp))
+        else:
+            self.listener.stale(request)
+
+    def _freshness(self, headers: CaseInsensitiveDict[str]) -> tuple[float, int] | None:
+        """
+        Return the ``(current_age, freshness_lifetime)`` of a cached response
+        with ``headers``, as the response alone defines them, or None if it
+        has no valid Date.
+        """
         now = time.time()
-        time_tuple = parsedate_tz(headers["date"])
-        if time_tuple is None:
-            logger.debug("Ignoring cached response: invalid date")
-            return False
-        date = calendar.timegm(time_tuple[:6])
+        if "date" not in headers:
+            return None
+        date = parse_http_date(headers["date"])
+        if date is None:
+            return None
         current_age = max(0, now - date)
         logger.debug("Current age based on date: %i", current_age)
 
@@ -243,12 +563,57 @@ class CacheController:
 
         # If there isn't a max-age, check for an expires header
         elif "expires" in headers:
-            expires = parsedate_tz(headers["expires"])
+            expires = parse_http_date(headers["expires"])
             if expires is not None:
-                expire_time = calendar.timegm(expires[:6]) - date
+                expire_time = expires - date
                 freshness_lifetime = max(0, expire_time)
                 logger.debug("Freshness lifetime from expires: %i", freshness_lifetime)
 
+        return current_age, freshness_lifetime
+
+    def _check_freshness(
+        self, cc: Mapping[str, int | None], resp: HTTPResponse | CachedEntry
+    ) -> tuple[bool, bool]:
+        """
+        Decide whether a cached response can be served for a request with
+        the Cache-Control directives ``cc``.
+
+        Returns a ``(fresh, purge)`` pair: whether to serve the response,
+        and whether the cached entry is useless and should be deleted.
+        """
+        # If we have a cached permanent redirect, return it immediately. We
+        # don't need to test our response for other headers b/c it is
+        # intrinsically "cacheable" as it is Permanent.
+        #
+        # See:
+        #   https://tools.ietf.org/html/rfc7231#section-6.4.2
+        #
+        # Client can try to refresh the value by repeating the request
+        # with cache busting headers as usual (ie no-cache).
+        if int(resp.status) in PERMANENT_REDIRECT_STATUSES:
+            msg = (
+                "Returning cached permanent redirect response "
+                "(ignoring date and etag information)"
+            )
+            logger.debug(msg)
+            return True, False
+
+        headers: CaseInsensitiveDict[str] = CaseInsensitiveDict(resp.headers)
+        if not headers or "date" not in headers:
+            purge = "etag" not in headers
+            if purge:
+                # Without date or etag, the cached response can never be used
+                # and should be deleted.
+                logger.debug("Purging cached response: no date or etag")
+            logger.debug("Ignoring cached response: no date")
+            return False, purge
+
+        freshness = self._freshness(headers)
+        if freshness is None:
+            logger.debug("Ignoring cached response: invalid date")
+            return False, False
+        current_age, freshness_lifetime = freshness
+
         # Determine if we are setting freshness limit in the
         # request. Note, this overrides what was in the response.
         max_age = cc.get("max-age")
@@ -268,18 +633,20 @@ class CacheController:
         if freshness_lifetime > current_age:
             logger.debug('The response is "fresh", returning cached response')
             logger.debug("%i > %i", freshness_lifetime, current_age)
-            return resp
+            return True, False
 
         # we're not fresh. If we don't have an Etag, clear it out
-        if "etag" not in headers:
+        purge = "etag" not in headers
+        if purge:
             logger.debug('The cached response is "stale" with no etag, purging')
-            self.cache.delete(cache_url)
 
         # return the original handler
-        return False
+        return False, purge
 
     def conditional_headers(self, request: PreparedRequest) -> dict[str, str]:
-        resp = self._load_from_cache(request)
+        return self._conditional_headers(self._load_from_cache(request))
+
+    def _conditional_headers(self, resp: HTTPResponse | None) -> dict[str, str]:
         new_headers = {}
 
         if resp:
@@ -302,27 +669,125 @@ class CacheController:
         expires_time: int | None = None,
     ) -> None:
         """
-        Store the data in the cache.
+        Store the data in the cache, in the background if there is a
+        ``writer``.
+
+        A response that varies on request headers is stored under the key of
+        its variant, and the primary ``cache_url`` gets an index of them.
+        """
+        vary = _vary_names(response.headers)
+        self._remember_vary(cache_url, vary or None)
+        key = self.variant_key(cache_url, vary, request.headers) if vary else cache_url
+
+        write: Callable[[], None]
+        if (
+            self.writer is not None
+            and body is None
+            and not isinstance(self.cache, SeparateBodyBaseCache)
+        ):
+            # The serializer has to read the body from the response, which is
+            # about to be handed back to the caller, so serialize right away.
+            with self._timer("serialize"):
+                data = self.serializer.dumps(request, response, body)
+            write = functools.partial(self.cache.set, key, data, expires=expires_time)
+        else:
+            write = functools.partial(
+                self._write, key, request, response, body, expires_time
+            )
+
+        # One job, so the entry and the index are never stored apart.
+        job = functools.partial(self._store, cache_url, vary, key, write, expires_time)
+        if self.writer is None:
+            job()
+        else:
+            self.writer.submit(job)
+
+    def _store(
+        self,
+        cache_url: str,
+        vary: tuple[str, ...],
+        key: str,
+        write: Callable[[], None],
+        expires_time: int | None,
+    ) -> None:
+        """
+        Run ``write``, which stores a response under ``key``, and bring the
+        vary index under ``cache_url`` up to date: add the variant to it, or
+        if the response doesn't vary, delete the variants it replaces.
         """
+        if vary:
+            write()
+            self._write_vary_index(cache_url, vary, key, expires_time)
+            return
+        with self._timer("backend_get"):
+            index = loads_vary_index(self.cache.get(cache_url))
+        write()
+        if index is not None:
+            with self._timer("backend_delete"):
+                for variant in index[1]:
+                    self.cache.delete(variant)
+
+    def _write(
+        self,
+        cache_url: str,
+        request: PreparedRequest,
+        response: HTTPResponse,
+        body: bytes | None = None,
+        expires_time: int | None = None,
+    ) -> None:
         if isinstance(self.cache, SeparateBodyBaseCache):
             # We pass in the body separately; just put a placeholder empty
             # string in the metadata.
-            self.cache.set(
-                cache_url,
-                self.serializer.dumps(request, response, b""),
-                expires=expires_time,
-            )
-            # body is None can happen when, for example, we're only updating
-            # headers, as is the case in update_cached_response().
-            if body is not None:
-                self.cache.set_body(cache_url, body)
+            with self._timer("serialize"):
+                data = self.serializer.dumps(request, response, b"")
+            with self._timer("backend_set"):
+                self.cache.set(cache_url, data, expires=expires_time)
+                # body is None can happen when, for example, we're only
+                # updating headers, as is the case in update_cached_response().
+                if body is not None:
+                    self.cache.set_body(cache_url, body)
         else:
-            self.cache.set(
-                cache_url,
-                self.serializer.dumps(request, response, body),
-                expires=expires_time,
+            with self._timer("serialize"):
+                data = self.serializer.dumps(request, response, body)
+            with self._timer("backend_set"):
+                self.cache.set(cache_url, data, expires=expires_time)
+
+    def _write_vary_index(
+        self,
+        cache_url: str,
+        vary: tuple[str, ...],
+        variant: str,
+        expires_time: int | None = None,
+    ) -> None:
+        with self._timer("backend_get"):
+            index_data = self.cache.get(cache_url)
+        index, dropped = self._update_vary_index(index_data, vary, variant)
+        with self._timer("backend_set"):
+            for key in dropped:
+                self.cache.delete(key)
+            self.cache.set(cache_url, index, expires=expires_time)
+
+    def _cache_delete(self, cache_url: str) -> None:
+        self._delete_entry(cache_url)
+        if self.listener is not None:
+            self.listener.purged(cache_url)
+        if self.writer is not None:
+            # Delete again once the writes queued so far are done, so none of
+            # them brings the entry back.
+            self.writer.submit(
+                functools.partial(self._delete_entry, cache_url), required=True
             )
 
+    def _delete_entry(self, key: str) -> None:
+        """Delete the entry under ``key``, and all variants it indexes."""
+        self._remember_vary(key, None)
+        with self._timer("backend_delete"):
+            index = loads_vary_index(self.cache.get(key))
+            if index is not None:
+                for variant in index[1]:
+                    self.cache.delete(variant)
+            self.cache.delete(key)
+
     def cache_response(
         self,
         request: PreparedRequest,
@@ -345,6 +810,38 @@ class CacheController:
         else:
             response = response_or_ref
 
+        with self._timer("store"):
+            plan = self._plan_cache_response(request, response, body, status_codes)
+            if plan is None:
+                return
+
+            if not plan.store:
+                # A queued write may not have reached the cache yet.
+                if self.writer is not None or self.cache.get(plan.cache_url):
+                    logger.debug('Purging existing cache entry to honor "no-store"')
+                    self._cache_delete(plan.cache_url)
+                return
+
+            if self.listener is not None:
+                self.listener.stored(request, plan.cache_url)
+            self._cache_set(
+                plan.cache_url, request, response, plan.body, plan.expires_time
+            )
+
+    def _plan_cache_response(
+        self,
+        request: PreparedRequest,
+        response: HTTPResponse,
+        body: bytes | None = None,
+        status_codes: Collection[int] | None = None,
+        notify: bool = True,
+    ) -> StorePlan | None:
+        """
+        Decide what caching ``response`` calls for, without touching the
+        cache. Returns None when nothing should be done. With ``notify``
+        false, the listener isn't told why a response can't be stored.
+        """
+        uncacheable = self._uncacheable if notify else _ignore_uncacheable
         # From httplib2: Don't cache 206's since we aren't going to
         #                handle byte range requests
         cacheable_status_codes = status_codes or self.cacheable_status_codes
@@ -352,15 +849,15 @@ class CacheController:
             logger.debug(
                 "Status code %s not in %s", response.status, cacheable_status_codes
             )
-            return
+            uncacheable(request, "status")
+            return None
 
         response_headers: CaseInsensitiveDict[str] = CaseInsensitiveDict(
             response.headers
         )
 
         if "date" in response_headers:
-            time_tuple = parsedate_tz(response_headers["date"])
-            date = calendar.timegm(time_tuple[:6]) if time_tuple is not None else 0
+            date = parse_http_date(response_headers["date"]) or 0
         else:
             date = 0
 
@@ -374,13 +871,14 @@ class CacheController:
             and response_headers["content-length"].isdigit()
             and int(response_headers["content-length"]) != len(body)
         ):
-            return
+            uncacheable(request, "size-mismatch")
+            return None
 
         cc_req = self.parse_cache_control(request.headers)
         cc = self.parse_cache_control(response_headers)
 
         assert request.url is not None
-        cache_url = self.cache_url(request.url)
+        cache_url = self.cache_key(request.url)
         logger.debug('Updating cache with response from "%s"', cache_url)
 
         # Delete it from the cache if we happen to have it stored there
@@ -391,11 +889,9 @@ class CacheController:
         if "no-store" in cc_req:
             no_store = True
             logger.debug('Request header has "no-store"')
-        if no_store and self.cache.get(cache_url):
-            logger.debug('Purging existing cache entry to honor "no-store"')
-            self.cache.delete(cache_url)
         if no_store:
-            return
+            uncacheable(request, "no-store")
+            return StorePlan(cache_url, store=False)
 
         # https://tools.ietf.org/html/rfc7234#section-4.1:
         # A Vary header field-value of "*" always fails to match.
@@ -404,56 +900,49 @@ class CacheController:
         # so storing it can be avoided.
         if "*" in response_headers.get("vary", ""):
             logger.debug('Response header has "Vary: *"')
-            return
+            uncacheable(request, "vary-star")
+            return None
 
         # If we've been given an etag, then keep the response
         if self.cache_etags and "etag" in response_headers:
             expires_time = 0
             if response_headers.get("expires"):
-                expires = parsedate_tz(response_headers["expires"])
+                expires = parse_http_date(response_headers["expires"])
                 if expires is not None:
-                    expires_time = calendar.timegm(expires[:6]) - date
+                    expires_time = expires - date
 
-            expires_time = max(expires_time, 14 * 86400)
+            expires_time = max(expires_time, ETAG_MIN_EXPIRY)
 
             logger.debug(f"etag object cached for {expires_time} seconds")
             logger.debug("Caching due to etag")
-            self._cache_set(cache_url, request, response, body, expires_time)
+            return StorePlan(cache_url, True, body, expires_time)
 
         # Add to the cache any permanent redirects. We do this before looking
         # that the Date headers.
         elif int(response.status) in PERMANENT_REDIRECT_STATUSES:
             logger.debug("Caching permanent redirect")
-            self._cache_set(cache_url, request, response, b"")
+            return StorePlan(cache_url, True, b"")
 
         # Add to the cache if the response headers demand it. If there
         # is no date header then we can't do anything about expiring
         # the cache.
         elif "date" in response_headers:
-            time_tuple = parsedate_tz(response_headers["date"])
-            if time_tuple is None:
-                return
-            date = calendar.timegm(time_tuple[:6])
+            if parse_http_date(response_headers["date"]) is None:
+                uncacheable(request, "invalid-date")
+                return None
             # cache when there is a max-age > 0
             max_age = cc.get("max-age")
             if max_age is not None and max_age > 0:
                 logger.debug("Caching b/c date exists and max-age > 0")
-                expires_time = max_age
-                self._cache_set(
-                    cache_url,
-                    request,
-                    response,
-                    body,
-                    expires_time,
-                )
+                return StorePlan(cache_url, True, body, max_age)
 
             # If the request can expire, it means we should cache it
             # in the meantime.
             elif "expires" in response_headers:
                 if response_headers["expires"]:
-                    expires = parsedate_tz(response_headers["expires"])
+                    expires = parse_http_date(response_headers["expires"])
                     if expires is not None:
-                        expires_time = calendar.timegm(expires[:6]) - date
+                        expires_time = expires - date
                     else:
                         expires_time = None
 
@@ -462,13 +951,14 @@ class CacheController:
                             expires_time
                         )
                     )
-                    self._cache_set(
-                        cache_url,
-                        request,
-                        response,
-                        body,
-                        expires_time,
-                    )
+                    return StorePlan(cache_url, True, body, expires_time)
+
+        uncacheable(request, "no-freshness")
+        return None
+
+    def _uncacheable(self, request: PreparedRequest, reason: str) -> None:
+        if self.listener is not None:
+            self.listener.uncacheable(request, reason)
 
     def update_cached_response(
         self, request: PreparedRequest, response: HTTPResponse
@@ -479,14 +969,31 @@ class CacheController:
         This should only ever be called when we've sent an ETag and
         gotten a 304 as the response.
         """
-        assert request.url is not None
-        cache_url = self.cache_url(request.url)
-        cached_response = self._load_from_cache(request)
+        with self._timer("revalidate"):
+            assert request.url is not None
+            cache_url = self.cache_key(request.url)
+            cached_response = self._load_from_cache(request)
+
+            if not cached_response:
+                # we didn't have a cached response
+                return response
 
-        if not cached_response:
-            # we didn't have a cached response
-            return response
+            self._merge_not_modified(cached_response, response)
+            if self.listener is not None:
+                self.listener.revalidated(request)
 
+            # update our cache
+            self._cache_set(cache_url, request, cached_response)
+
+            return cached_response
+
+    def _merge_not_modified(
+        self, cached_response: HTTPResponse, response: HTTPResponse
+    ) -> None:
+        """
+        Update ``cached_response`` in place with the headers of the 304
+        ``response`` that revalidated it.
+        """
         # Lets update our headers with the headers from the new request:
         # http://tools.ietf.org/html/draft-ietf-httpbis-p4-conditional-26#section-4.1
         #
@@ -506,8 +1013,3 @@ class CacheController:
 
         # we want a 200 b/c we have content via the cache
         cached_response.status = 200
-
-        # update our cache
-        self._cache_set(cache_url, request, cached_response)
-
-        return cached_response
@@ -4,16 +4,40 @@
 from __future__ import annotations
 
 import calendar
+import fnmatch
+import json
+import logging
+import os
+import tempfile
 import time
+import zlib
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from email.utils import formatdate, parsedate, parsedate_tz
-from typing import TYPE_CHECKING, Any, Mapping
+from email.utils import formatdate
+from threading import Lock
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Collection,
+    Iterable,
+    Mapping,
+    MutableMapping,
+    NamedTuple,
+    Sequence,
+)
+from urllib.parse import urlsplit
+
+from cachecontrol._httpdate import parse_http_date
+from cachecontrol.controller import CacheController, _parse_cache_control
 
 if TYPE_CHECKING:
+    from requests import PreparedRequest
     from urllib3 import HTTPResponse
 
 TIME_FMT = "%a, %d %b %Y %H:%M:%S GMT"
 
+logger = logging.getLogger(__name__)
+
 
 def expire_after(delta: timedelta, date: datetime | None = None) -> datetime:
     date = date or datetime.now(timezone.utc)
@@ -56,6 +80,16 @@ class BaseHeuristic:
 
         return response
 
+    def apply_to(
+        self, request: PreparedRequest, response: HTTPResponse
+    ) -> HTTPResponse:
+        """
+        Like ``apply``, for heuristics that also need the request the
+        response answers. This is what the adapter calls; by default it
+        calls ``apply``.
+        """
+        return self.apply(response)
+
 
 class OneDayCache(BaseHeuristic):
     """
@@ -64,13 +98,15 @@ class OneDayCache(BaseHeuristic):
     """
 
     def update_headers(self, response: HTTPResponse) -> dict[str, str]:
-        headers = {}
+        headers: dict[str, str] = {}
 
         if "expires" not in response.headers:
-            date = parsedate(response.headers["date"])
+            date = parse_http_date(response.headers["date"])
+            if date is None:
+                return headers
             expires = expire_after(
                 timedelta(days=1),
-                date=datetime(*date[:6], tzinfo=timezone.utc),  # type: ignore[index,misc]
+                date=datetime.fromtimestamp(date, tz=timezone.utc),
             )
             headers["expires"] = datetime_to_header(expires)
             headers["cache-control"] = "public"
@@ -136,16 +172,14 @@ class LastModified(BaseHeuristic):
         if "date" not in headers or "last-modified" not in headers:
             return {}
 
-        time_tuple = parsedate_tz(headers["date"])
-        assert time_tuple is not None
-        date = calendar.timegm(time_tuple[:6])
-        last_modified = parsedate(headers["last-modified"])
-        if last_modified is None:
+        date = parse_http_date(headers["date"])
+        last_modified = parse_http_date(headers["last-modified"])
+        if date is None or last_modified is None:
             return {}
 
         now = time.time()
         current_age = max(0, now - date)
-        delta = date - calendar.timegm(last_modified)
+        delta = date - last_modified
         freshness_lifetime = max(0, min(delta / 10, 24 * 3600))
         if freshness_lifetime <= current_age:
             return {}
@@ -155,3 +189,365 @@ class LastModified(BaseHeuristic):
 
     def warning(self, resp: HTTPResponse) -> str | None:
         return None
+
+
+def _has_freshness(headers: Mapping[str, str]) -> bool:
+    """Whether the response says how long it stays fresh."""
+    if "expires" in headers:
+        return True
+    cc = _parse_cache_control(headers.get("cache-control", ""))
+    return "max-age" in cc or "s-maxage" in cc
+
+
+def _rewrite_cache_control(
+    headers: MutableMapping[str, str], drop: Collection[str], ttl: int | None = None
+) -> None:
+    """
+    Remove the ``drop`` directives from the Cache-Control header, and give
+    it a ``max-age`` of ``ttl``, if any.
+    """
+    directives = [
+        directive.strip()
+        for directive in headers.get("cache-control", "").split(",")
+        if directive.strip() and directive.split("=")[0].strip().lower() not in drop
+    ]
+    if ttl is not None:
+        directives.append(f"max-age={ttl}")
+        if "date" not in headers:
+            headers["date"] = formatdate(usegmt=True)
+    if directives:
+        headers["cache-control"] = ", ".join(directives)
+    else:
+        headers.pop("cache-control", None)
+
+
+def _is_state_entry(entry: Any) -> bool:
+    """Whether ``entry`` is a ``[ttl, unchanged, changed, checksum]``."""
+    if not isinstance(entry, list) or len(entry) != 4:
+        return False
+    ttl, unchanged, changed, checksum = entry
+    return (
+        isinstance(ttl, (int, float))
+        and isinstance(unchanged, int)
+        and isinstance(changed, int)
+        and (checksum is None or isinstance(checksum, int))
+    )
+
+
+class AdaptiveTTL(BaseHeuristic):
+    """
+    Learn how often each URL changes, and give its responses a freshness
+    lifetime to match, between ``min_ttl`` and ``max_ttl`` seconds.
+
+    A resource is seen unchanged when a revalidation returns 304, or when
+    a new response has the same ETag or Last-Modified as the one before;
+    each time, its lifetime grows by a factor ``grow``. When a
+    revalidation returns new content, or the validator differs, it
+    shrinks by a factor ``shrink``. New resources start at
+    ``initial_ttl``. URLs matching one of the glob ``patterns`` share the
+    lifetime of the first pattern they match, learned from their 304s and
+    changed revalidations.
+
+    Responses that have their own lifetime (``max-age``, ``s-maxage`` or
+    ``Expires``) are left alone, unless ``override`` is set. The lifetime
+    is given as a ``max-age``, which a 304 also extends the cached
+    response with.
+
+    State is kept for at most ``max_entries`` keys, forgetting the least
+    recently used ones. With ``path``, it is loaded from that JSON file,
+    and saved to it by ``save()`` and at most every ``save_interval``
+    seconds as responses come in.
+    """
+
+    # Statuses worth learning from; the controller stores the others
+    # rarely, if ever.
+    statuses = frozenset([200, 203, 300, 301, 304])
+
+    def __init__(
+        self,
+        min_ttl: int = 60,
+        max_ttl: int = 86400,
+        initial_ttl: int = 300,
+        grow: float = 2.0,
+        shrink: float = 0.5,
+        patterns: Sequence[str] = (),
+        override: bool = False,
+        path: str | os.PathLike[str] | None = None,
+        max_entries: int = 10000,
+        save_interval: float = 60.0,
+    ) -> None:
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.initial_ttl = initial_ttl
+        self.grow = grow
+        self.shrink = shrink
+        self.patterns = list(patterns)
+        self.override = override
+        self.path = path
+        self.max_entries = max_entries
+        self.save_interval = save_interval
+        self.lock = Lock()
+        # key -> [ttl, unchanged count, changed count, validator checksum]
+        self._entries: OrderedDict[str, list[Any]] = OrderedDict()
+        self._saved_at = time.monotonic()
+        if path is not None:
+            self._load(path)
+
+    def key(self, url: str) -> tuple[str, bool]:
+        """The key ``url`` is tracked under, and whether it is a pattern."""
+        for pattern in self.patterns:
+            if fnmatch.fnmatchcase(url, pattern):
+                return pattern, True
+        return CacheController.cache_url(url), False
+
+    def ttl(self, url: str) -> int | None:
+        """The lifetime learned for ``url``, if any."""
+        with self.lock:
+            entry = self._entries.get(self.key(url)[0])
+        return None if entry is None else int(entry[0])
+
+    def apply(self, response: HTTPResponse) -> HTTPResponse:
+        # Without the request, there is no telling which URL this is.
+        return response
+
+    def apply_to(
+        self, request: PreparedRequest, response: HTTPResponse
+    ) -> HTTPResponse:
+        if request.url is None or response.status not in self.statuses:
+            return response
+        headers = response.headers
+        key, is_pattern = self.key(request.url)
+
+        if response.status != 304 and not self.override and _has_freshness(headers):
+            with self.lock:
+                self._entries.pop(key, None)
+            return response
+
+        validator = headers.get("etag") or headers.get("last-modified")
+        # Validators of different URLs can't be compared.
+        checksum = (
+            zlib.crc32(validator.encode()) if validator and not is_pattern else None
+        )
+        revalidation = (
+            "if-none-match" in request.headers or "if-modified-since" in request.headers
+        )
+
+        with self.lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                if response.status == 304:
+                    # Unknown, so possibly stored with a lifetime of its own.
+                    return response
+                entry = [self.initial_ttl, 0, 0, None]
+            elif response.status == 304:
+                self._observe(entry, changed=False)
+            elif revalidation:
+                self._observe(entry, changed=True)
+            elif checksum is not None and entry[3] is not None:
+                self._observe(entry, changed=checksum != entry[3])
+            if response.status != 304 and checksum is not None:
+                entry[3] = checksum
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            ttl = int(entry[0])
+
+        self._set_max_age(response, ttl)
+        if self.path is not None and (
+            time.monotonic() - self._saved_at >= self.save_interval
+        ):
+            self.save()
+        return response
+
+    def _observe(self, entry: list[Any], changed: bool) -> None:
+        # Must be called with the lock held.
+        if changed:
+            entry[0] = max(self.min_ttl, entry[0] * self.shrink)
+            entry[2] += 1
+        else:
+            entry[0] = min(self.max_ttl, entry[0] * self.grow)
+            entry[1] += 1
+
+    def _set_max_age(self, response: HTTPResponse, ttl: int) -> None:
+        _rewrite_cache_control(response.headers, ("max-age", "s-maxage"), ttl)
+        if self.override:
+            response.headers.pop("expires", None)
+
+    def _load(self, path: str | os.PathLike[str]) -> None:
+        try:
+            with open(path) as f:
+                state = json.load(f)
+            entries: OrderedDict[Any, Any] = OrderedDict(state["entries"])
+            for key, entry in entries.items():
+                if not (isinstance(key, str) and _is_state_entry(entry)):
+                    raise ValueError(f"Invalid entry for {key!r}")
+        except FileNotFoundError:
+            return
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring invalid AdaptiveTTL state in %s", path)
+            return
+        self._entries = entries
+
+    def save(self) -> None:
+        """Write the state to ``path``."""
+        if self.path is None:
+            return
+        with self.lock:
+            state = {"version": 1, "entries": list(self._entries.items())}
+            self._saved_at = time.monotonic()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f, separators=(",", ":"))
+            os.replace(name, self.path)
+        except BaseException:
+            os.unlink(name)
+            raise
+
+
+_GLOB_CHARS = "*?["
+
+
+class Rule(NamedTuple):
+    """
+    A caching policy for the responses it matches, for ``RuleHeuristic``.
+
+    A rule matches requests to ``host`` (any host if None; ``*.example.com``
+    for its subdomains) whose path starts with ``path``, or matches it as a
+    glob pattern if it has ``*``, ``?`` or ``[``. ``methods``,
+    ``statuses`` and ``content_types`` (glob patterns, e.g. ``image/*``)
+    narrow it down further when given.
+
+    What it does, in this order: ``never_cache`` marks the response
+    ``no-store``; ``ignore_no_cache`` removes ``no-cache`` and
+    ``no-store``; ``ttl`` makes the response fresh for that many seconds,
+    replacing its ``max-age``, ``s-maxage`` and ``Expires`` and removing
+    ``no-cache`` and ``no-store``; and ``headers`` are set on the response.
+    """
+
+    host: str | None = None
+    path: str = "/"
+    methods: Collection[str] | None = None
+    statuses: Collection[int] | None = None
+    content_types: Collection[str] | None = None
+    never_cache: bool = False
+    ignore_no_cache: bool = False
+    ttl: int | None = None
+    headers: Mapping[str, str] | None = None
+
+    def matches_response(self, method: str, status: int, content_type: str) -> bool:
+        return (
+            (self.methods is None or method in self.methods)
+            and (self.statuses is None or status in self.statuses)
+            and (
+                self.content_types is None
+                or any(
+                    fnmatch.fnmatchcase(content_type, pattern)
+                    for pattern in self.content_types
+                )
+            )
+        )
+
+
+class _TrieNode:
+    __slots__ = ("children", "rules")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        # (position in the rule list, rule, path glob pattern or None)
+        self.rules: list[tuple[int, Rule, str | None]] = []
+
+
+class RuleHeuristic(BaseHeuristic):
+    """
+    Apply the first of ``rules`` that matches each response.
+
+    The rules are compiled into a dict of hosts, each with a trie of path
+    prefixes, so finding the rules for a response takes time in proportion
+    to the length of its host and path, however many rules there are.
+    Glob paths are filed under the part before their first wildcard.
+    """
+
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        self.rules = list(rules)
+        self._any_host = _TrieNode()
+        self._hosts: dict[str, _TrieNode] = {}
+        for index, rule in enumerate(self.rules):
+            if rule.host is None:
+                node = self._any_host
+            else:
+                node = self._hosts.setdefault(rule.host.lower(), _TrieNode())
+            cut = min(
+                (i for i in map(rule.path.find, _GLOB_CHARS) if i != -1),
+                default=None,
+            )
+            glob = None if cut is None else rule.path
+            for char in rule.path[:cut]:
+                node = node.children.setdefault(char, _TrieNode())
+            node.rules.append((index, rule, glob))
+
+    def _roots(self, host: str) -> Iterable[_TrieNode]:
+        root = self._hosts.get(host)
+        if root is not None:
+            yield root
+        labels = host.split(".")
+        for i in range(1, len(labels)):
+            root = self._hosts.get("*." + ".".join(labels[i:]))
+            if root is not None:
+                yield root
+        yield self._any_host
+
+    def match(self, request: PreparedRequest, response: HTTPResponse) -> Rule | None:
+        """The rule that applies to ``response``, if any."""
+        if request.url is None:
+            return None
+        url = urlsplit(request.url)
+        path = url.path or "/"
+        method = request.method or "GET"
+        content_type = (
+            response.headers.get("content-type", "").split(";")[0].strip().lower()
+        )
+        best: tuple[int, Rule] | None = None
+        for root in self._roots(url.hostname or ""):
+            node: _TrieNode | None = root
+            depth = 0
+            while node is not None:
+                for index, rule, glob in node.rules:
+                    if (
+                        (best is None or index < best[0])
+                        and (glob is None or fnmatch.fnmatchcase(path, glob))
+                        and rule.matches_response(method, response.status, content_type)
+                    ):
+                        best = (index, rule)
+                if depth == len(path):
+                    break
+                node = node.children.get(path[depth])
+                depth += 1
+        return None if best is None else best[1]
+
+    def apply(self, response: HTTPResponse) -> HTTPResponse:
+        # Rules match on the request URL, which the response doesn't have.
+        return response
+
+    def apply_to(
+        self, request: PreparedRequest, response: HTTPResponse
+    ) -> HTTPResponse:
+        rule = self.match(request, response)
+        if rule is None:
+            return response
+        headers = response.headers
+        if rule.never_cache:
+            headers["cache-control"] = "no-store"
+            headers.pop("expires", None)
+        if rule.ignore_no_cache:
+            _rewrite_cache_control(headers, ("no-cache", "no-store"))
+            headers.pop("pragma", None)
+        if rule.ttl is not None:
+            _rewrite_cache_control(
+                headers, ("max-age", "s-maxage", "no-cache", "no-store"), rule.ttl
+            )
+            headers.pop("expires", None)
+        if rule.headers:
+            headers.update(rule.headers)
+        return response
@@ -0,0 +1,138 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Cache keys that treat equivalent URLs as the same resource.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+from collections import defaultdict
+from fnmatch import fnmatchcase
+from typing import Collection, Iterable, NamedTuple
+
+from cachecontrol.controller import parse_uri
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+# Parameters that only identify the visitor or the campaign they came from.
+TRACKING_PARAMS = ("utm_*", "gclid", "fbclid", "msclkid", "mc_cid", "mc_eid")
+
+_PERCENT_ENCODED = re.compile(r"%[0-9a-fA-F]{2}")
+_UNRESERVED = frozenset(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~"
+)
+
+
+def _normalize_percent_encoding(match: re.Match[str]) -> str:
+    # RFC 3986, section 6.2.2: decode unreserved characters and use
+    # uppercase hex digits for everything else.
+    char = chr(int(match.group(0)[1:], 16))
+    return char if char in _UNRESERVED else match.group(0).upper()
+
+
+class CacheKeyBuilder:
+    """
+    Build cache keys from URLs, for the ``key_builder`` argument of
+    ``CacheController``.
+
+    Besides what ``CacheController.cache_url`` does (lowercasing the scheme
+    and host, dropping the fragment), this can:
+
+    * ``sort_query``: order query parameters by name, keeping the order of
+      repeated parameters.
+    * ``drop_params``: remove query parameters whose name matches one of
+      these glob patterns, such as ``TRACKING_PARAMS``.
+    * ``normalize_percent_encoding``: use uppercase hex digits in
+      percent-encodings, and decode the ones of unreserved characters.
+    * ``remove_default_port``: drop ``:80`` from http and ``:443`` from
+      https URLs.
+
+    Keys are remembered for the last ``cache_size`` distinct URLs.
+    """
+
+    def __init__(
+        self,
+        sort_query: bool = True,
+        drop_params: Collection[str] = (),
+        normalize_percent_encoding: bool = True,
+        remove_default_port: bool = True,
+        cache_size: int = 4096,
+    ) -> None:
+        self.sort_query = sort_query
+        self.drop_params = tuple(drop_params)
+        self.normalize_percent_encoding = normalize_percent_encoding
+        self.remove_default_port = remove_default_port
+        self._build = functools.lru_cache(maxsize=cache_size)(self.build)
+
+    def __call__(self, url: str) -> str:
+        return self._build(url)
+
+    def _drop(self, param: str) -> bool:
+        name = param.split("=", 1)[0]
+        return any(fnmatchcase(name, pattern) for pattern in self.drop_params)
+
+    def build(self, url: str) -> str:
+        """Build the key for ``url``, without memoization."""
+        (scheme, authority, path, query, fragment) = parse_uri(url)
+        if not scheme or not authority:
+            raise Exception("Only absolute URIs are allowed. uri = %s" % url)
+
+        scheme = scheme.lower()
+        authority = authority.lower()
+        if self.remove_default_port:
+            default = ":" + DEFAULT_PORTS.get(scheme, "")
+            if authority.endswith(default) and default != ":":
+                authority = authority[: -len(default)]
+
+        path = path or "/"
+        if self.normalize_percent_encoding:
+            path = _PERCENT_ENCODED.sub(_normalize_percent_encoding, path)
+
+        if query:
+            params = [p for p in query.split("&") if p]
+            if self.drop_params:
+                params = [p for p in params if not self._drop(p)]
+            if self.normalize_percent_encoding:
+                params = [
+                    _PERCENT_ENCODED.sub(_normalize_percent_encoding, p) for p in params
+                ]
+            if self.sort_query:
+                params.sort(key=lambda p: p.split("=", 1)[0])
+            query = "&".join(params)
+
+        return scheme + "://" + authority + path + ("?" + query if query else "")
+
+
+class CollapseReport(NamedTuple):
+    """How a key builder would merge a set of existing keys."""
+
+    keys: int
+    new_keys: int
+    # new key -> the existing keys it replaces, for new keys replacing several
+    groups: dict[str, list[str]]
+
+    @property
+    def collapsed(self) -> int:
+        """How many existing keys would disappear."""
+        return self.keys - self.new_keys
+
+
+def collapse_report(keys: Iterable[str], builder: CacheKeyBuilder) -> CollapseReport:
+    """
+    Report which of the existing cache ``keys`` (URLs) ``builder`` would
+    merge. Keys that aren't absolute URLs are kept as they are.
+    """
+    existing = set(keys)
+    mapping: defaultdict[str, list[str]] = defaultdict(list)
+    for key in existing:
+        scheme, authority = parse_uri(key)[:2]
+        # build() rejects URLs that aren't absolute.
+        new_key = builder.build(key) if scheme and authority else key
+        mapping[new_key].append(key)
+
+    groups = {k: sorted(v) for k, v in mapping.items() if len(v) > 1}
+    return CollapseReport(len(existing), len(mapping), groups)
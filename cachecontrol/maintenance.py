@@ -0,0 +1,376 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Walk the records of an existing cache, one at a time, to report on them
+and clean them up.
+
+A ``CacheScanner`` lists the records of one kind of storage, by the names
+the storage uses for them: file paths for the ``FileCache`` layout, keys
+for Redis. Entries name the URL they were stored for only if they were
+stored with ``Serializer(record_url=True)``. For the others, a Redis cache
+without ``hash_keys`` still has it in the key; in a file cache, they can
+be counted and pruned, but not matched by URL.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import io
+import os
+import re
+from collections import Counter
+from typing import IO, TYPE_CHECKING, Any, Callable, Iterator, Mapping, NamedTuple
+from urllib.parse import urlsplit
+
+from requests.structures import CaseInsensitiveDict
+
+from cachecontrol.caches.redis_cache import _GLOB_SPECIAL, SeparateBodyRedisCache
+from cachecontrol.controller import (
+    ETAG_MIN_EXPIRY,
+    PERMANENT_REDIRECT_STATUSES,
+    CacheController,
+)
+from cachecontrol.serialize import VARY_INDEX_PREFIX, loads_raw
+from cachecontrol.stats import Histogram
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from redis import Redis
+
+# What a stored entry is good for.
+STATES = (
+    "fresh",  # it can be served as it is
+    "stale",  # it can be served once revalidated
+    "dead",  # it can't be used; lookups delete these
+)
+
+# Upper bounds of the age and time-to-live buckets, in seconds.
+AGE_BUCKETS = (
+    60,
+    600,
+    3600,
+    6 * 3600,
+    86400,
+    7 * 86400,
+    30 * 86400,
+    365 * 86400,
+)
+
+# The file names of FileCache entries: a SHA-224 in hex.
+_HASHED_NAME = re.compile(r"[0-9a-f]{56}\Z")
+
+# Only used for its freshness calculation.
+_controller = CacheController()
+
+
+class EntryInfo(NamedTuple):
+    """What a scan found out about one stored record."""
+
+    handle: str  # the scanner's name for the record
+    kind: str  # "entry", "vary-index" or "unknown"
+    size: int  # bytes stored, including a separately stored body
+    url: str | None = None
+    status: int = 0
+    headers: CaseInsensitiveDict[str] | None = None
+    age: float | None = None  # None without a valid Date
+    lifetime: int | None = None
+    state: str | None = None
+
+    @property
+    def ttl(self) -> float | None:
+        """Seconds until the entry goes stale, if it has a lifetime."""
+        if self.age is None or self.lifetime is None:
+            return None
+        return self.lifetime - self.age
+
+    @property
+    def host(self) -> str | None:
+        return urlsplit(self.url).hostname if self.url else None
+
+
+def describe(
+    handle: str, data: bytes, body_size: int = 0, url: str | None = None
+) -> EntryInfo:
+    """
+    Decode the record ``data`` stored under ``handle``. ``url`` is used for
+    an entry that doesn't record its own.
+    """
+    size = len(data) + body_size
+    if data.startswith(VARY_INDEX_PREFIX):
+        return EntryInfo(handle, "vary-index", size)
+    raw = loads_raw(data)
+    if raw is None:
+        return EntryInfo(handle, "unknown", size)
+    return describe_entry(handle, raw, size, url)
+
+
+def describe_entry(
+    handle: str, raw: Mapping[str, Any], size: int, url: str | None = None
+) -> EntryInfo:
+    """Describe an entry, decoded with ``loads_raw``."""
+    response = raw["response"]
+    status = int(response["status"])
+    headers: CaseInsensitiveDict[str] = CaseInsensitiveDict(response["headers"])
+    freshness = _controller._freshness(headers) if "date" in headers else None
+    age, lifetime = freshness if freshness is not None else (None, None)
+
+    # The same decision as CacheController._check_freshness.
+    if status in PERMANENT_REDIRECT_STATUSES or (
+        age is not None and lifetime is not None and lifetime > age
+    ):
+        state = "fresh"
+    elif "etag" in headers or ("date" in headers and freshness is None):
+        state = "stale"
+    else:
+        state = "dead"
+    return EntryInfo(
+        handle,
+        "entry",
+        size,
+        raw.get("url") or url,
+        status,
+        headers,
+        age,
+        lifetime,
+        state,
+    )
+
+
+def expires_in(info: EntryInfo) -> int | None:
+    """
+    The seconds left of the expiry the controller stores an entry like
+    ``info`` with, counted from its Date; zero or less once that is over.
+    None if it is kept without a limit, or its age isn't known.
+    """
+    if info.status in PERMANENT_REDIRECT_STATUSES or info.age is None:
+        return None
+    assert info.headers is not None
+    lifetime = info.lifetime or 0
+    if "etag" in info.headers:
+        lifetime = max(lifetime, ETAG_MIN_EXPIRY)
+    return int(lifetime - info.age)
+
+
+class CacheScanner:
+    """The records stored by some kind of cache."""
+
+    def handles(self) -> Iterator[str]:
+        """The names of the records, listed as they are found."""
+        raise NotImplementedError()
+
+    def read(self, handle: str) -> bytes | None:
+        raise NotImplementedError()
+
+    def body_size(self, handle: str) -> int:
+        """The size of the separately stored body, if there is one."""
+        return 0
+
+    def get_body(self, handle: str) -> IO[bytes] | None:
+        """The separately stored body, if there is one."""
+        return None
+
+    def url(self, handle: str) -> str | None:
+        """The URL in the name of the record, if it has one."""
+        return None
+
+    def delete(self, handle: str) -> None:
+        raise NotImplementedError()
+
+
+class FileCacheScanner(CacheScanner):
+    """
+    The records of a ``FileCache`` or ``SeparateBodyFileCache`` in
+    ``directory``, named by their paths.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = os.fspath(directory)
+
+    def handles(self, prefix: str = "") -> Iterator[str]:
+        """
+        The paths of the records, or only of those whose hashed names start
+        with ``prefix`` (up to five characters).
+        """
+        return self._walk(os.path.join(self.directory, *prefix), len(prefix))
+
+    def _walk(self, path: str, depth: int) -> Iterator[str]:
+        # FileCache._fn nests every entry five single-character
+        # directories deep.
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if depth < 5:
+                        if len(entry.name) == 1 and entry.is_dir():
+                            yield from self._walk(entry.path, depth + 1)
+                    elif _HASHED_NAME.match(entry.name) and entry.is_file():
+                        yield entry.path
+        except FileNotFoundError:
+            return
+
+    def read(self, handle: str) -> bytes | None:
+        try:
+            with open(handle, "rb") as fh:
+                return fh.read()
+        except FileNotFoundError:
+            return None
+
+    def body_size(self, handle: str) -> int:
+        try:
+            return os.stat(handle + ".body").st_size
+        except FileNotFoundError:
+            return 0
+
+    def get_body(self, handle: str) -> IO[bytes] | None:
+        try:
+            return open(handle + ".body", "rb")
+        except FileNotFoundError:
+            return None
+
+    def delete(self, handle: str) -> None:
+        for suffix in ("", ".body", ".lock", ".body.lock"):
+            try:
+                os.remove(handle + suffix)
+            except FileNotFoundError:
+                pass
+
+
+class RedisCacheScanner(CacheScanner):
+    """
+    The records of a ``RedisCache`` or ``SeparateBodyRedisCache`` whose keys
+    start with ``prefix``, named by their keys. Keys are listed with
+    ``SCAN``, ``batch_size`` at a time. Unless the cache hashes its keys
+    (``hash_keys``), they hold the URL of the entry.
+    """
+
+    body_suffix = SeparateBodyRedisCache.body_suffix
+
+    def __init__(
+        self,
+        conn: Redis[bytes],
+        prefix: str = "",
+        batch_size: int = 1000,
+        hash_keys: bool = False,
+    ) -> None:
+        self.conn = conn
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.hash_keys = hash_keys
+
+    def handles(self) -> Iterator[str]:
+        match = _GLOB_SPECIAL.sub(r"\\\1", self.prefix) + "*"
+        for key in self.conn.scan_iter(match=match, count=self.batch_size):
+            name = key.decode()
+            if not name.endswith(self.body_suffix):
+                yield name
+
+    def read(self, handle: str) -> bytes | None:
+        return self.conn.get(handle)
+
+    def body_size(self, handle: str) -> int:
+        size: int = self.conn.strlen(handle + self.body_suffix)  # type: ignore[no-untyped-call]
+        return size
+
+    def get_body(self, handle: str) -> IO[bytes] | None:
+        body = self.conn.get(handle + self.body_suffix)
+        return None if body is None else io.BytesIO(body)
+
+    def url(self, handle: str) -> str | None:
+        if self.hash_keys or not handle.startswith(self.prefix):
+            return None
+        # The cache key, without the "#vary=" suffix of a variant.
+        key, vary, _ = handle[len(self.prefix) :].rpartition("#vary=")
+        return key if vary else handle[len(self.prefix) :]
+
+    def delete(self, handle: str) -> None:
+        pipe = self.conn.pipeline(transaction=False)
+        pipe.delete(handle)
+        pipe.delete(handle + self.body_suffix)
+        pipe.execute()
+
+
+def scan(scanner: CacheScanner) -> Iterator[EntryInfo]:
+    """Describe the records of ``scanner``, one at a time."""
+    for handle in scanner.handles():
+        data = scanner.read(handle)
+        # It may have been deleted since it was listed.
+        if data is not None:
+            yield describe(handle, data, scanner.body_size(handle), scanner.url(handle))
+
+
+def url_matches(pattern: str) -> Callable[[EntryInfo], bool]:
+    """Select the entries whose URL matches the glob ``pattern``."""
+    return lambda info: info.url is not None and fnmatch.fnmatchcase(info.url, pattern)
+
+
+def delete_where(
+    scanner: CacheScanner,
+    predicate: Callable[[EntryInfo], bool],
+    dry_run: bool = False,
+) -> Iterator[EntryInfo]:
+    """
+    Delete the records of ``scanner`` that ``predicate`` selects, yielding
+    each as it goes. With ``dry_run``, only yield them.
+    """
+    for info in scan(scanner):
+        if predicate(info):
+            if not dry_run:
+                scanner.delete(info.handle)
+            yield info
+
+
+class CacheReport:
+    """Totals over the records of a scan, added one at a time."""
+
+    def __init__(self) -> None:
+        self.kinds: Counter[str] = Counter()
+        self.states: Counter[str] = Counter()
+        self.size = 0
+        self.host_sizes: Counter[str] = Counter()
+        self.host_entries: Counter[str] = Counter()
+        self.without_url = 0
+        self.ages = Histogram(AGE_BUCKETS)
+        # Of the fresh entries
+        self.ttls = Histogram(AGE_BUCKETS)
+
+    def add(self, info: EntryInfo) -> None:
+        self.kinds[info.kind] += 1
+        self.size += info.size
+        if info.kind != "entry":
+            return
+        assert info.state is not None
+        self.states[info.state] += 1
+        host = info.host
+        if host is None:
+            self.without_url += 1
+        else:
+            self.host_sizes[host] += info.size
+            self.host_entries[host] += 1
+        if info.age is not None:
+            self.ages.observe(info.age)
+        ttl = info.ttl
+        if info.state == "fresh" and ttl is not None:
+            self.ttls.observe(ttl)
+
+    def as_dict(self, top_hosts: int = 10) -> dict[str, Any]:
+        return {
+            "records": dict(self.kinds),
+            "entries": self.kinds["entry"],
+            "size": self.size,
+            "states": {state: self.states[state] for state in STATES},
+            "without_url": self.without_url,
+            "hosts": {
+                host: {"entries": self.host_entries[host], "size": size}
+                for host, size in self.host_sizes.most_common(top_hosts)
+            },
+            "ages": _buckets(self.ages),
+            "ttls": _buckets(self.ttls),
+        }
+
+
+def _buckets(histogram: Histogram) -> dict[str, int]:
+    """The count per bucket, labeled with its upper bound."""
+    bounds = [str(int(bound)) for bound in histogram.buckets] + ["+Inf"]
+    return dict(zip(bounds, histogram.counts))
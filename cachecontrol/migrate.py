@@ -0,0 +1,242 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Move the contents of a ``FileCache`` or ``SeparateBodyFileCache`` into
+another cache.
+
+The hashed directory tree is split into ``PARTITIONS`` by the first two
+characters of the hashes, and the partitions are migrated in parallel by a
+process pool. Each worker decodes its entries and stores them under the
+keys the target controller builds for their URLs, with what is left of
+their expiry. Vary indexes are rebuilt by the calling process at the end,
+so workers never update the same index at once.
+
+Entries stored without their URL (see ``Serializer``) keep the hash of
+their key instead, which a ``FileCache`` names its files by and a
+``RedisCache`` with ``hash_keys=True`` uses as the key. Vary indexes are
+copied the same way, so their variants can still be found.
+"""
+
+from __future__ import annotations
+
+import copy
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Callable, Collection, NamedTuple
+
+from cachecontrol.cache import SeparateBodyBaseCache
+from cachecontrol.caches.file_cache import _FileCacheMixin
+from cachecontrol.caches.redis_cache import _RedisCacheMixin
+from cachecontrol.controller import CacheController, _vary_names
+from cachecontrol.maintenance import FileCacheScanner, describe_entry, expires_in
+from cachecontrol.serialize import (
+    VARY_INDEX_PREFIX,
+    Serializer,
+    dumps_raw,
+    loads_raw,
+)
+from cachecontrol.snapshot import rebuild
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from cachecontrol.cache import BaseCache
+
+PARTITIONS = [f"{a:x}{b:x}" for a in range(16) for b in range(16)]
+
+# (cache_url, vary, variant key, expires) of a stored variant
+_Variant = tuple[str, tuple[str, ...], str, int | None]
+
+
+class MigrationProgress(NamedTuple):
+    """The totals so far, passed to the ``progress`` callback."""
+
+    partitions_done: int
+    partitions: int
+    entries: int  # migrated
+    skipped: int  # not selected, or expired
+    size: int  # bytes read, bodies included
+    elapsed: float
+    # Entries without a recorded URL that the target can't store under
+    # the hash of their key; these are skipped too.
+    without_url: int = 0
+
+    @property
+    def entries_per_second(self) -> float:
+        return self.entries / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.size / self.elapsed if self.elapsed else 0.0
+
+
+class _PartitionResult(NamedTuple):
+    entries: int
+    skipped: int
+    size: int
+    variants: list[_Variant]
+    without_url: int
+
+
+def _as_hashed(x: str) -> str:
+    return x
+
+
+def _by_hash(cache: BaseCache) -> BaseCache | None:
+    """
+    A copy of ``cache`` that takes the sha224 hashes of keys as its keys,
+    or None if ``cache`` doesn't store entries by the hash of their key.
+    """
+    if isinstance(cache, _FileCacheMixin):
+        cache = copy.copy(cache)
+        cache.encode = _as_hashed  # type: ignore[method-assign]
+    elif isinstance(cache, _RedisCacheMixin) and cache.hash_keys:
+        cache = copy.copy(cache)
+        cache.hash_keys = False
+    else:
+        return None
+    return cache
+
+
+def _migrate_partition(
+    directory: str,
+    prefix: str,
+    make_target: Callable[[], BaseCache],
+    key_builder: Callable[[str], str] | None,
+    states: Collection[str],
+) -> _PartitionResult:
+    """Migrate the entries whose hashed names start with ``prefix``."""
+    scanner = FileCacheScanner(directory)
+    controller = CacheController(
+        make_target(), key_builder=key_builder, serializer=Serializer(record_url=True)
+    )
+    by_hash = _by_hash(controller.cache)
+    entries = skipped = size = without_url = 0
+    variants: list[_Variant] = []
+    for handle in scanner.handles(prefix):
+        data = scanner.read(handle)
+        if data is None:
+            continue
+        body_size = scanner.body_size(handle)
+        size += len(data) + body_size
+        raw = loads_raw(data)
+        if raw is None:
+            if by_hash is not None and data.startswith(VARY_INDEX_PREFIX):
+                # The index of entries stored without their URL, which is
+                # only found under the hash of its key. Indexes of entries
+                # with a URL are rebuilt at the end, on top of this copy.
+                by_hash.set(os.path.basename(handle), data)
+            continue
+        info = describe_entry(handle, raw, len(data) + body_size)
+        expires = expires_in(info)
+        if info.state not in states or (expires is not None and expires <= 0):
+            skipped += 1
+            continue
+        if info.url is None and by_hash is None:
+            skipped += 1
+            without_url += 1
+            continue
+
+        body = raw["response"]["body"]
+        if not body and body_size:
+            body_file = scanner.get_body(handle)
+            if body_file is not None:
+                with body_file:
+                    body = body_file.read()
+        elif isinstance(body, str):
+            # See Serializer.prepare_response.
+            body = body.encode("utf8")
+
+        if info.url is None:
+            assert by_hash is not None
+            # The file is named by the hash of the key it was stored under.
+            hashed = os.path.basename(handle)
+            if isinstance(by_hash, SeparateBodyBaseCache):
+                raw["response"]["body"] = b""
+                by_hash.set(hashed, dumps_raw(raw), expires=expires)
+                by_hash.set_body(hashed, body)
+            else:
+                raw["response"]["body"] = body
+                by_hash.set(hashed, dumps_raw(raw), expires=expires)
+            entries += 1
+            continue
+
+        request, response = rebuild(raw, body, controller.serializer)
+        key = cache_url = controller.cache_key(info.url)
+        vary = _vary_names(response.headers)
+        if vary:
+            key = controller.variant_key(cache_url, vary, request.headers)
+            variants.append((cache_url, vary, key, expires))
+        controller._write(key, request, response, body, expires)
+        entries += 1
+    controller.cache.close()
+    return _PartitionResult(entries, skipped, size, variants, without_url)
+
+
+def migrate_file_cache(
+    directory: str | Path,
+    make_target: Callable[[], BaseCache],
+    key_builder: Callable[[str], str] | None = None,
+    states: Collection[str] = ("fresh", "stale"),
+    workers: int | None = None,
+    progress: Callable[[MigrationProgress], None] | None = None,
+) -> MigrationProgress:
+    """
+    Copy the entries of the file cache in ``directory`` whose state is one
+    of ``states`` into the cache ``make_target()`` returns.
+
+    ``make_target`` is called once in every worker process, so it must be
+    picklable, e.g. a class or a ``functools.partial`` of one. With
+    ``workers=1``, everything runs in this process. ``progress`` is called
+    with the totals whenever a partition is done.
+
+    Entries stored without their URL (see ``Serializer``) are copied
+    under the hash of their old key, when the target is a file cache or a
+    Redis cache with ``hash_keys=True``; the key builder isn't applied to
+    them. Otherwise they are skipped and counted in ``without_url``.
+    """
+    directory = os.fspath(directory)
+    migrate = functools.partial(
+        _migrate_partition,
+        directory,
+        make_target=make_target,
+        key_builder=key_builder,
+        states=tuple(states),
+    )
+    start = time.perf_counter()
+    totals = MigrationProgress(0, len(PARTITIONS), 0, 0, 0, 0.0)
+    variants: list[_Variant] = []
+
+    def add(result: _PartitionResult) -> None:
+        nonlocal totals
+        variants.extend(result.variants)
+        totals = MigrationProgress(
+            totals.partitions_done + 1,
+            totals.partitions,
+            totals.entries + result.entries,
+            totals.skipped + result.skipped,
+            totals.size + result.size,
+            time.perf_counter() - start,
+            totals.without_url + result.without_url,
+        )
+        if progress is not None:
+            progress(totals)
+
+    if workers == 1:
+        for prefix in PARTITIONS:
+            add(migrate(prefix))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(migrate, prefix) for prefix in PARTITIONS]
+            for future in as_completed(futures):
+                add(future.result())
+
+    controller = CacheController(make_target(), key_builder=key_builder)
+    for cache_url, vary, key, expires in variants:
+        controller._write_vary_index(cache_url, vary, key, expires)
+    controller.cache.close()
+    return totals._replace(elapsed=time.perf_counter() - start)
@@ -0,0 +1,138 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Revalidate frequently used cache entries before they expire.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import TYPE_CHECKING, Any
+
+from requests.structures import CaseInsensitiveDict
+
+if TYPE_CHECKING:
+    from requests import PreparedRequest
+    from urllib3 import HTTPResponse
+
+    from cachecontrol.adapter import CacheControlAdapter
+    from cachecontrol.serialize import CachedEntry
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRefresher:
+    """
+    Refresh hot cache entries on a background thread pool.
+
+    An entry is hot once it has been served from the cache ``min_hits``
+    times within ``window`` seconds. When a hot entry is served and it has
+    used up ``refresh_at`` of its freshness lifetime, it is revalidated in
+    the background, with the stored ETag and Last-Modified, so it is fresh
+    again before it expires and requests never wait for it.
+
+    Hit counts are kept for at most ``max_tracked`` URLs, forgetting the
+    least recently used ones.
+    """
+
+    def __init__(
+        self,
+        min_hits: int = 10,
+        window: float = 60.0,
+        refresh_at: float = 0.8,
+        max_workers: int = 2,
+        max_tracked: int = 10000,
+    ) -> None:
+        self.min_hits = min_hits
+        self.window = window
+        self.refresh_at = refresh_at
+        self.max_tracked = max_tracked
+        self.lock = Lock()
+        # cache_url -> (start of the current window, hits within it)
+        self._hits: OrderedDict[str, tuple[float, int]] = OrderedDict()
+        self._pending: set[str] = set()
+        self._closed = False
+        self.executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="cachecontrol-refresh"
+        )
+
+    def _count_hit(self, cache_url: str) -> int:
+        # Must be called with the lock held.
+        now = time.time()
+        start, hits = self._hits.pop(cache_url, (now, 0))
+        if now - start > self.window:
+            start, hits = now, 0
+        self._hits[cache_url] = (start, hits + 1)
+        if len(self._hits) > self.max_tracked:
+            self._hits.popitem(last=False)
+        return hits + 1
+
+    def _due(
+        self, adapter: CacheControlAdapter, response: HTTPResponse | CachedEntry
+    ) -> bool:
+        freshness = adapter.controller._freshness(CaseInsensitiveDict(response.headers))
+        if freshness is None:
+            return False
+        current_age, freshness_lifetime = freshness
+        return 0 < freshness_lifetime * self.refresh_at <= current_age
+
+    def record_hit(
+        self,
+        adapter: CacheControlAdapter,
+        request: PreparedRequest,
+        response: HTTPResponse | CachedEntry,
+        **send_kwargs: Any,
+    ) -> None:
+        """
+        Note that ``adapter`` answered ``request`` with the cached
+        ``response``, and schedule a refresh if it is due. ``send_kwargs``
+        are passed to ``adapter.send`` when refreshing.
+        """
+        assert request.url is not None
+        cache_url = adapter.controller.cache_key(request.url)
+        with self.lock:
+            if self._closed or cache_url in self._pending:
+                return
+            if self._count_hit(cache_url) < self.min_hits:
+                return
+            if not self._due(adapter, response):
+                return
+            self._pending.add(cache_url)
+
+        self.executor.submit(
+            self._refresh, adapter, cache_url, request.copy(), send_kwargs
+        )
+
+    def _refresh(
+        self,
+        adapter: CacheControlAdapter,
+        cache_url: str,
+        request: PreparedRequest,
+        send_kwargs: dict[str, Any],
+    ) -> None:
+        logger.debug('Refreshing "%s" in the background', cache_url)
+        try:
+            # Skip the (still fresh) cached response; the adapter then adds
+            # the conditional headers and updates the cache as usual.
+            request.headers["Cache-Control"] = "max-age=0"
+            resp = adapter.send(request, **send_kwargs)
+            # Reading the body is what stores a full response.
+            resp.content  # noqa: B018
+            resp.close()
+        except Exception:
+            logger.warning('Refreshing "%s" failed', cache_url, exc_info=True)
+        finally:
+            with self.lock:
+                self._pending.discard(cache_url)
+
+    def close(self, wait: bool = True) -> None:
+        """Stop refreshing, by default waiting for running refreshes."""
+        with self.lock:
+            self._closed = True
+        self.executor.shutdown(wait=wait)
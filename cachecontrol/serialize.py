@@ -4,7 +4,8 @@
 from __future__ import annotations
 
 import io
-from typing import IO, TYPE_CHECKING, Any, Mapping, cast
+from contextlib import nullcontext
+from typing import IO, TYPE_CHECKING, Any, Mapping, NamedTuple, Sequence, cast
 
 import msgpack
 from requests.structures import CaseInsensitiveDict
@@ -13,10 +14,108 @@ from urllib3 import HTTPResponse
 if TYPE_CHECKING:
     from requests import PreparedRequest
 
+VARY_INDEX_PREFIX = b"cc=vary,"
+
+
+def normalize_header_value(value: str | None) -> str | None:
+    """
+    Normalize a request header value for comparing it with the value a
+    varied response was stored for: whitespace around list items and
+    runs of whitespace don't matter.
+    """
+    if value is None:
+        return None
+    return ",".join(" ".join(item.split()) for item in value.split(","))
+
+
+def dumps_vary_index(vary: Sequence[str], variants: Sequence[str]) -> bytes:
+    """
+    Serialize the record stored under the primary key of a URL whose
+    responses vary on the header names ``vary``, listing the keys of its
+    ``variants``.
+    """
+    index = {"vary": list(vary), "variants": list(variants)}
+    return VARY_INDEX_PREFIX + cast(bytes, msgpack.dumps(index, use_bin_type=True))
+
+
+def loads_vary_index(data: bytes | None) -> tuple[tuple[str, ...], list[str]] | None:
+    """
+    Return the ``(vary, variants)`` of a record made by ``dumps_vary_index``,
+    or None if ``data`` is something else.
+    """
+    if not isinstance(data, bytes) or not data.startswith(VARY_INDEX_PREFIX):
+        return None
+    try:
+        index = msgpack.loads(data[len(VARY_INDEX_PREFIX) :], raw=False)
+    except ValueError:
+        return None
+    return tuple(index["vary"]), index["variants"]
+
+
+def loads_raw(data: bytes | None) -> dict[str, Any] | None:
+    """
+    Decode an entry made by ``Serializer.dumps`` into the dict it stores,
+    with its ``url`` (if it was stored with ``record_url``),
+    ``response`` and ``vary``, or return None if ``data`` is something else.
+    """
+    prefix = f"cc={Serializer.serde_version},".encode()
+    if not isinstance(data, bytes) or not data.startswith(prefix):
+        return None
+    try:
+        raw = msgpack.loads(data[len(prefix) :], raw=False)
+    except ValueError:
+        return None
+    return raw if isinstance(raw, dict) else None
+
+
+def dumps_raw(raw: Mapping[str, Any]) -> bytes:
+    """Encode a dict like the ones ``loads_raw`` returns back into an entry."""
+    prefix = f"cc={Serializer.serde_version},".encode()
+    return prefix + cast(bytes, msgpack.dumps(raw, use_bin_type=True))
+
+
+class CachedEntry(NamedTuple):
+    """A decoded cache entry, before any urllib3 response is built for it."""
+
+    status: int
+    headers: CaseInsensitiveDict[str]
+    body: bytes
+    version: int
+    reason: str
+    decode_content: bool
+
+    @property
+    def is_identity(self) -> bool:
+        """Whether the body is stored without any content-coding."""
+        return self.headers.get("content-encoding", "identity") == "identity"
+
+    def to_response(self) -> HTTPResponse:
+        return HTTPResponse(
+            body=io.BytesIO(self.body),
+            headers=self.headers,
+            status=self.status,
+            version=self.version,
+            reason=self.reason,
+            decode_content=self.decode_content,
+            preload_content=False,
+        )
+
 
 class Serializer:
+    """
+    Encode cache entries, and decode them.
+
+    With ``record_url``, entries also store the URL of the request, which
+    lets ``cachecontrol-admin`` and ``cachecontrol.maintenance`` find,
+    export and re-key them by URL. URLs are stored as they are, query
+    strings included, so it is off by default.
+    """
+
     serde_version = "4"
 
+    def __init__(self, record_url: bool = False) -> None:
+        self.record_url = record_url
+
     def dumps(
         self,
         request: PreparedRequest,
@@ -35,7 +134,7 @@ class Serializer:
             response._fp = io.BytesIO(body)  # type: ignore[assignment]
             response.length_remaining = len(body)
 
-        data = {
+        data: dict[str, Any] = {
             "response": {
                 "body": body,  # Empty bytestring if body is stored separately
                 "headers": {str(k): str(v) for k, v in response.headers.items()},
@@ -43,8 +142,12 @@ class Serializer:
                 "version": response.version,
                 "reason": str(response.reason),
                 "decode_content": response.decode_content,
-            }
+            },
         }
+        if self.record_url:
+            # Not needed to load the entry, but lets cache maintenance tools
+            # tell what it is; see cachecontrol.maintenance.
+            data["url"] = request.url
 
         # Construct our vary headers
         data["vary"] = {}
@@ -89,19 +192,9 @@ class Serializer:
         """Verify our vary headers match and construct a real urllib3
         HTTPResponse object.
         """
-        # Special case the '*' Vary value as it means we cannot actually
-        # determine if the cached response is suitable for this request.
-        # This case is also handled in the controller code when creating
-        # a cache entry, but is left here for backwards compatibility.
-        if "*" in cached.get("vary", {}):
+        if not self._vary_matches(request, cached):
             return None
 
-        # Ensure that the Vary headers for the cached response match our
-        # request
-        for header, value in cached.get("vary", {}).items():
-            if request.headers.get(header, None) != value:
-                return None
-
         body_raw = cached["response"].pop("body")
 
         headers: CaseInsensitiveDict[str] = CaseInsensitiveDict(
@@ -132,6 +225,65 @@ class Serializer:
 
         return HTTPResponse(body=body, preload_content=False, **cached["response"])
 
+    def _vary_matches(
+        self, request: PreparedRequest, cached: Mapping[str, Any]
+    ) -> bool:
+        # Special case the '*' Vary value as it means we cannot actually
+        # determine if the cached response is suitable for this request.
+        # This case is also handled in the controller code when creating
+        # a cache entry, but is left here for backwards compatibility.
+        if "*" in cached.get("vary", {}):
+            return False
+
+        # Ensure that the Vary headers for the cached response match our
+        # request
+        for header, value in cached.get("vary", {}).items():
+            if normalize_header_value(
+                request.headers.get(header, None)
+            ) != normalize_header_value(value):
+                return False
+
+        return True
+
+    def loads_entry(
+        self,
+        request: PreparedRequest,
+        data: bytes,
+        body_file: IO[bytes] | None = None,
+    ) -> CachedEntry | None:
+        """Like ``loads``, but return the decoded entry without building a
+        urllib3 HTTPResponse for it.
+        """
+        with body_file or nullcontext():
+            if not data or not data.startswith(f"cc={self.serde_version},".encode()):
+                return None
+
+            try:
+                cached = msgpack.loads(data[5:], raw=False)
+            except ValueError:
+                return None
+
+            if not self._vary_matches(request, cached):
+                return None
+
+            response = cached["response"]
+            headers: CaseInsensitiveDict[str] = CaseInsensitiveDict(response["headers"])
+            if headers.get("transfer-encoding", "") == "chunked":
+                headers.pop("transfer-encoding")
+
+            body = response["body"] if body_file is None else body_file.read()
+            if isinstance(body, str):
+                # See prepare_response.
+                body = body.encode("utf8")
+            return CachedEntry(
+                response["status"],
+                headers,
+                body,
+                response["version"],
+                response["reason"],
+                response["decode_content"],
+            )
+
     def _loads_v4(
         self,
         request: PreparedRequest,
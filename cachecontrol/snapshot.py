@@ -0,0 +1,202 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Snapshots of cache contents, to start a new cache warm without fetching
+everything again.
+
+A snapshot is a single stream: a magic line, then for every entry a
+length-prefixed msgpack header (the URL, the response without its body,
+the request headers it varies on and the body size) followed by the body.
+Entries are identified by URL rather than by cache key, so a snapshot can
+be imported into any cache, with any key builder.
+"""
+
+from __future__ import annotations
+
+import io
+import struct
+from typing import IO, TYPE_CHECKING, Any, Callable, Iterator, Mapping, NamedTuple
+
+import msgpack
+import requests
+
+from cachecontrol.maintenance import describe_entry, expires_in
+from cachecontrol.serialize import loads_raw
+
+if TYPE_CHECKING:
+    from requests import PreparedRequest
+    from urllib3 import HTTPResponse
+
+    from cachecontrol.controller import CacheController
+    from cachecontrol.maintenance import CacheScanner, EntryInfo
+    from cachecontrol.serialize import Serializer
+
+MAGIC = b"cachecontrol-snapshot 1\n"
+COPY_SIZE = 1024 * 1024
+
+_LENGTH = struct.Struct(">I")
+
+
+class SnapshotError(ValueError):
+    """The data isn't a snapshot, or it is cut short."""
+
+
+class SnapshotResult(NamedTuple):
+    entries: int  # exported or imported
+    skipped: int
+    size: int  # bytes of the bodies
+    # Skipped entries that were stored without a URL to export them by.
+    without_url: int = 0
+
+
+def _write_record(fp: IO[bytes], header: Mapping[str, Any]) -> None:
+    data = msgpack.dumps(header, use_bin_type=True)
+    fp.write(_LENGTH.pack(len(data)))
+    fp.write(data)
+
+
+def export_snapshot(
+    scanner: CacheScanner,
+    fp: IO[bytes],
+    predicate: Callable[[EntryInfo], bool] | None = None,
+) -> SnapshotResult:
+    """
+    Write the entries of ``scanner`` that ``predicate`` selects to ``fp``,
+    one at a time. Vary indexes are skipped, as importing rebuilds them,
+    and so are entries without a URL, either recorded or in the name the
+    scanner has for them.
+    """
+    fp.write(MAGIC)
+    entries = skipped = size = without_url = 0
+    for handle in scanner.handles():
+        data = scanner.read(handle)
+        raw = loads_raw(data)
+        if raw is None:
+            skipped += data is not None
+            continue
+        assert data is not None
+        info = describe_entry(
+            handle, raw, len(data) + scanner.body_size(handle), scanner.url(handle)
+        )
+        if info.url is None:
+            skipped += 1
+            without_url += 1
+            continue
+        if predicate is not None and not predicate(info):
+            skipped += 1
+            continue
+
+        body = raw["response"].pop("body")
+        if isinstance(body, str):
+            # See Serializer.prepare_response.
+            body = body.encode("utf8")
+        # An empty body in the entry may mean it is stored separately.
+        body_file = (None if body else scanner.get_body(handle)) or io.BytesIO(body)
+        with body_file:
+            # Measured on the open file, which a concurrent write replaces
+            # rather than changes.
+            body_size = body_file.seek(0, io.SEEK_END)
+            body_file.seek(0)
+            _write_record(
+                fp,
+                {
+                    "url": info.url,
+                    "response": raw["response"],
+                    "vary": raw.get("vary", {}),
+                    "body_size": body_size,
+                },
+            )
+            remaining = body_size
+            while remaining and (chunk := body_file.read(min(remaining, COPY_SIZE))):
+                fp.write(chunk)
+                remaining -= len(chunk)
+        entries += 1
+        size += body_size
+    return SnapshotResult(entries, skipped, size, without_url)
+
+
+def _read_exactly(fp: IO[bytes], size: int) -> bytes:
+    data = fp.read(size)
+    if len(data) != size:
+        raise SnapshotError("The snapshot is cut short")
+    return data
+
+
+def read_snapshot(fp: IO[bytes]) -> Iterator[tuple[dict[str, Any], bytes]]:
+    """The ``(header, body)`` of every entry in the snapshot ``fp``."""
+    if fp.read(len(MAGIC)) != MAGIC:
+        raise SnapshotError("Not a CacheControl snapshot")
+    while prefix := fp.read(_LENGTH.size):
+        if len(prefix) != _LENGTH.size:
+            raise SnapshotError("The snapshot is cut short")
+        (length,) = _LENGTH.unpack(prefix)
+        try:
+            header = msgpack.loads(_read_exactly(fp, length), raw=False)
+        except ValueError as e:
+            raise SnapshotError("Invalid entry header in the snapshot") from e
+        yield header, _read_exactly(fp, header["body_size"])
+
+
+def rebuild(
+    header: Mapping[str, Any], body: bytes, serializer: Serializer
+) -> tuple[PreparedRequest, HTTPResponse]:
+    """
+    A request and response like the ones an exported entry was stored for:
+    ``header`` is a snapshot header, or an entry decoded with ``loads_raw``.
+    """
+    vary = header.get("vary", {})
+    request = requests.Request(
+        "GET",
+        header["url"],
+        headers={name: value for name, value in vary.items() if value is not None},
+    ).prepare()
+    cached = {"response": dict(header["response"], body=b""), "vary": vary}
+    response = serializer.prepare_response(request, cached, io.BytesIO(body))
+    assert response is not None
+    return request, response
+
+
+def store_entry(
+    controller: CacheController,
+    header: Mapping[str, Any],
+    body: bytes,
+    expires: int | None = None,
+) -> None:
+    """
+    Store an entry from a snapshot with ``controller``, under the key it
+    builds for the entry's URL (and variant).
+    """
+    request, response = rebuild(header, body, controller.serializer)
+    controller._cache_set(
+        controller.cache_key(header["url"]), request, response, body, expires
+    )
+
+
+def import_snapshot(
+    fp: IO[bytes],
+    controller: CacheController,
+    predicate: Callable[[EntryInfo], bool] | None = None,
+) -> SnapshotResult:
+    """
+    Store the entries of the snapshot ``fp`` that ``predicate`` selects
+    with ``controller``. Entries are stored with what is left of their
+    expiry; those whose expiry is over are skipped.
+
+    Give the controller a ``BackgroundWriter`` to overlap reading the
+    snapshot with writing to the cache.
+    """
+    entries = skipped = size = 0
+    for header, body in read_snapshot(fp):
+        info = describe_entry("", header, len(body))
+        expires = expires_in(info)
+        if (predicate is not None and not predicate(info)) or (
+            expires is not None and expires <= 0
+        ):
+            skipped += 1
+            continue
+        store_entry(controller, header, body, expires)
+        entries += 1
+        size += len(body)
+    return SnapshotResult(entries, skipped, size)
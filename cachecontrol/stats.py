@@ -0,0 +1,339 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Observe what a ``CacheController`` does with each request and response.
+"""
+
+from __future__ import annotations
+
+import math
+from bisect import bisect_left
+from collections import Counter
+from threading import Lock
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+if TYPE_CHECKING:
+    from requests import PreparedRequest
+
+# Why _plan_cache_response() declined to store a response.
+UNCACHEABLE_REASONS = (
+    "status",  # the status code isn't cacheable
+    "size-mismatch",  # the body doesn't match Content-Length
+    "no-store",  # the request or response said "no-store"
+    "vary-star",  # "Vary: *"
+    "invalid-date",  # the Date header can't be parsed
+    "no-freshness",  # nothing says how long the response stays fresh
+)
+
+# What the ``timing`` event measures.
+PHASES = (
+    "lookup",  # cached_request() or cached_entry(), as a whole
+    "backend_get",  # reading from the cache
+    "deserialize",  # Serializer.loads(), building the urllib3 response
+    "build_response",  # building the requests.Response for a hit
+    "store",  # cache_response(), as a whole
+    "serialize",  # Serializer.dumps()
+    "backend_set",  # writing to the cache
+    "backend_delete",  # deleting from the cache
+    "revalidate",  # update_cached_response(), as a whole
+)
+
+# Upper bounds of the histogram buckets, in seconds and bytes.
+TIME_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+SIZE_BUCKETS = tuple(4**n * 256 for n in range(10))  # 256 bytes to 64 MiB
+
+
+class CacheListener:
+    """
+    The events of a ``CacheController``. Every method does nothing;
+    override the ones of interest.
+
+    Listeners are called on the thread making the request, so they should
+    be quick, and they shouldn't raise.
+    """
+
+    def hit(self, request: PreparedRequest, size: int) -> None:
+        """``request`` was answered from the cache with ``size`` bytes."""
+
+    def miss(self, request: PreparedRequest) -> None:
+        """There was no cache entry for ``request``."""
+
+    def stale(self, request: PreparedRequest) -> None:
+        """The cache entry for ``request`` was too old to be used."""
+
+    def bypass(self, request: PreparedRequest) -> None:
+        """``request`` asked not to be answered from the cache."""
+
+    def revalidated(self, request: PreparedRequest) -> None:
+        """A 304 confirmed the cache entry for ``request``."""
+
+    def stored(self, request: PreparedRequest, key: str) -> None:
+        """The response to ``request`` is being stored under ``key``."""
+
+    def uncacheable(self, request: PreparedRequest, reason: str) -> None:
+        """
+        The response to ``request`` isn't stored, for one of the
+        ``UNCACHEABLE_REASONS``.
+        """
+
+    def purged(self, key: str) -> None:
+        """The cache entry under ``key`` was deleted."""
+
+    def timing(self, phase: str, seconds: float) -> None:
+        """One of the ``PHASES`` took ``seconds``."""
+
+
+class ListenerGroup(CacheListener):
+    """Pass every event on to several listeners."""
+
+    def __init__(self, listeners: Iterable[CacheListener]) -> None:
+        self.listeners = list(listeners)
+
+    def hit(self, request: PreparedRequest, size: int) -> None:
+        for listener in self.listeners:
+            listener.hit(request, size)
+
+    def miss(self, request: PreparedRequest) -> None:
+        for listener in self.listeners:
+            listener.miss(request)
+
+    def stale(self, request: PreparedRequest) -> None:
+        for listener in self.listeners:
+            listener.stale(request)
+
+    def bypass(self, request: PreparedRequest) -> None:
+        for listener in self.listeners:
+            listener.bypass(request)
+
+    def revalidated(self, request: PreparedRequest) -> None:
+        for listener in self.listeners:
+            listener.revalidated(request)
+
+    def stored(self, request: PreparedRequest, key: str) -> None:
+        for listener in self.listeners:
+            listener.stored(request, key)
+
+    def uncacheable(self, request: PreparedRequest, reason: str) -> None:
+        for listener in self.listeners:
+            listener.uncacheable(request, reason)
+
+    def purged(self, key: str) -> None:
+        for listener in self.listeners:
+            listener.purged(key)
+
+    def timing(self, phase: str, seconds: float) -> None:
+        for listener in self.listeners:
+            listener.timing(phase, seconds)
+
+
+class CacheStats(CacheListener):
+    """Count the events of one or more controllers."""
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.stale_hits = 0
+            self.bypassed = 0
+            self.revalidations = 0
+            self.stores = 0
+            self.purges = 0
+            self.bytes_served = 0
+            self.uncacheable_reasons: Counter[str] = Counter()
+
+    @property
+    def lookups(self) -> int:
+        """Requests that looked for a cache entry."""
+        return self.hits + self.misses + self.stale_hits
+
+    @property
+    def hit_ratio(self) -> float:
+        """The share of lookups answered from the cache."""
+        lookups = self.lookups
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict[str, int | float | dict[str, int]]:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale_hits,
+                "bypassed": self.bypassed,
+                "revalidated": self.revalidations,
+                "stored": self.stores,
+                "purged": self.purges,
+                "bytes_served": self.bytes_served,
+                "uncacheable": dict(self.uncacheable_reasons),
+                "hit_ratio": self.hit_ratio,
+            }
+
+    def hit(self, request: PreparedRequest, size: int) -> None:
+        with self.lock:
+            self.hits += 1
+            self.bytes_served += size
+
+    def miss(self, request: PreparedRequest) -> None:
+        with self.lock:
+            self.misses += 1
+
+    def stale(self, request: PreparedRequest) -> None:
+        with self.lock:
+            self.stale_hits += 1
+
+    def bypass(self, request: PreparedRequest) -> None:
+        with self.lock:
+            self.bypassed += 1
+
+    def revalidated(self, request: PreparedRequest) -> None:
+        with self.lock:
+            self.revalidations += 1
+
+    def stored(self, request: PreparedRequest, key: str) -> None:
+        with self.lock:
+            self.stores += 1
+
+    def uncacheable(self, request: PreparedRequest, reason: str) -> None:
+        with self.lock:
+            self.uncacheable_reasons[reason] += 1
+
+    def purged(self, key: str) -> None:
+        with self.lock:
+            self.purges += 1
+
+
+class Histogram:
+    """
+    Counts of observed values in buckets with the upper bounds ``buckets``,
+    plus one for anything larger, as Prometheus histograms keep them.
+    """
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """``(upper bound, count of values up to it)`` for every bucket."""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q: float) -> float:
+        """
+        An upper bound for the ``q`` quantile (0 to 1) of the observed values:
+        the bound of the bucket it falls in.
+        """
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank and total:
+                return bound
+        return 0.0
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else repr(bound)
+
+
+class TimingHistograms(CacheListener):
+    """
+    Histograms of how long each of the ``PHASES`` takes, and of the size of
+    the responses served from the cache.
+    """
+
+    def __init__(
+        self,
+        time_buckets: Sequence[float] = TIME_BUCKETS,
+        size_buckets: Sequence[float] = SIZE_BUCKETS,
+    ) -> None:
+        self.lock = Lock()
+        self.time_buckets = time_buckets
+        self.phases: dict[str, Histogram] = {}
+        self.hit_sizes = Histogram(size_buckets)
+
+    def timing(self, phase: str, seconds: float) -> None:
+        with self.lock:
+            histogram = self.phases.get(phase)
+            if histogram is None:
+                histogram = self.phases[phase] = Histogram(self.time_buckets)
+            histogram.observe(seconds)
+
+    def hit(self, request: PreparedRequest, size: int) -> None:
+        with self.lock:
+            self.hit_sizes.observe(size)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """The count, mean, and median and 99th percentile bounds per phase."""
+        with self.lock:
+            return {
+                phase: {
+                    "count": histogram.count,
+                    "mean": histogram.sum / histogram.count,
+                    "p50": histogram.quantile(0.5),
+                    "p99": histogram.quantile(0.99),
+                }
+                for phase, histogram in sorted(self.phases.items())
+            }
+
+    def prometheus(self, prefix: str = "cachecontrol") -> str:
+        """The histograms in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_phase_seconds Time spent in each phase of caching.",
+            f"# TYPE {prefix}_phase_seconds histogram",
+        ]
+        with self.lock:
+            for phase, histogram in sorted(self.phases.items()):
+                lines += _prometheus_samples(
+                    f"{prefix}_phase_seconds", f'phase="{phase}"', histogram
+                )
+            lines += [
+                f"# HELP {prefix}_hit_size_bytes Size of responses served from "
+                "the cache.",
+                f"# TYPE {prefix}_hit_size_bytes histogram",
+            ]
+            lines += _prometheus_samples(f"{prefix}_hit_size_bytes", "", self.hit_sizes)
+        return "\n".join(lines) + "\n"
+
+
+def _prometheus_samples(name: str, labels: str, histogram: Histogram) -> list[str]:
+    sep = "," if labels else ""
+    lines = [
+        f'{name}_bucket{{{labels}{sep}le="{_format_bound(bound)}"}} {total}'
+        for bound, total in histogram.cumulative()
+    ]
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram.sum!r}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+    return lines
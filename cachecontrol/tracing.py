@@ -0,0 +1,127 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Tracing spans for cache operations.
+
+``Tracer`` and ``Span`` describe the parts of the OpenTelemetry tracing API
+that are used, so an OpenTelemetry tracer can be passed in as it is, without
+CacheControl depending on it.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (
+    TYPE_CHECKING,
+    AbstractSet,
+    ContextManager,
+    Iterator,
+    Mapping,
+    Protocol,
+    Sequence,
+    Union,
+)
+
+from cachecontrol.stats import CacheListener
+
+if TYPE_CHECKING:
+    from requests import PreparedRequest
+
+AttributeValue = Union[str, bool, int, float, Sequence[str]]
+
+# The phases whose durations are recorded on spans, as "<phase>_ms".
+SPAN_PHASES = frozenset(
+    ["backend_get", "deserialize", "serialize", "backend_set", "backend_delete"]
+)
+
+
+class Span(Protocol):
+    def set_attribute(self, key: str, value: AttributeValue) -> None: ...
+
+    def add_event(
+        self, name: str, attributes: Mapping[str, AttributeValue] | None = None
+    ) -> None: ...
+
+
+class Tracer(Protocol):
+    def start_as_current_span(
+        self, name: str, *, attributes: Mapping[str, AttributeValue] | None = None
+    ) -> ContextManager[Span]: ...
+
+
+class SpanListener(CacheListener):
+    """
+    Record the events of a controller on the span that is active for the
+    current request, as ``cachecontrol.*`` attributes:
+
+    * ``outcome``: ``hit``, ``miss``, ``stale``, ``bypass`` or
+      ``revalidated``.
+    * ``entry_size``: the size of the body served from the cache.
+    * ``uncacheable_reason``: why the response isn't stored.
+    * ``key``: the key a response is stored under.
+    * ``<phase>_ms``: the time spent in the ``SPAN_PHASES``, in
+      milliseconds.
+
+    Deleted keys are added as ``cachecontrol.purge`` events.
+    """
+
+    def __init__(self, phases: AbstractSet[str] = SPAN_PHASES) -> None:
+        self.phases = phases
+        # The active span, and the phase durations recorded on it so far.
+        self._active: ContextVar[tuple[Span, dict[str, float]] | None] = ContextVar(
+            "cachecontrol_span", default=None
+        )
+
+    @contextmanager
+    def activate(self, span: Span) -> Iterator[Span]:
+        """Record events on ``span`` within the ``with`` block."""
+        token = self._active.set((span, {}))
+        try:
+            yield span
+        finally:
+            self._active.reset(token)
+
+    def _set(self, key: str, value: AttributeValue) -> None:
+        active = self._active.get()
+        if active is not None:
+            active[0].set_attribute("cachecontrol." + key, value)
+
+    def hit(self, request: PreparedRequest, size: int) -> None:
+        self._set("outcome", "hit")
+        self._set("entry_size", size)
+
+    def miss(self, request: PreparedRequest) -> None:
+        self._set("outcome", "miss")
+
+    def stale(self, request: PreparedRequest) -> None:
+        self._set("outcome", "stale")
+
+    def bypass(self, request: PreparedRequest) -> None:
+        self._set("outcome", "bypass")
+
+    def revalidated(self, request: PreparedRequest) -> None:
+        self._set("outcome", "revalidated")
+
+    def stored(self, request: PreparedRequest, key: str) -> None:
+        self._set("key", key)
+
+    def uncacheable(self, request: PreparedRequest, reason: str) -> None:
+        self._set("uncacheable_reason", reason)
+
+    def purged(self, key: str) -> None:
+        active = self._active.get()
+        if active is not None:
+            active[0].add_event("cachecontrol.purge", {"cachecontrol.key": key})
+
+    def timing(self, phase: str, seconds: float) -> None:
+        active = self._active.get()
+        if active is None or phase not in self.phases:
+            return
+        span, durations = active
+        # A phase can run more than once per request, e.g. reading the
+        # cache for the lookup and again for the conditional headers.
+        total = durations[phase] = durations.get(phase, 0.0) + seconds * 1000
+        span.set_attribute(f"cachecontrol.{phase}_ms", total)
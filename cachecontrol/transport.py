@@ -0,0 +1,192 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+A caching transport for the asyncio client of httpx.
+"""
+
+from __future__ import annotations
+
+import io
+import zlib
+from textwrap import dedent
+from typing import TYPE_CHECKING, Callable, Collection, Iterable
+
+from urllib3 import HTTPResponse
+from urllib3._collections import HTTPHeaderDict
+
+from cachecontrol.async_controller import AsyncCacheController
+
+try:
+    import httpx
+except ImportError:
+    notice = dedent(
+        """
+    NOTE: In order to use the AsyncCacheControlTransport you must have
+    httpx installed. You can install it via pip:
+      pip install cachecontrol[httpx]
+    """
+    )
+    raise ImportError(notice)
+
+if TYPE_CHECKING:
+    from cachecontrol.cache import AsyncBaseCache
+    from cachecontrol.controller import CacheController
+    from cachecontrol.heuristics import BaseHeuristic
+    from cachecontrol.serialize import Serializer
+    from cachecontrol.stats import CacheListener
+
+
+HTTP_VERSIONS = {"HTTP/1.0": 10, "HTTP/1.1": 11, "HTTP/2": 20}
+
+
+class _RequestView:
+    """Present an ``httpx.Request`` the way the controller expects a request."""
+
+    def __init__(self, request: httpx.Request) -> None:
+        self.method = request.method
+        self.url = str(request.url)
+        self.headers = request.headers
+
+
+class AsyncCacheControlTransport(httpx.AsyncBaseTransport):
+    """
+    An httpx transport that caches responses, wrapping another transport
+    (by default ``httpx.AsyncHTTPTransport``).
+
+    It makes the same decisions as the ``CacheControlAdapter`` and stores
+    entries in the same format, so an async cache and a synchronous cache
+    sharing the same storage can serve each other's responses.
+    """
+
+    invalidating_methods = {"PUT", "PATCH", "DELETE"}
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport | None = None,
+        cache: AsyncBaseCache | None = None,
+        cache_etags: bool = True,
+        controller_class: type[CacheController] | None = None,
+        serializer: Serializer | None = None,
+        heuristic: BaseHeuristic | None = None,
+        cacheable_methods: Collection[str] | None = None,
+        key_builder: Callable[[str], str] | None = None,
+        listeners: Iterable[CacheListener] | None = None,
+    ) -> None:
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.heuristic = heuristic
+        self.cacheable_methods = cacheable_methods or ("GET",)
+        self.controller = AsyncCacheController(
+            cache,
+            cache_etags=cache_etags,
+            serializer=serializer,
+            controller_class=controller_class,
+            key_builder=key_builder,
+            listeners=listeners,
+        )
+        self.cache = self.controller.cache
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        view = _RequestView(request)
+        cacheable = request.method in self.cacheable_methods
+        if cacheable:
+            try:
+                cached_response = await self.controller.cached_request(view)  # type: ignore[arg-type]
+            except zlib.error:
+                cached_response = False
+            if cached_response:
+                return self.build_response(request, cached_response, from_cache=True)
+
+            # check for etags and add headers if appropriate
+            request.headers.update(
+                await self.controller.conditional_headers(view)  # type: ignore[arg-type]
+            )
+
+        response = await self.transport.handle_async_request(request)
+        response.extensions["from_cache"] = False
+
+        if cacheable:
+            response = await self._cache_response(request, view, response)
+
+        # See if we should invalidate the cache.
+        if request.method in self.invalidating_methods and response.status_code < 400:
+            await self.controller.cache_delete(self.controller.cache_key(view.url))
+
+        return response
+
+    async def _cache_response(
+        self, request: httpx.Request, view: _RequestView, response: httpx.Response
+    ) -> httpx.Response:
+        # The controller and heuristics work on urllib3 responses; the body
+        # is only read once we know it is going to be stored.
+        meta = HTTPResponse(
+            body=io.BytesIO(b""),
+            headers=HTTPHeaderDict(response.headers.multi_items()),
+            status=response.status_code,
+            version=HTTP_VERSIONS.get(response.http_version, 11),
+            reason=response.reason_phrase,
+            preload_content=False,
+            decode_content=False,
+        )
+        if self.heuristic:
+            meta = self.heuristic.apply_to(view, meta)  # type: ignore[arg-type]
+            response.headers = httpx.Headers(list(meta.headers.items()))
+
+        if meta.status == 304:
+            cached_response = await self.controller.update_cached_response(view, meta)  # type: ignore[arg-type]
+            if cached_response is meta:
+                return response
+            await response.aread()
+            await response.aclose()
+            return self.build_response(request, cached_response, from_cache=True)
+
+        # Only to know whether to read the body; cache_response below plans
+        # again with it, and tells the listeners.
+        plan = self.controller.policy._plan_cache_response(
+            view,  # type: ignore[arg-type]
+            meta,
+            notify=False,
+        )
+        if plan is None:
+            return response
+
+        # Read the raw (still content-encoded) body: that is what the
+        # synchronous adapter stores too. Going through the stream rather
+        # than aiter_raw() also works for responses that were already read,
+        # as built by MockTransport.
+        assert isinstance(response.stream, httpx.AsyncByteStream)
+        body = b"".join([chunk async for chunk in response.stream])
+        await response.aclose()
+        await self.controller.cache_response(view, meta, body)  # type: ignore[arg-type]
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            content=body,
+            request=request,
+            extensions=response.extensions,
+        )
+
+    def build_response(
+        self, request: httpx.Request, response: HTTPResponse, from_cache: bool = False
+    ) -> httpx.Response:
+        """Turn a cached urllib3 response into an httpx response."""
+        version = {v: k for k, v in HTTP_VERSIONS.items()}.get(
+            response.version, "HTTP/1.1"
+        )
+        return httpx.Response(
+            status_code=response.status,
+            headers=list(response.headers.items()),
+            content=response.read(decode_content=False),
+            request=request,
+            extensions={
+                "http_version": version.encode(),
+                "reason_phrase": str(response.reason or "").encode(),
+                "from_cache": from_cache,
+            },
+        )
+
+    async def aclose(self) -> None:
+        await self.controller.close()
+        await self.transport.aclose()
@@ -3,18 +3,23 @@
 # SPDX-License-Identifier: Apache-2.0
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Collection
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Collection, Iterable, Mapping, NamedTuple
+
+import requests
 
 from cachecontrol.adapter import CacheControlAdapter
 from cachecontrol.cache import DictCache
 
 if TYPE_CHECKING:
-    import requests
-
     from cachecontrol.cache import BaseCache
     from cachecontrol.controller import CacheController
     from cachecontrol.heuristics import BaseHeuristic
+    from cachecontrol.refresh import BackgroundRefresher
     from cachecontrol.serialize import Serializer
+    from cachecontrol.stats import CacheListener
+    from cachecontrol.tracing import Tracer
+    from cachecontrol.writer import BackgroundWriter
 
 
 def CacheControl(
@@ -26,6 +31,11 @@ def CacheControl(
     controller_class: type[CacheController] | None = None,
     adapter_class: type[CacheControlAdapter] | None = None,
     cacheable_methods: Collection[str] | None = None,
+    refresher: BackgroundRefresher | None = None,
+    writer: BackgroundWriter | None = None,
+    key_builder: Callable[[str], str] | None = None,
+    listeners: Iterable[CacheListener] | None = None,
+    tracer: Tracer | None = None,
 ) -> requests.Session:
     cache = DictCache() if cache is None else cache
     adapter_class = adapter_class or CacheControlAdapter
@@ -36,8 +46,77 @@ def CacheControl(
         heuristic=heuristic,
         controller_class=controller_class,
         cacheable_methods=cacheable_methods,
+        refresher=refresher,
+        writer=writer,
+        key_builder=key_builder,
+        listeners=listeners,
+        tracer=tracer,
     )
     sess.mount("http://", adapter)
     sess.mount("https://", adapter)
 
     return sess
+
+
+class PrefetchResult(NamedTuple):
+    """The outcome of prefetching one URL.
+
+    ``outcome`` is one of:
+
+    * ``"fresh"``: a fresh response was already cached, nothing was sent.
+    * ``"cached"``: the response was fetched and is now fresh in the cache.
+    * ``"uncached"``: the response was fetched but could not be cached.
+    * ``"failed"``: the request raised ``error``.
+    """
+
+    url: str
+    outcome: str
+    status_code: int | None = None
+    error: Exception | None = None
+
+
+def prefetch(
+    sess: requests.Session,
+    urls: Iterable[str],
+    concurrency: int = 8,
+    method: str = "GET",
+    headers: Mapping[str, str] | None = None,
+    timeout: float | None = None,
+) -> list[PrefetchResult]:
+    """Warm the cache of a ``CacheControl`` session by fetching ``urls``.
+
+    Up to ``concurrency`` requests are sent at once from a thread pool.
+    URLs with a fresh cache entry are skipped. ``headers`` and ``timeout``
+    are passed on to ``sess.request``. Returns one ``PrefetchResult`` per
+    URL, in order.
+    """
+
+    def fetch(url: str) -> PrefetchResult:
+        try:
+            adapter = sess.get_adapter(url)
+            if not isinstance(adapter, CacheControlAdapter):
+                raise ValueError(f"{url} is not served by a CacheControlAdapter")
+            if method not in adapter.cacheable_methods:
+                raise ValueError(f"{method} is not a cacheable method")
+
+            prepared = sess.prepare_request(
+                requests.Request(method, url, headers=headers)
+            )
+            if adapter.controller._has_fresh(prepared):
+                return PrefetchResult(url, "fresh")
+
+            # The body is read in full, which is what stores the response.
+            resp = sess.request(method, url, headers=headers, timeout=timeout)
+            resp.close()
+            if adapter.controller.writer is not None:
+                # The store may still be queued.
+                adapter.controller.writer.flush()
+            stored = adapter.controller._has_fresh(prepared)
+            return PrefetchResult(
+                url, "cached" if stored else "uncached", resp.status_code
+            )
+        except Exception as e:
+            return PrefetchResult(url, "failed", error=e)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(fetch, urls))
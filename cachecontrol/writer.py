@@ -0,0 +1,92 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Write-behind cache stores, off the thread that reads the response.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWriter:
+    """
+    Run cache writes on a background thread.
+
+    Up to ``max_pending`` writes are queued. When the queue is full, new
+    writes are dropped (and counted in ``dropped``), or, with
+    ``block=True``, the caller waits until there is room. Dropping a write
+    only costs a later cache miss. Once the writer is closed, writes run
+    on the caller's thread.
+    """
+
+    def __init__(self, max_pending: int = 1000, block: bool = False) -> None:
+        self.block = block
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue: queue.Queue[Callable[[], None] | None] = queue.Queue(max_pending)
+        self._closed = False
+        # Held while queueing, so nothing is queued behind the stop marker.
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="cachecontrol-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, job: Callable[[], None], required: bool = False) -> bool:
+        """
+        Queue ``job``. Returns False if it was dropped; ``required`` jobs
+        are never dropped and wait for room instead.
+        """
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._queue.put(job, block=self.block or required)
+                except queue.Full:
+                    self.dropped += 1
+                    logger.debug("Write-behind queue full, dropping a cache write")
+                    return False
+                return True
+        self._run_job(job)
+        return True
+
+    def _run_job(self, job: Callable[[], None]) -> None:
+        try:
+            job()
+            self.written += 1
+        except Exception:
+            self.failed += 1
+            logger.warning("Background cache write failed", exc_info=True)
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._run_job(job)
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Wait until every queued write has finished."""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        """Finish the queued writes and stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            # The thread is still running, so there will be room.
+            self._queue.put(None)
+        self._thread.join()
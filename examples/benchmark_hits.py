@@ -0,0 +1,67 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Compare the cost of a cache hit served straight from the cache entry with
+one that goes through a urllib3 response (as streamed hits still do).
+"""
+
+import argparse
+import io
+import timeit
+from email.utils import formatdate
+
+import requests
+from urllib3 import HTTPResponse
+
+from cachecontrol import CacheControlAdapter
+
+URL = "http://example.com/resource"
+
+
+def setup(body_size):
+    adapter = CacheControlAdapter()
+    request = requests.Request("GET", URL).prepare()
+    body = b"x" * body_size
+    response = HTTPResponse(
+        body=io.BytesIO(body),
+        headers={
+            "Cache-Control": "max-age=3600",
+            "Content-Type": "text/plain; charset=utf-8",
+            "Content-Length": str(body_size),
+            "Date": formatdate(usegmt=True),
+            "ETag": '"abc"',
+        },
+        status=200,
+        preload_content=False,
+    )
+    adapter.controller.cache_response(request, response, body)
+    return adapter, request
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--body-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    adapter, request = setup(args.body_size)
+
+    def fast_hit():
+        assert adapter.send(request).content
+
+    def urllib3_hit():
+        assert adapter.send(request, stream=True).content
+
+    results = {}
+    for name, func in [("fast", fast_hit), ("urllib3", urllib3_hit)]:
+        best = min(timeit.repeat(func, number=args.number, repeat=5))
+        results[name] = best / args.number * 1e6
+        print(f"{name:>8}: {results[name]:.1f} us per hit")
+
+    print(f" speedup: {results['urllib3'] / results['fast']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
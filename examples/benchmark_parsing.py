@@ -0,0 +1,87 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Measure the per-request cost of normalizing URLs and parsing Cache-Control
+headers, with and without memoization.
+
+Each simulated request normalizes one URL and parses three Cache-Control
+values (the request's, and the response's when checking freshness and
+when storing it), drawn from a realistic mix: a few hundred URLs, a
+handful of distinct header values.
+"""
+
+import argparse
+import random
+import timeit
+
+from cachecontrol import controller
+
+CACHE_CONTROL_VALUES = [
+    "",
+    "max-age=0",
+    "no-cache",
+    "max-age=300",
+    "public, max-age=3600",
+    "private, max-age=60, must-revalidate",
+    "no-store",
+    "public, max-age=31536000, immutable",
+]
+
+
+def workload(size, seed=0):
+    rng = random.Random(seed)
+    urls = [
+        f"https://api.example.com/v1/items/{i}?page={i % 7}&sort=name"
+        for i in range(300)
+    ]
+    return [
+        (
+            rng.choice(urls),
+            rng.choice(CACHE_CONTROL_VALUES[:3]),
+            rng.choice(CACHE_CONTROL_VALUES),
+        )
+        for _ in range(size)
+    ]
+
+
+def run(requests, urlnorm, parse):
+    for url, request_cc, response_cc in requests:
+        urlnorm(url)
+        parse(request_cc)
+        parse(response_cc)
+        parse(response_cc)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    requests = workload(args.requests)
+    variants = {
+        "uncached": (
+            controller._urlnorm.__wrapped__,
+            controller._parse_cache_control.__wrapped__,
+        ),
+        "memoized": (controller._urlnorm, controller._parse_cache_control),
+    }
+
+    results = {}
+    for name, (urlnorm, parse) in variants.items():
+        best = min(
+            timeit.repeat(
+                lambda urlnorm=urlnorm, parse=parse: run(requests, urlnorm, parse),
+                number=1,
+                repeat=5,
+            )
+        )
+        results[name] = best / args.requests * 1e6
+        print(f"{name:>9}: {results[name]:.2f} us per request")
+
+    print(f"  speedup: {results['uncached'] / results['memoized']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
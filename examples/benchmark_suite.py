@@ -0,0 +1,302 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+End-to-end benchmarks of CacheControl sessions against a local origin.
+
+Every combination of scenario, cache backend, body size and concurrency is
+run in a fresh process, so peak RSS is per case, against a threaded origin
+server in this process. Results are written as JSON; ``--compare`` checks
+them against the results of an earlier run and exits with status 1 when a
+case lost more than ``--tolerance`` of its throughput.
+
+Scenarios:
+
+* ``hit``: a fresh entry, served from the cache.
+* ``miss``: a new URL for every request, fetched and stored.
+* ``revalidate``: a stale entry with an ETag, revalidated with a 304.
+* ``vary``: a response varying on Accept-Encoding, requested with a few
+  different values, served from the cache.
+* ``chunked``: like ``miss``, with chunked responses.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from importlib.metadata import version
+from multiprocessing import get_context
+from urllib.parse import parse_qs
+
+import requests
+from cheroot import wsgi
+
+from cachecontrol import CacheControl
+from cachecontrol.cache import DictCache
+from cachecontrol.caches import FileCache, RedisCache, SeparateBodyFileCache
+
+SCENARIOS = ("hit", "miss", "revalidate", "vary", "chunked")
+BACKENDS = ("none", "dict", "file", "separate_body_file", "redis")
+ENCODINGS = ("gzip", "br", "identity", "gzip, deflate")
+CHUNK_SIZE = 16 * 1024
+SEED = 1234
+
+_bodies: dict[int, bytes] = {}
+
+
+def body_of_size(size):
+    # The same (incompressible) bytes for a size on every run.
+    if size not in _bodies:
+        _bodies[size] = random.Random(SEED + size).randbytes(size)
+    return _bodies[size]
+
+
+def origin(environ, start_response):
+    path = environ["PATH_INFO"]
+    size = int(parse_qs(environ["QUERY_STRING"]).get("size", ["1024"])[0])
+    body = body_of_size(size)
+    headers = [("Content-Type", "application/octet-stream")]
+
+    if path == "/etag":
+        headers += [("Cache-Control", "max-age=0"), ("ETag", f'"{size}"')]
+        if environ.get("HTTP_IF_NONE_MATCH") == f'"{size}"':
+            start_response("304 Not Modified", headers)
+            return []
+    elif path == "/vary":
+        headers += [("Cache-Control", "max-age=3600"), ("Vary", "Accept-Encoding")]
+    else:
+        headers.append(("Cache-Control", "max-age=3600"))
+
+    if path == "/chunked":
+        # Without a Content-Length, the server sends it chunked.
+        start_response("200 OK", headers)
+        return (body[i : i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE))
+
+    headers.append(("Content-Length", str(len(body))))
+    start_response("200 OK", headers)
+    return [body]
+
+
+class Origin:
+    def __init__(self, threads):
+        self.server = wsgi.Server(("127.0.0.1", 0), origin, numthreads=threads)
+
+    def __enter__(self):
+        self.server.prepare()
+        self.thread = threading.Thread(target=self.server.serve, daemon=True)
+        self.thread.start()
+        host, port = self.server.bind_addr[:2]
+        return f"http://{host}:{port}"
+
+    def __exit__(self, *exc_info):
+        self.server.stop()
+        self.thread.join()
+
+
+def make_cache(backend, directory, redis_url):
+    if backend == "dict":
+        return DictCache()
+    if backend == "file":
+        return FileCache(directory)
+    if backend == "separate_body_file":
+        return SeparateBodyFileCache(directory)
+    if backend == "redis":
+        import redis
+
+        # Keys of their own, so nothing else in the database is touched.
+        prefix = f"cachecontrol-benchmark:{uuid.uuid4().hex}:"
+        return RedisCache(redis.Redis.from_url(redis_url), prefix)
+    return None
+
+
+def requests_for(case, base_url):
+    """The ``(url, headers)`` of every request, and those to warm up with."""
+    size = case["size"]
+    count = case["requests"]
+    scenario = case["scenario"]
+    if scenario in ("miss", "chunked"):
+        path = "/chunked" if scenario == "chunked" else "/fresh"
+        return [(f"{base_url}{path}?size={size}&n={n}", {}) for n in range(count)], []
+    if scenario == "vary":
+        variants = [
+            (f"{base_url}/vary?size={size}", {"Accept-Encoding": encoding})
+            for encoding in ENCODINGS
+        ]
+        return list(itertools.islice(itertools.cycle(variants), count)), variants
+    path = "/etag" if scenario == "revalidate" else "/fresh"
+    request = (f"{base_url}{path}?size={size}", {})
+    return [request] * count, [request]
+
+
+def peak_rss():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_case(case, base_url, redis_url):
+    """Run one case; this is called in a process of its own."""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = make_cache(case["backend"], directory, redis_url)
+        sessions = []
+        for _ in range(case["concurrency"]):
+            sess = requests.Session()
+            sessions.append(sess if cache is None else CacheControl(sess, cache))
+
+        todo, warmup = requests_for(case, base_url)
+        for url, headers in warmup:
+            sessions[0].get(url, headers=headers).content  # noqa: B018
+
+        def worker(index):
+            sess = sessions[index]
+            latencies = []
+            for url, headers in todo[index :: case["concurrency"]]:
+                start = time.perf_counter()
+                resp = sess.get(url, headers=headers)
+                resp.content  # noqa: B018
+                latencies.append(time.perf_counter() - start)
+                resp.raise_for_status()
+            return latencies
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(case["concurrency"]) as pool:
+            per_thread = list(pool.map(worker, range(case["concurrency"])))
+        elapsed = time.perf_counter() - start
+
+        for sess in sessions:
+            sess.close()
+        if isinstance(cache, RedisCache):
+            cache.clear()
+
+    latencies = [latency for thread in per_thread for latency in thread]
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return dict(
+        case,
+        seconds=elapsed,
+        throughput=len(latencies) / elapsed,
+        p50_ms=cuts[49] * 1000,
+        p90_ms=cuts[89] * 1000,
+        p99_ms=cuts[98] * 1000,
+        peak_rss=peak_rss(),
+    )
+
+
+def case_key(result):
+    return tuple(result[k] for k in ("scenario", "backend", "size", "concurrency"))
+
+
+def compare(results, baseline, tolerance):
+    """Print how ``results`` compare with ``baseline``; True if none regressed."""
+    previous = {case_key(result): result for result in baseline["results"]}
+    ok = True
+    for result in results:
+        old = previous.get(case_key(result))
+        if old is None:
+            continue
+        ratio = result["throughput"] / old["throughput"]
+        regressed = ratio < 1 - tolerance
+        ok = ok and not regressed
+        print(
+            "{:<10} {:<18} {:>8} x{:<3} throughput {:6.2f}x  p99 {:6.2f}x{}".format(
+                *case_key(result),
+                ratio,
+                result["p99_ms"] / old["p99_ms"],
+                "  REGRESSED" if regressed else "",
+            ),
+            file=sys.stderr,
+        )
+    return ok
+
+
+def csv(cast):
+    return lambda value: [cast(item) for item in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--scenarios", type=csv(str), default=list(SCENARIOS))
+    parser.add_argument("--backends", type=csv(str), default=["none", "dict", "file"])
+    parser.add_argument("--sizes", type=csv(int), default=[1024, 64 * 1024, 1 << 20])
+    parser.add_argument("--concurrency", type=csv(int), default=[1, 8])
+    parser.add_argument("--requests", type=int, default=500, help="requests per case")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--output", help="write the JSON results here")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    for name, allowed in [("scenarios", SCENARIOS), ("backends", BACKENDS)]:
+        unknown = set(getattr(args, name)) - set(allowed)
+        if unknown:
+            parser.error(f"unknown {name}: {', '.join(sorted(unknown))}")
+
+    cases = [
+        {
+            "scenario": s,
+            "backend": b,
+            "size": n,
+            "concurrency": c,
+            "requests": args.requests,
+        }
+        for s, b, n, c in itertools.product(
+            args.scenarios, args.backends, args.sizes, args.concurrency
+        )
+    ]
+    results = []
+    with Origin(threads=max(args.concurrency) + 2) as base_url:
+        for case in cases:
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                result = pool.submit(run_case, case, base_url, args.redis_url).result()
+            results.append(result)
+            print(
+                "{:<10} {:<18} {:>8} x{:<3} {:9.1f} req/s  p50 {:7.2f} ms  "
+                "p99 {:7.2f} ms  rss {:5.1f} MiB".format(
+                    *case_key(result),
+                    result["throughput"],
+                    result["p50_ms"],
+                    result["p99_ms"],
+                    result["peak_rss"] / (1 << 20),
+                ),
+                file=sys.stderr,
+            )
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cachecontrol": version("cachecontrol"),
+        "requests": version("requests"),
+        "urllib3": version("urllib3"),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
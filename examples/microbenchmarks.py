@@ -0,0 +1,302 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Time the hot functions of CacheControl in isolation, without a network:
+serializing and loading cache entries, parsing Cache-Control headers,
+normalizing URLs, cache lookups of fresh and stale entries, and reading a
+response body through the CallbackFileWrapper.
+
+Requests and responses are built in memory. ``--save`` writes the results
+as JSON; ``--compare`` checks them against a saved run and exits with
+status 1 when a benchmark got more than ``--tolerance`` slower.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import http.client
+import io
+import json
+import platform
+import random
+import sys
+import timeit
+from datetime import datetime, timezone
+from email.utils import formatdate
+from importlib.metadata import version
+
+import requests
+from urllib3 import HTTPResponse
+
+from cachecontrol import controller
+from cachecontrol.cache import DictCache
+from cachecontrol.controller import CacheController
+from cachecontrol.filewrapper import CallbackFileWrapper
+from cachecontrol.serialize import Serializer
+
+URL = "https://api.example.com/v1/items/42?page=3&sort=name"
+CACHE_CONTROL = "public, max-age=3600, stale-while-revalidate=60"
+READ_SIZE = 64 * 1024
+SEED = 1234
+
+
+def body_of_size(size):
+    return random.Random(SEED + size).randbytes(size)
+
+
+def make_request():
+    return requests.Request(
+        "GET",
+        URL,
+        headers={"Accept": "application/json", "Accept-Encoding": "gzip"},
+    ).prepare()
+
+
+def make_response(body, cache_control="max-age=3600"):
+    return HTTPResponse(
+        body=io.BytesIO(body),
+        headers={
+            "Cache-Control": cache_control,
+            "Content-Type": "application/octet-stream",
+            "Content-Length": str(len(body)),
+            "Date": formatdate(usegmt=True),
+            "ETag": '"abc"',
+            "Vary": "Accept-Encoding",
+        },
+        status=200,
+        preload_content=False,
+    )
+
+
+class FakeSocket:
+    def __init__(self, data):
+        self.data = data
+
+    def makefile(self, mode):
+        return io.BytesIO(self.data)
+
+
+def make_http_response(body):
+    """An ``http.client.HTTPResponse`` that reads ``body`` from memory."""
+    head = f"HTTP/1.1 200 OK\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+    resp = http.client.HTTPResponse(FakeSocket(head + body))  # type: ignore[arg-type]
+    resp.begin()
+    return resp
+
+
+# Each benchmark builds its data, and returns the function to time and the
+# number of bytes one call processes (0 when throughput doesn't matter).
+
+
+def bench_dumps(size):
+    request, body = make_request(), body_of_size(size)
+    response = make_response(body)
+    serializer = Serializer()
+    return lambda: serializer.dumps(request, response, body), size
+
+
+def bench_loads(size):
+    request, body = make_request(), body_of_size(size)
+    serializer = Serializer()
+    data = serializer.dumps(request, make_response(body), body)
+    return lambda: serializer.loads(request, data), size
+
+
+def bench_parse_cache_control(size):
+    return lambda: controller._parse_cache_control(CACHE_CONTROL), 0
+
+
+def bench_parse_cache_control_uncached(size):
+    parse = controller._parse_cache_control.__wrapped__
+    return lambda: parse(CACHE_CONTROL), 0
+
+
+def bench_urlnorm(size):
+    return lambda: controller._urlnorm(URL), 0
+
+
+def bench_urlnorm_uncached(size):
+    urlnorm = controller._urlnorm.__wrapped__
+    return lambda: urlnorm(URL), 0
+
+
+def _cached(size, cache_control):
+    request, body = make_request(), body_of_size(size)
+    cc = CacheController(DictCache())
+    cc.cache_response(request, make_response(body, cache_control), body)
+    return cc, request
+
+
+def bench_cached_request_fresh(size):
+    cc, request = _cached(size, "max-age=3600")
+
+    def run():
+        assert cc.cached_request(request)
+
+    return run, size
+
+
+def bench_cached_request_stale(size):
+    # Stale, but kept for revalidation thanks to its ETag.
+    cc, request = _cached(size, "max-age=0")
+
+    def run():
+        assert cc.cached_request(request) is False
+
+    return run, size
+
+
+def bench_cached_entry_fresh(size):
+    cc, request = _cached(size, "max-age=3600")
+
+    def run():
+        assert cc.cached_entry(request)
+
+    return run, size
+
+
+def bench_filewrapper_read(size):
+    body = body_of_size(size)
+    stored = []
+
+    def run():
+        wrapper = CallbackFileWrapper(make_http_response(body), stored.append)
+        while wrapper.read(READ_SIZE):
+            pass
+        assert len(stored.pop()) == size
+
+    return run, size
+
+
+# name -> (setup, whether the body size matters)
+BENCHMARKS = {
+    "serializer.dumps": (bench_dumps, True),
+    "serializer.loads": (bench_loads, True),
+    "parse_cache_control": (bench_parse_cache_control, False),
+    "parse_cache_control.uncached": (bench_parse_cache_control_uncached, False),
+    "urlnorm": (bench_urlnorm, False),
+    "urlnorm.uncached": (bench_urlnorm_uncached, False),
+    "cached_request.fresh": (bench_cached_request_fresh, True),
+    "cached_request.stale": (bench_cached_request_stale, True),
+    "cached_entry.fresh": (bench_cached_entry_fresh, True),
+    "filewrapper.read": (bench_filewrapper_read, True),
+}
+
+
+def measure(func, repeat, min_time):
+    """The best time of one call, in seconds, over ``repeat`` rounds."""
+    timer = timeit.Timer(func)
+    number = 1
+    # Like Timer.autorange(), but each round takes at least min_time.
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run(names, sizes, repeat, min_time):
+    results = []
+    for name in names:
+        setup, sized = BENCHMARKS[name]
+        for size in sizes if sized else [None]:
+            func, nbytes = setup(size)
+            seconds = measure(func, repeat, min_time)
+            result = {"name": name, "size": size, "ns": seconds * 1e9}
+            if nbytes:
+                result["mb_per_s"] = nbytes / seconds / 1e6
+            results.append(result)
+
+            line = f"{label(result):<36} {result['ns']:12.0f} ns"
+            if nbytes:
+                line += f"  {result['mb_per_s']:9.1f} MB/s"
+            print(line, file=sys.stderr)
+    return results
+
+
+def label(result):
+    if result["size"] is None:
+        return result["name"]
+    return f"{result['name']}[{result['size']}]"
+
+
+def compare(results, baseline, tolerance):
+    """Print how ``results`` compare with ``baseline``; True if none regressed."""
+    previous = {label(result): result for result in baseline["results"]}
+    ok = True
+    for result in results:
+        old = previous.get(label(result))
+        if old is None:
+            continue
+        ratio = result["ns"] / old["ns"]
+        regressed = ratio > 1 + tolerance
+        ok = ok and not regressed
+        print(
+            "{:<36} {:6.2f}x the time{}".format(
+                label(result), ratio, "  REGRESSED" if regressed else ""
+            ),
+            file=sys.stderr,
+        )
+    return ok
+
+
+def csv(cast):
+    return lambda value: [cast(item) for item in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        metavar="PATTERN",
+        help="run the benchmarks matching this glob pattern (repeatable): "
+        + ", ".join(BENCHMARKS),
+    )
+    parser.add_argument("--sizes", type=csv(int), default=[1024, 64 * 1024, 1 << 20])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time", type=float, default=0.05, help="seconds per round, at least"
+    )
+    parser.add_argument("--save", metavar="PATH", help="write the JSON results here")
+    parser.add_argument("--compare", metavar="BASELINE", help="saved results")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    names = [
+        name
+        for name in BENCHMARKS
+        if not args.only
+        or any(fnmatch.fnmatchcase(name, pattern) for pattern in args.only)
+    ]
+    if not names:
+        parser.error("no benchmark matches --only")
+
+    results = run(names, args.sizes, args.repeat, args.min_time)
+
+    if args.save:
+        report = {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cachecontrol": version("cachecontrol"),
+            "msgpack": version("msgpack"),
+            "requests": version("requests"),
+            "urllib3": version("urllib3"),
+            "results": results,
+        }
+        with open(args.save, "w") as f:
+            f.write(json.dumps(report, indent=2) + "\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ from requests import Session
 
 from cachecontrol.adapter import CacheControlAdapter
 from cachecontrol.cache import DictCache
+from cachecontrol.serialize import Serializer
 from cachecontrol.wrapper import CacheControl
 
 
@@ -70,6 +71,13 @@ class TestSessionActions:
         sess.close()
         assert cache.close.called
 
+    def test_http_adapter_arguments_by_position(self):
+        adapter = CacheControlAdapter(None, True, None, None, None, None, 5, 5)
+        assert adapter._pool_connections == 5
+        assert adapter._pool_maxsize == 5
+        assert adapter.refresher is None
+        assert adapter.controller.writer is None
+
     def test_do_not_leak_response(self, url, sess):
         resp = sess.get(url + "stream", stream=True)
         resp.raise_for_status()
@@ -94,3 +102,54 @@ class TestSessionActions:
 
         r1 = r1_weak()
         assert r1 is None or r1.closed
+
+
+class TestFastHits:
+    @pytest.fixture()
+    def sess(self, url):
+        sess = CacheControl(Session())
+        yield sess
+        sess.close()
+
+    def test_hit_skips_urllib3(self, url, sess):
+        sess.get(url)
+        with mock.patch("cachecontrol.serialize.HTTPResponse") as http_response:
+            r2 = sess.get(url)
+        assert not http_response.called
+
+        # A hit going through urllib3, for comparison.
+        r1 = sess.get(url, stream=True)
+        assert r2.from_cache
+        assert r2.status_code == r1.status_code
+        assert r2.content == r1.content
+        assert r2.text == r1.text
+        assert r2.encoding == r1.encoding
+        assert r2.headers == r1.headers
+        assert r2.reason == r1.reason
+        assert r2.url == r1.url
+        assert r2.request.url == url
+
+    def test_raw_is_built_on_demand(self, url, sess):
+        r1 = sess.get(url)
+        r2 = sess.get(url)
+        assert r2.raw.status == 200
+        assert r2.raw.read() == r1.content
+
+    def test_stream_uses_urllib3(self, url, sess):
+        sess.get(url)
+        r2 = sess.get(url, stream=True)
+        assert r2.from_cache
+        assert r2.raw.closed is False
+        assert r2.content
+
+    def test_custom_serializer_uses_urllib3(self, url):
+        class CustomSerializer(Serializer):
+            def loads(self, request, data, body_file=None):
+                self.loaded = True
+                return super().loads(request, data, body_file)
+
+        serializer = CustomSerializer()
+        sess = CacheControl(Session(), serializer=serializer)
+        sess.get(url)
+        assert sess.get(url).from_cache
+        assert serializer.loaded
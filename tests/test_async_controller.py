@@ -0,0 +1,198 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Unit tests for the asyncio controller and caches.
+"""
+
+import asyncio
+import os
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from cachecontrol import AsyncCacheController
+from cachecontrol.cache import AsyncDictCache
+from cachecontrol.caches import (
+    AsyncFileCache,
+    AsyncRedisCache,
+    AsyncSeparateBodyFileCache,
+)
+
+from .utils import DummyRequest, DummyResponse
+
+TIME_FMT = "%a, %d %b %Y %H:%M:%S GMT"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestAsyncCacheController:
+    url = "http://example.com/"
+
+    @pytest.fixture(
+        params=["dict", "file", "separate_body_file"],
+    )
+    def controller(self, request, tmp_path):
+        cache = {
+            "dict": lambda: AsyncDictCache(),
+            "file": lambda: AsyncFileCache(os.fsdecode(tmp_path)),
+            "separate_body_file": lambda: AsyncSeparateBodyFileCache(
+                os.fsdecode(tmp_path)
+            ),
+        }[request.param]()
+        return AsyncCacheController(cache)
+
+    def response(self, **headers):
+        headers.setdefault("Date", time.strftime(TIME_FMT, time.gmtime()))
+        return DummyResponse(200, headers)
+
+    def test_store_and_hit(self, controller):
+        req = DummyRequest(self.url, {})
+        resp = self.response(**{"Cache-Control": "max-age=60"})
+
+        async def go():
+            assert not await controller.cached_request(req)
+            await controller.cache_response(req, resp, b"body")
+            return await controller.cached_request(req)
+
+        cached = run(go())
+        assert cached.read() == b"body"
+        assert cached.headers["Cache-Control"] == "max-age=60"
+
+    def test_variants(self, controller):
+        gzip = DummyRequest(self.url, {"Accept-Encoding": "gzip"})
+        br = DummyRequest(self.url, {"Accept-Encoding": "br"})
+
+        async def go():
+            for req, body in [(gzip, b"gzip"), (br, b"br")]:
+                resp = self.response(
+                    **{"Cache-Control": "max-age=60", "Vary": "Accept-Encoding"}
+                )
+                await controller.cache_response(req, resp, body)
+            cached = [await controller.cached_request(req) for req in (gzip, br)]
+            await controller.cache_delete(controller.cache_url(self.url))
+            return cached, await controller.cached_request(gzip)
+
+        cached, deleted = run(go())
+        assert [resp.read() for resp in cached] == [b"gzip", b"br"]
+        assert deleted is False
+
+    def test_unvaried_response_deletes_variants(self, controller):
+        gzip = DummyRequest(self.url, {"Accept-Encoding": "gzip"})
+        varied = self.response(
+            **{"Cache-Control": "max-age=60", "Vary": "Accept-Encoding"}
+        )
+        plain = self.response(**{"Cache-Control": "max-age=60"})
+
+        async def go():
+            await controller.cache_response(gzip, varied, b"gzip")
+            variant = controller.policy.variant_key(
+                self.url, ("accept-encoding",), gzip.headers
+            )
+            assert await controller.cache.get(variant)
+            await controller.cache_response(DummyRequest(self.url, {}), plain, b"plain")
+            return await controller.cache.get(variant), await controller.cached_request(
+                gzip
+            )
+
+        old, cached = run(go())
+        assert old is None
+        assert cached.read() == b"plain"
+
+    def test_request_no_cache_bypasses(self, controller):
+        req = DummyRequest(self.url, {})
+        resp = self.response(**{"Cache-Control": "max-age=60"})
+
+        async def go():
+            await controller.cache_response(req, resp, b"body")
+            return await controller.cached_request(
+                DummyRequest(self.url, {"Cache-Control": "no-cache"})
+            )
+
+        assert run(go()) is False
+
+    def test_no_store_purges(self, controller):
+        req = DummyRequest(self.url, {})
+
+        async def go():
+            await controller.cache_response(
+                req, self.response(**{"Cache-Control": "max-age=60"}), b"body"
+            )
+            await controller.cache_response(
+                req, self.response(**{"Cache-Control": "no-store"}), b"body"
+            )
+            return await controller.cache.get(self.url)
+
+        assert run(go()) is None
+
+    def test_stale_without_etag_is_purged(self, controller):
+        req = DummyRequest(self.url, {})
+        date = time.strftime(TIME_FMT, time.gmtime(time.time() - 120))
+        resp = self.response(**{"Cache-Control": "max-age=60", "Date": date})
+
+        async def go():
+            await controller.cache_response(req, resp, b"body")
+            assert await controller.cache.get(self.url)
+            assert not await controller.cached_request(req)
+            return await controller.cache.get(self.url)
+
+        assert run(go()) is None
+
+    def test_revalidation(self, controller):
+        req = DummyRequest(self.url, {})
+        resp = self.response(ETag='"abc"', **{"X-Value": "a"})
+        not_modified = DummyResponse(304, {"ETag": '"abc"', "X-Value": "b"})
+
+        async def go():
+            await controller.cache_response(req, resp, b"body")
+            headers = await controller.conditional_headers(req)
+            updated = await controller.update_cached_response(req, not_modified)
+            return headers, updated
+
+        headers, updated = run(go())
+        assert headers == {"If-None-Match": '"abc"'}
+        assert updated.status == 200
+        assert updated.headers["X-Value"] == "b"
+        assert updated.read() == b"body"
+
+    def test_update_without_cached_response(self, controller):
+        resp = DummyResponse(304, {"ETag": '"abc"'})
+        req = DummyRequest(self.url, {})
+        assert run(controller.update_cached_response(req, resp)) is resp
+
+
+class TestAsyncRedisCache:
+    def setup_method(self):
+        self.conn = AsyncMock()
+        self.cache = AsyncRedisCache(self.conn, prefix="cc:")
+
+    def test_get_set_delete(self):
+        async def go():
+            await self.cache.get("foo")
+            await self.cache.set("foo", b"bar")
+            await self.cache.set("foo", b"bar", expires=60)
+            await self.cache.delete("foo")
+
+        run(go())
+        self.conn.get.assert_awaited_with("cc:foo")
+        self.conn.set.assert_awaited_with("cc:foo", b"bar")
+        self.conn.setex.assert_awaited_with("cc:foo", 60, b"bar")
+        self.conn.delete.assert_awaited_with("cc:foo")
+
+    def test_clear(self):
+        async def scan_iter(match, count):
+            for key in (b"cc:a", b"cc:b"):
+                yield key
+
+        self.conn.scan_iter = scan_iter
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        self.conn.pipeline = MagicMock(return_value=pipe)
+
+        run(self.cache.clear())
+        assert [c.args for c in pipe.unlink.call_args_list] == [(b"cc:a",), (b"cc:b",)]
+        pipe.execute.assert_awaited_once()
@@ -15,6 +15,7 @@ import pytest
 from cachecontrol import CacheController
 from cachecontrol.cache import DictCache
 from cachecontrol.caches import SeparateBodyFileCache
+from cachecontrol.controller import _parse_cache_control, _urlnorm
 
 from .utils import DummyRequest, DummyResponse, NullSerializer
 
@@ -322,3 +323,32 @@ class TestCacheControlRequest:
         self.c.cache = DictCache({self.url: resp})
 
         assert not self.req({})
+
+
+class TestMemoization:
+    def setup_method(self):
+        self.c = CacheController()
+
+    def test_parsed_directives_are_copies(self):
+        headers = {"cache-control": "max-age=60, public"}
+        cc = self.c.parse_cache_control(headers)
+        assert cc == {"max-age": 60, "public": None}
+
+        cc["no-store"] = None
+        assert self.c.parse_cache_control(headers) == {"max-age": 60, "public": None}
+
+    def test_repeated_values_are_parsed_once(self):
+        _parse_cache_control.cache_clear()
+        for _ in range(3):
+            self.c.parse_cache_control({"Cache-Control": "max-age=10"})
+        assert _parse_cache_control.cache_info().misses == 1
+
+    def test_cache_url_is_memoized(self):
+        _urlnorm.cache_clear()
+        for _ in range(3):
+            assert CacheController.cache_url("HTTP://Foo.com") == "http://foo.com/"
+        assert _urlnorm.cache_info().hits == 2
+
+    def test_relative_url_still_raises(self):
+        with pytest.raises(Exception, match="Only absolute URIs"):
+            CacheController.cache_url("/relative")
@@ -3,21 +3,27 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import calendar
+import json
 import time
 from datetime import datetime, timezone
 from email.utils import formatdate, parsedate
 from pprint import pprint
 from unittest.mock import Mock
 
+import pytest
+import requests
 from requests import Session, get
 
 from cachecontrol import CacheControl
 from cachecontrol.heuristics import (
     TIME_FMT,
+    AdaptiveTTL,
     BaseHeuristic,
     ExpiresAfter,
     LastModified,
     OneDayCache,
+    Rule,
+    RuleHeuristic,
 )
 
 from .utils import DummyResponse
@@ -203,3 +209,182 @@ class TestModifiedUnitTests:
         modified = self.heuristic.update_headers(resp)
         assert ["expires"] == list(modified.keys())
         assert self.day_ahead == modified["expires"]
+
+
+def prepare(url, headers=None):
+    return requests.Request("GET", url, headers=headers).prepare()
+
+
+class TestAdaptiveTTL:
+    def setup_method(self):
+        self.heuristic = AdaptiveTTL(min_ttl=10, max_ttl=100, initial_ttl=20)
+
+    def fetch(self, url, status=200, headers=None, conditional=False):
+        request_headers = {"If-None-Match": '"x"'} if conditional else None
+        resp = DummyResponse(status, headers or {})
+        return self.heuristic.apply_to(prepare(url, request_headers), resp)
+
+    def test_starts_at_initial_ttl(self):
+        resp = self.fetch("http://a.com/page", headers={"Cache-Control": "public"})
+        assert resp.headers["cache-control"] == "public, max-age=20"
+        assert "date" in resp.headers
+        assert self.heuristic.ttl("http://a.com/page") == 20
+
+    def test_unchanged_grows_and_changed_shrinks(self):
+        url = "http://a.com/page"
+        self.fetch(url)
+        for expected in [40, 80, 100]:
+            resp = self.fetch(url, status=304, conditional=True)
+            assert resp.headers["cache-control"] == f"max-age={expected}"
+        self.fetch(url, conditional=True)
+        assert self.heuristic.ttl(url) == 50
+
+    def test_validators_are_compared(self):
+        url = "http://a.com/page"
+        self.fetch(url, headers={"ETag": '"1"'})
+        self.fetch(url, headers={"ETag": '"1"'})
+        assert self.heuristic.ttl(url) == 40
+        self.fetch(url, headers={"ETag": '"2"'})
+        assert self.heuristic.ttl(url) == 20
+
+    def test_explicit_freshness_is_kept(self):
+        url = "http://a.com/page"
+        self.fetch(url)
+        resp = self.fetch(url, headers={"Cache-Control": "max-age=5"})
+        assert resp.headers["cache-control"] == "max-age=5"
+        assert self.heuristic.ttl(url) is None
+        # Nothing is known about what the 304 updates.
+        resp = self.fetch(url, status=304, conditional=True)
+        assert "cache-control" not in resp.headers
+
+    def test_override(self):
+        self.heuristic.override = True
+        resp = self.fetch(
+            "http://a.com/page",
+            headers={"Cache-Control": "max-age=5", "Expires": "0"},
+        )
+        assert resp.headers["cache-control"] == "max-age=20"
+        assert "expires" not in resp.headers
+
+    def test_patterns_share_a_ttl(self):
+        self.heuristic.patterns = ["http://a.com/item/*"]
+        self.fetch("http://a.com/item/1")
+        self.fetch("http://a.com/item/2", status=304, conditional=True)
+        assert self.heuristic.ttl("http://a.com/item/3") == 40
+
+    def test_least_recently_used_are_forgotten(self):
+        self.heuristic.max_entries = 2
+        for n in range(3):
+            self.fetch(f"http://a.com/{n}")
+        assert self.heuristic.ttl("http://a.com/0") is None
+        assert self.heuristic.ttl("http://a.com/2") == 20
+
+    def test_persisted(self, tmp_path):
+        path = tmp_path / "ttl.json"
+        self.heuristic = AdaptiveTTL(initial_ttl=20, path=path)
+        self.fetch("http://a.com/page")
+        self.fetch("http://a.com/page", status=304, conditional=True)
+        self.heuristic.save()
+        assert AdaptiveTTL(path=path).ttl("http://a.com/page") == 40
+
+        path.write_text("not json")
+        assert AdaptiveTTL(path=path).ttl("http://a.com/page") is None
+
+    @pytest.mark.parametrize(
+        "entries",
+        [
+            "entries",
+            [["http://a.com/page", 40]],
+            [["http://a.com/page", "40"]],
+            [["http://a.com/page", ["40", 1, 0, None]]],
+            [["http://a.com/page", [40, 1, 0, "abc"]]],
+            [[1, [40, 1, 0, None]]],
+            [["http://a.com/page"]],
+        ],
+    )
+    def test_invalid_state_is_ignored(self, tmp_path, caplog, entries):
+        path = tmp_path / "ttl.json"
+        path.write_text(json.dumps({"version": 1, "entries": entries}))
+        heuristic = AdaptiveTTL(path=path)
+        assert "Ignoring invalid AdaptiveTTL state" in caplog.text
+        assert heuristic.ttl("http://a.com/page") is None
+        self.heuristic = heuristic
+        self.fetch("http://a.com/page")
+        assert heuristic.ttl("http://a.com/page") == 300
+
+    def test_session(self, url):
+        heuristic = AdaptiveTTL()
+        sess = CacheControl(Session(), heuristic=heuristic)
+        resp = sess.get(url + "optional_cacheable_request")
+        assert resp.headers["cache-control"] == "max-age=300"
+        assert sess.get(url + "optional_cacheable_request").from_cache
+
+
+class TestRuleHeuristic:
+    def setup_method(self):
+        self.rules = [
+            Rule(host="cdn.example.com", ignore_no_cache=True, ttl=3600),
+            Rule(host="*.example.com", path="/api/", never_cache=True),
+            Rule(host="*.example.com", path="/static/*.css", ttl=60),
+            Rule(path="/images/", content_types=["image/*"], ttl=600),
+            Rule(path="/", methods=["POST"], never_cache=True),
+            Rule(statuses=[404], headers={"x-rule": "missing"}),
+        ]
+        self.heuristic = RuleHeuristic(self.rules)
+
+    def match(self, url, method="GET", status=200, headers=None):
+        request = requests.Request(method, url).prepare()
+        return self.heuristic.match(request, DummyResponse(status, headers or {}))
+
+    def test_match(self):
+        assert self.match("http://cdn.example.com/api/x") is self.rules[0]
+        assert self.match("http://www.example.com/api/x") is self.rules[1]
+        assert self.match("http://a.b.example.com/api/") is self.rules[1]
+        assert self.match("http://example.com/api/x") is None
+        assert self.match("http://www.example.com/api") is None
+        assert self.match("http://www.example.com/static/a/b.css") is self.rules[2]
+        assert self.match("http://www.example.com/static/b.js") is None
+        assert self.match("http://b.com/") is None
+        assert self.match("http://b.com/", method="POST") is self.rules[4]
+        assert self.match("http://b.com/x", status=404) is self.rules[5]
+
+    def test_content_type(self):
+        url = "http://b.com/images/a"
+        assert self.match(url, headers={"Content-Type": "image/png"}) is self.rules[3]
+        assert self.match(url, headers={"Content-Type": "text/html"}) is None
+
+    def test_actions(self):
+        def apply(url, headers, method="GET"):
+            request = requests.Request(method, url).prepare()
+            resp = DummyResponse(200, headers)
+            return self.heuristic.apply_to(request, resp).headers
+
+        headers = apply(
+            "http://cdn.example.com/",
+            {"Cache-Control": "no-cache, max-age=0", "Pragma": "no-cache"},
+        )
+        assert headers["cache-control"] == "max-age=3600"
+        assert "pragma" not in headers
+        assert "date" in headers
+
+        headers = apply("http://b.com/", {"Expires": "0"}, method="POST")
+        assert headers["cache-control"] == "no-store"
+        assert "expires" not in headers
+
+        headers = apply("http://b.com/", {"Cache-Control": "max-age=5"})
+        assert headers["cache-control"] == "max-age=5"
+
+    def test_ttl_overrides_no_store(self):
+        heuristic = RuleHeuristic([Rule(ttl=3600)])
+        request = requests.Request("GET", "http://b.com/").prepare()
+        resp = DummyResponse(200, {"Cache-Control": "no-store, private"})
+
+        headers = heuristic.apply_to(request, resp).headers
+
+        assert headers["cache-control"] == "private, max-age=3600"
+
+    def test_session(self, url):
+        heuristic = RuleHeuristic([Rule(path="/no_cache", ttl=60)])
+        sess = CacheControl(Session(), heuristic=heuristic)
+        sess.get(url + "no_cache")
+        assert sess.get(url + "no_cache").from_cache
@@ -0,0 +1,61 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import calendar
+import time
+from email.utils import parsedate_tz
+
+import pytest
+
+from cachecontrol._httpdate import parse_http_date
+
+EXPECTED = calendar.timegm((1994, 11, 6, 8, 49, 37))
+
+
+class TestParseHttpDate:
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "Sun, 06 Nov 1994 08:49:37 GMT",
+            "Sunday, 06-Nov-94 08:49:37 GMT",
+            "Sun Nov  6 08:49:37 1994",
+            # Not a valid HTTP-date, but accepted by the fallback parser.
+            "Sun, 6 Nov 1994 08:49:37 GMT",
+            "6 Nov 1994 08:49:37 GMT",
+        ],
+    )
+    def test_formats(self, value):
+        assert parse_http_date(value) == EXPECTED
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "",
+            "garbage",
+            "Sun, 06 Foo 1994 08:49:37 GMT",
+            "Sun, 06 Nov 1994 xx:49:37 GMT",
+        ],
+    )
+    def test_invalid(self, value):
+        assert parse_http_date(value) is None
+
+    def test_matches_email_utils(self):
+        now = time.time()
+        for offset in range(0, 400 * 86400, 86400 * 7 + 3601):
+            value = time.strftime(
+                "%a, %d %b %Y %H:%M:%S GMT", time.gmtime(now - offset)
+            )
+            assert parse_http_date(value) == calendar.timegm(parsedate_tz(value)[:6])
+
+    def test_two_digit_years(self):
+        assert parse_http_date("Friday, 01-Jan-21 00:00:00 GMT") == calendar.timegm(
+            (2021, 1, 1, 0, 0, 0)
+        )
+        assert parse_http_date("Thursday, 01-Jan-70 00:00:00 GMT") == 0
+
+    def test_cached(self):
+        parse_http_date.cache_clear()
+        for _ in range(3):
+            parse_http_date("Sun, 06 Nov 1994 08:49:37 GMT")
+        assert parse_http_date.cache_info().hits == 2
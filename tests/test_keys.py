@@ -0,0 +1,125 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import time
+
+import pytest
+
+from cachecontrol import CacheController
+from cachecontrol._keys_cmd import main
+from cachecontrol.cache import DictCache
+from cachecontrol.keys import TRACKING_PARAMS, CacheKeyBuilder, collapse_report
+
+from .utils import DummyRequest, DummyResponse
+
+TIME_FMT = "%a, %d %b %Y %H:%M:%S GMT"
+
+
+class TestCacheKeyBuilder:
+    @pytest.mark.parametrize(
+        ("url", "key"),
+        [
+            ("HTTP://Example.COM", "http://example.com/"),
+            ("http://example.com/a#frag", "http://example.com/a"),
+            ("http://example.com/?b=2&a=1", "http://example.com/?a=1&b=2"),
+            ("http://example.com/?a=2&b=1&a=1", "http://example.com/?a=2&a=1&b=1"),
+            ("http://example.com:80/", "http://example.com/"),
+            ("https://example.com:443/", "https://example.com/"),
+            ("http://example.com:443/", "http://example.com:443/"),
+            ("http://example.com:8080/", "http://example.com:8080/"),
+            (
+                "http://example.com/%7euser/%2f?q=%c3%a9",
+                "http://example.com/~user/%2F?q=%C3%A9",
+            ),
+            ("http://example.com/?", "http://example.com/"),
+        ],
+    )
+    def test_normalization(self, url, key):
+        assert CacheKeyBuilder()(url) == key
+
+    def test_drop_params(self):
+        builder = CacheKeyBuilder(drop_params=TRACKING_PARAMS + ("_",))
+        assert (
+            builder("http://example.com/p?utm_source=x&id=1&_=123&gclid=y&utm_medium=z")
+            == "http://example.com/p?id=1"
+        )
+        assert builder("http://example.com/p?utm_source=x") == "http://example.com/p"
+
+    def test_options_can_be_disabled(self):
+        builder = CacheKeyBuilder(
+            sort_query=False,
+            normalize_percent_encoding=False,
+            remove_default_port=False,
+        )
+        url = "http://example.com:80/%7e?b=1&a=2"
+        assert builder(url) == url
+
+    def test_relative_urls_are_rejected(self):
+        with pytest.raises(Exception, match="Only absolute URIs"):
+            CacheKeyBuilder()("/relative")
+
+
+class TestControllerKeyBuilder:
+    def test_equivalent_urls_share_an_entry(self):
+        controller = CacheController(DictCache(), key_builder=CacheKeyBuilder())
+        resp = DummyResponse(
+            200,
+            {
+                "Cache-Control": "max-age=60",
+                "Date": time.strftime(TIME_FMT, time.gmtime()),
+            },
+        )
+        controller.cache_response(
+            DummyRequest("http://example.com/?b=2&a=1", {}), resp, b"body"
+        )
+
+        assert list(controller.cache.data) == ["http://example.com/?a=1&b=2"]
+        cached = controller.cached_request(
+            DummyRequest("http://EXAMPLE.com:80/?a=1&b=2", {})
+        )
+        assert cached.read() == b"body"
+
+    def test_default_key_is_cache_url(self):
+        controller = CacheController()
+        assert controller.cache_key("HTTP://Example.com?b&a") == (
+            CacheController.cache_url("HTTP://Example.com?b&a")
+        )
+
+
+class TestCollapseReport:
+    keys = [
+        "http://example.com/?a=1&b=2",
+        "http://example.com/?b=2&a=1",
+        "http://example.com/?a=1&b=2&utm_source=x",
+        "http://example.com/other",
+        "not a url",
+    ]
+
+    def test_report(self):
+        report = collapse_report(self.keys, CacheKeyBuilder(drop_params=["utm_*"]))
+        assert report.keys == 5
+        assert report.new_keys == 3
+        assert report.collapsed == 2
+        assert report.groups == {"http://example.com/?a=1&b=2": sorted(self.keys[:3])}
+
+    def test_cli(self, tmp_path, capsys):
+        path = tmp_path / "keys.txt"
+        path.write_text("\n".join(self.keys) + "\n")
+
+        main([str(path), "--drop-tracking"])
+
+        out = capsys.readouterr().out
+        assert "Collapsed:     2 (40.0%)" in out
+        assert "http://example.com/?a=1&b=2 <- 3 keys" in out
+
+    def test_cli_skips_variant_keys(self, tmp_path, capsys):
+        path = tmp_path / "keys.txt"
+        variants = [f"http://example.com/other#vary={c * 56}" for c in "ab"]
+        path.write_text("\n".join(self.keys + variants) + "\n")
+
+        main([str(path), "--drop-tracking"])
+
+        out = capsys.readouterr().out
+        assert "Existing keys: 5" in out
+        assert "Collapsed:     2 (40.0%)" in out
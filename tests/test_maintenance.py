@@ -0,0 +1,220 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import json
+import time
+from unittest.mock import Mock
+
+import pytest
+import requests
+from urllib3 import HTTPResponse
+
+from cachecontrol import CacheController
+from cachecontrol._admin_cmd import main
+from cachecontrol.cache import DictCache
+from cachecontrol.caches import FileCache, SeparateBodyFileCache
+from cachecontrol.maintenance import (
+    CacheReport,
+    FileCacheScanner,
+    RedisCacheScanner,
+    delete_where,
+    describe,
+    scan,
+    url_matches,
+)
+from cachecontrol.serialize import Serializer
+
+TIME_FMT = "%a, %d %b %Y %H:%M:%S GMT"
+
+
+def store(cache, url, headers, body=b"body", request_headers=None, record_url=True):
+    request = requests.Request("GET", url, headers=request_headers).prepare()
+    headers = {"Date": time.strftime(TIME_FMT, time.gmtime()), **headers}
+    response = HTTPResponse(
+        body=io.BytesIO(body), headers=headers, status=200, preload_content=False
+    )
+    controller = CacheController(cache, serializer=Serializer(record_url=record_url))
+    controller.cache_response(request, response, body)
+
+
+def fill(cache):
+    store(cache, "http://a.com/fresh", {"Cache-Control": "max-age=3600"})
+    store(cache, "http://a.com/stale", {"Cache-Control": "max-age=0", "ETag": '"1"'})
+    store(
+        cache,
+        "http://b.com/dead",
+        {"Expires": time.strftime(TIME_FMT, time.gmtime(time.time() - 1))},
+    )
+
+
+class TestDescribe:
+    def test_entry(self):
+        request = requests.Request("GET", "http://a.com/x").prepare()
+        response = HTTPResponse(
+            body=io.BytesIO(b"12345"),
+            headers={
+                "Date": time.strftime(TIME_FMT, time.gmtime()),
+                "Cache-Control": "max-age=60",
+            },
+            status=200,
+            preload_content=False,
+        )
+        data = Serializer(record_url=True).dumps(request, response)
+
+        info = describe("handle", data, body_size=10)
+        assert info.kind == "entry"
+        assert info.url == "http://a.com/x"
+        assert info.host == "a.com"
+        assert info.size == len(data) + 10
+        assert info.state == "fresh"
+        assert info.lifetime == 60
+        assert 55 < info.ttl <= 60
+
+    def test_other_records(self):
+        assert describe("h", b"cc=vary,\x80").kind == "vary-index"
+        assert describe("h", b"cc=3,junk").kind == "unknown"
+        assert describe("h", b"cc=4,\xc1").kind == "unknown"
+
+
+class TestFileCacheScanner:
+    @pytest.mark.parametrize("cache_class", [FileCache, SeparateBodyFileCache])
+    def test_scan(self, tmp_path, cache_class):
+        cache = cache_class(tmp_path)
+        fill(cache)
+        # Not an entry.
+        (tmp_path / "stray").write_bytes(b"x")
+
+        infos = {info.url: info for info in scan(FileCacheScanner(tmp_path))}
+        assert {url: info.state for url, info in infos.items()} == {
+            "http://a.com/fresh": "fresh",
+            "http://a.com/stale": "stale",
+            "http://b.com/dead": "dead",
+        }
+        if cache_class is SeparateBodyFileCache:
+            info = infos["http://a.com/fresh"]
+            assert info.size == len(cache.get("http://a.com/fresh")) + 4
+
+    def test_delete_where(self, tmp_path):
+        cache = SeparateBodyFileCache(tmp_path)
+        fill(cache)
+        scanner = FileCacheScanner(tmp_path)
+
+        dry = list(delete_where(scanner, url_matches("http://a.com/*"), dry_run=True))
+        assert len(dry) == 2
+        assert len(list(scan(scanner))) == 3
+
+        deleted = list(delete_where(scanner, lambda info: info.state == "dead"))
+        assert [info.url for info in deleted] == ["http://b.com/dead"]
+        assert cache.get("http://b.com/dead") is None
+        assert cache.get_body("http://b.com/dead") is None
+        assert cache.get("http://a.com/fresh") is not None
+
+    def test_missing_directory(self, tmp_path):
+        assert list(scan(FileCacheScanner(tmp_path / "missing"))) == []
+
+
+class TestRedisCacheScanner:
+    def test_handles_skip_bodies(self):
+        conn = Mock()
+        conn.scan_iter.return_value = iter([b"cc:a", b"cc:a:body", b"cc:b"])
+        scanner = RedisCacheScanner(conn, prefix="cc:", batch_size=10)
+
+        assert list(scanner.handles()) == ["cc:a", "cc:b"]
+        conn.scan_iter.assert_called_once_with(match="cc:*", count=10)
+
+    @pytest.mark.parametrize("hash_keys", [False, True])
+    def test_url_from_key(self, hash_keys):
+        cache = DictCache()
+        store(
+            cache,
+            "http://a.com/varied",
+            {"Cache-Control": "max-age=60", "Vary": "Accept"},
+            request_headers={"Accept": "text/html"},
+            record_url=False,
+        )
+        conn = Mock()
+        conn.scan_iter.return_value = iter([f"cc:{key}".encode() for key in cache.data])
+        conn.get.side_effect = lambda key: cache.get(key[3:])
+        conn.strlen.return_value = 0
+        scanner = RedisCacheScanner(conn, prefix="cc:", hash_keys=hash_keys)
+
+        infos = list(scan(scanner))
+        assert sorted(info.kind for info in infos) == ["entry", "vary-index"]
+        entry = next(info for info in infos if info.kind == "entry")
+        assert entry.url == (None if hash_keys else "http://a.com/varied")
+
+    def test_delete_removes_body(self):
+        conn = Mock()
+        RedisCacheScanner(conn).delete("a")
+        pipe = conn.pipeline.return_value
+        assert [c.args for c in pipe.delete.call_args_list] == [("a",), ("a:body",)]
+
+
+class TestCacheReport:
+    def test_totals(self, tmp_path):
+        cache = FileCache(tmp_path)
+        fill(cache)
+        store(
+            cache,
+            "http://a.com/varied",
+            {"Cache-Control": "max-age=60", "Vary": "Accept"},
+            request_headers={"Accept": "text/html"},
+        )
+        report = CacheReport()
+        for info in scan(FileCacheScanner(tmp_path)):
+            report.add(info)
+
+        stats = report.as_dict()
+        assert stats["records"] == {"entry": 4, "vary-index": 1}
+        assert stats["states"] == {"fresh": 2, "stale": 1, "dead": 1}
+        assert stats["hosts"]["a.com"]["entries"] == 3
+        assert stats["hosts"]["b.com"]["entries"] == 1
+        assert sum(stats["ages"].values()) == 4
+        assert stats["ttls"]["60"] == 1
+        assert stats["ttls"]["3600"] == 1
+
+
+class TestCommand:
+    def test_stats(self, tmp_path, capsys):
+        fill(FileCache(tmp_path))
+        main(["--dir", str(tmp_path), "stats", "--json"])
+        stats = json.loads(capsys.readouterr().out)
+        assert stats["entries"] == 3
+
+        main(["--dir", str(tmp_path), "stats"])
+        assert "fresh: 1" in capsys.readouterr().out
+
+    def test_dump(self, tmp_path, capsys):
+        fill(FileCache(tmp_path))
+        main(["--dir", str(tmp_path), "dump", "http://a.com/f*"])
+        lines = capsys.readouterr().out.splitlines()
+        assert len(lines) == 1
+        entry = json.loads(lines[0])
+        assert entry["url"] == "http://a.com/fresh"
+        assert entry["headers"]["Cache-Control"] == "max-age=3600"
+
+    def test_prune_and_delete(self, tmp_path, capsys):
+        cache = FileCache(tmp_path)
+        fill(cache)
+        main(["--dir", str(tmp_path), "prune", "--stale"])
+        assert "Deleted 2 entries" in capsys.readouterr().err
+        assert cache.get("http://a.com/stale") is None
+
+        main(["--dir", str(tmp_path), "delete", "--dry-run", "*"])
+        assert "Would delete 1 entries" in capsys.readouterr().err
+        main(["--dir", str(tmp_path), "delete", "*"])
+        assert cache.get("http://a.com/fresh") is None
+
+    def test_warns_without_urls(self, tmp_path, capsys):
+        cache = FileCache(tmp_path)
+        store(cache, "http://a.com/", {"Cache-Control": "max-age=60"}, record_url=False)
+        main(["--dir", str(tmp_path), "dump", "*"])
+        out, err = capsys.readouterr()
+        assert out == ""
+        assert "none of the 1 entries record their URL" in err
+
+        fill(cache)
+        main(["--dir", str(tmp_path), "stats"])
+        assert "Warning" not in capsys.readouterr().err
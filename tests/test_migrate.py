@@ -0,0 +1,178 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import functools
+import io
+import time
+
+import pytest
+import requests
+from urllib3 import HTTPResponse
+
+from cachecontrol import CacheController
+from cachecontrol._admin_cmd import main
+from cachecontrol.cache import DictCache
+from cachecontrol.caches import FileCache, SeparateBodyFileCache
+from cachecontrol.migrate import PARTITIONS, migrate_file_cache
+from cachecontrol.serialize import Serializer
+
+TIME_FMT = "%a, %d %b %Y %H:%M:%S GMT"
+
+
+def get(url, headers=None):
+    return requests.Request("GET", url, headers=headers).prepare()
+
+
+def store(cache, url, headers, body, request_headers=None, record_url=True):
+    headers = {"Date": time.strftime(TIME_FMT, time.gmtime()), **headers}
+    response = HTTPResponse(
+        body=io.BytesIO(body), headers=headers, status=200, preload_content=False
+    )
+    controller = CacheController(cache, serializer=Serializer(record_url=record_url))
+    controller.cache_response(get(url, request_headers), response, body)
+
+
+def fill(cache):
+    for n in range(20):
+        store(cache, f"http://a.com/{n}", {"Cache-Control": "max-age=3600"}, b"%d" % n)
+    store(
+        cache,
+        "http://a.com/dead",
+        {"Expires": time.strftime(TIME_FMT, time.gmtime(time.time() - 1))},
+        b"dead",
+    )
+    # Variants land in different partitions, and share one index.
+    for n in range(5):
+        store(
+            cache,
+            "http://a.com/varied",
+            {"Cache-Control": "max-age=3600", "Vary": "Accept"},
+            b"variant %d" % n,
+            {"Accept": f"type/{n}"},
+        )
+
+
+def fill_legacy(cache):
+    # Entries stored without their URL, as by default and by older versions.
+    for n in range(3):
+        store(
+            cache,
+            f"http://a.com/old/{n}",
+            {"Cache-Control": "max-age=3600"},
+            b"old %d" % n,
+            record_url=False,
+        )
+    store(
+        cache,
+        "http://a.com/old/varied",
+        {"Cache-Control": "max-age=3600", "Vary": "Accept"},
+        b"old varied",
+        {"Accept": "type/a"},
+        record_url=False,
+    )
+
+
+class TestMigrate:
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_migrate(self, tmp_path, workers):
+        source = SeparateBodyFileCache(tmp_path / "source")
+        fill(source)
+        updates = []
+
+        totals = migrate_file_cache(
+            tmp_path / "source",
+            functools.partial(FileCache, tmp_path / "target"),
+            workers=workers,
+            progress=updates.append,
+        )
+        assert (totals.entries, totals.skipped) == (25, 1)
+        assert len(updates) == len(PARTITIONS)
+        assert updates[-1].partitions_done == len(PARTITIONS)
+        assert totals.entries_per_second > 0
+
+        controller = CacheController(FileCache(tmp_path / "target"))
+        assert controller.cached_request(get("http://a.com/7")).read() == b"7"
+        assert controller.cached_request(get("http://a.com/dead")) is False
+        for n in range(5):
+            resp = controller.cached_request(
+                get("http://a.com/varied", {"Accept": f"type/{n}"})
+            )
+            assert resp.read() == b"variant %d" % n
+
+    def test_states(self, tmp_path):
+        fill(FileCache(tmp_path / "source"))
+        totals = migrate_file_cache(
+            tmp_path / "source",
+            functools.partial(FileCache, tmp_path / "target"),
+            states=["stale"],
+            workers=1,
+        )
+        assert (totals.entries, totals.skipped) == (0, 26)
+
+    @pytest.mark.parametrize(
+        "target_class", [FileCache, SeparateBodyFileCache], ids=["file", "separate"]
+    )
+    def test_legacy_entries_keep_their_hash(self, tmp_path, target_class):
+        fill_legacy(SeparateBodyFileCache(tmp_path / "source"))
+        totals = migrate_file_cache(
+            tmp_path / "source",
+            functools.partial(target_class, tmp_path / "target"),
+            workers=1,
+        )
+        assert (totals.entries, totals.without_url) == (4, 0)
+
+        controller = CacheController(target_class(tmp_path / "target"))
+        resp = controller.cached_request(get("http://a.com/old/1"))
+        assert resp.read() == b"old 1"
+        resp = controller.cached_request(
+            get("http://a.com/old/varied", {"Accept": "type/a"})
+        )
+        assert resp.read() == b"old varied"
+
+    def test_legacy_entries_need_hashed_keys(self, tmp_path):
+        fill_legacy(FileCache(tmp_path / "source"))
+        totals = migrate_file_cache(tmp_path / "source", DictCache, workers=1)
+        assert (totals.entries, totals.skipped, totals.without_url) == (0, 4, 4)
+
+
+class TestCommand:
+    def test_migrate(self, tmp_path, capsys):
+        fill(FileCache(tmp_path / "source"))
+        main(
+            [
+                "--dir",
+                str(tmp_path / "source"),
+                "migrate",
+                "--to-dir",
+                str(tmp_path / "target"),
+                "--to-separate-body",
+                "--workers",
+                "2",
+            ]
+        )
+        err = capsys.readouterr().err
+        assert f"[{len(PARTITIONS)}/{len(PARTITIONS)}]" in err
+        assert "Migrated 25 entries" in err
+
+        controller = CacheController(SeparateBodyFileCache(tmp_path / "target"))
+        assert controller.cached_request(get("http://a.com/3")).read() == b"3"
+
+    def test_legacy(self, tmp_path, capsys):
+        fill_legacy(FileCache(tmp_path / "source"))
+        main(
+            [
+                "--dir",
+                str(tmp_path / "source"),
+                "migrate",
+                "--to-dir",
+                str(tmp_path / "target"),
+            ]
+        )
+        assert "Migrated 4 entries" in capsys.readouterr().err
+        controller = CacheController(FileCache(tmp_path / "target"))
+        assert controller.cached_request(get("http://a.com/old/2")).read() == b"old 2"
+
+    def test_needs_a_file_cache(self):
+        with pytest.raises(SystemExit):
+            main(["--redis", "redis://localhost", "migrate", "--to-dir", "x"])
@@ -0,0 +1,82 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import time
+
+from requests import Session
+
+from cachecontrol import CacheControl, prefetch
+from cachecontrol.cache import DictCache
+from cachecontrol.stats import CacheStats
+from cachecontrol.writer import BackgroundWriter
+
+
+class SlowCache(DictCache):
+    def set(self, key, value, expires=None):
+        time.sleep(0.05)
+        super().set(key, value, expires)
+
+
+class TestPrefetch:
+    def test_prefetch_warms_the_cache(self, url):
+        sess = CacheControl(Session())
+        urls = [url + "cache_60/" + str(i) for i in range(20)]
+
+        results = prefetch(sess, urls, concurrency=4)
+
+        assert [r.url for r in results] == urls
+        assert {r.outcome for r in results} == {"cached"}
+        assert {r.status_code for r in results} == {200}
+        assert all(sess.get(u).from_cache for u in urls)
+
+    def test_fresh_urls_are_skipped(self, url):
+        sess = CacheControl(Session())
+        sess.get(url + "cache_60")
+
+        (result,) = prefetch(sess, [url + "cache_60"])
+
+        assert result.outcome == "fresh"
+        assert result.status_code is None
+
+    def test_background_writes_are_waited_for(self, url):
+        writer = BackgroundWriter()
+        sess = CacheControl(Session(), cache=SlowCache(), writer=writer)
+        try:
+            results = prefetch(sess, [url + "cache_60/" + str(i) for i in range(3)])
+        finally:
+            writer.close()
+
+        assert {r.outcome for r in results} == {"cached"}
+
+    def test_probes_are_not_counted(self, url):
+        stats = CacheStats()
+        sess = CacheControl(Session(), listeners=[stats])
+
+        prefetch(sess, [url + "cache_60/1", url + "cache_60/2"])
+
+        assert (stats.misses, stats.hits, stats.stores) == (2, 0, 2)
+
+    def test_uncacheable(self, url):
+        sess = CacheControl(Session())
+
+        (result,) = prefetch(sess, [url + "no_cache"])
+
+        assert result.outcome == "uncached"
+        assert result.status_code == 200
+
+    def test_method_must_be_cacheable(self, url):
+        sess = CacheControl(Session())
+
+        (result,) = prefetch(sess, [url], method="POST")
+
+        assert result.outcome == "failed"
+        assert isinstance(result.error, ValueError)
+
+    def test_errors_are_reported(self):
+        sess = CacheControl(Session())
+
+        (result,) = prefetch(sess, ["http://127.0.0.1:1/"], timeout=1)
+
+        assert result.outcome == "failed"
+        assert result.error is not None
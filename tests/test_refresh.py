@@ -0,0 +1,79 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+from unittest import mock
+
+import pytest
+from requests import Request, Session
+
+from cachecontrol import CacheControl, CacheControlAdapter
+from cachecontrol.refresh import BackgroundRefresher
+
+from .utils import DummyResponse
+
+
+class TestBackgroundRefresher:
+    @pytest.fixture()
+    def refresher(self):
+        refresher = BackgroundRefresher(min_hits=3, refresh_at=0.5)
+        yield refresher
+        refresher.close()
+
+    def session(self, refresher, current_age):
+        sess = CacheControl(Session(), refresher=refresher)
+        adapter = sess.get_adapter("http://")
+        adapter.controller._freshness = mock.Mock(return_value=(current_age, 60))
+        return sess
+
+    def revalidated(self, sess, url):
+        # The default route echoes the request headers in its body.
+        return "'HTTP_CACHE_CONTROL': 'max-age=0'" in sess.get(url).text
+
+    def test_hot_entry_is_refreshed(self, url, refresher):
+        sess = self.session(refresher, current_age=45)
+        for _ in range(4):
+            assert not self.revalidated(sess, url)
+
+        refresher.close()
+
+        resp = sess.get(url)
+        assert resp.from_cache
+        assert self.revalidated(sess, url)
+
+    def test_cold_entry_is_not_refreshed(self, url, refresher):
+        sess = self.session(refresher, current_age=45)
+        sess.get(url)
+        sess.get(url)
+
+        refresher.close()
+
+        assert not self.revalidated(sess, url)
+
+    def test_entry_not_due_is_not_refreshed(self, url, refresher):
+        sess = self.session(refresher, current_age=10)
+        for _ in range(5):
+            sess.get(url)
+
+        refresher.close()
+
+        assert not self.revalidated(sess, url)
+
+    def test_window_resets_hits(self, url):
+        refresher = BackgroundRefresher(min_hits=2, window=0)
+        sess = self.session(refresher, current_age=59)
+        for _ in range(4):
+            sess.get(url)
+
+        refresher.close()
+
+        assert not self.revalidated(sess, url)
+
+    def test_permanent_redirect_without_date(self, refresher):
+        # Cached 301s are served whatever their headers, Date included.
+        adapter = CacheControlAdapter()
+        request = Request("GET", "http://example.com/moved").prepare()
+        response = DummyResponse(301, {"Location": "/permalink"})
+        for _ in range(4):
+            refresher.record_hit(adapter, request, response)
+        assert not refresher._pending
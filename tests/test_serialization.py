@@ -2,12 +2,13 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import io
 from unittest.mock import Mock
 
 import msgpack
 import requests
 
-from cachecontrol.serialize import Serializer
+from cachecontrol.serialize import Serializer, loads_raw
 
 
 class TestSerializer:
@@ -114,3 +115,21 @@ class TestSerializer:
         self.serializer.dumps(resp.request, resp.raw)
 
         assert resp.content == b"0123456789"
+
+    def test_loads_entry_closes_the_body_file(self):
+        req = requests.Request("GET", "http://example.com/").prepare()
+        data = b"cc=4," + msgpack.dumps(self.response_data)
+        body_file = io.BytesIO(b"Separate body")
+
+        entry = self.serializer.loads_entry(req, data, body_file)
+
+        assert entry.body == b"Separate body"
+        assert body_file.closed
+
+    def test_url_is_only_recorded_when_asked(self, url):
+        resp = requests.get(url + "?token=secret")
+        req = resp.request
+
+        assert "url" not in loads_raw(self.serializer.dumps(req, resp.raw, b""))
+        raw = loads_raw(Serializer(record_url=True).dumps(req, resp.raw, b""))
+        assert raw["url"] == url + "?token=secret"
@@ -0,0 +1,187 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import time
+
+import pytest
+import requests
+from urllib3 import HTTPResponse
+
+from cachecontrol import CacheController
+from cachecontrol._admin_cmd import main
+from cachecontrol.cache import DictCache
+from cachecontrol.caches import FileCache, SeparateBodyFileCache
+from cachecontrol.keys import CacheKeyBuilder
+from cachecontrol.maintenance import CacheScanner, FileCacheScanner
+from cachecontrol.serialize import Serializer
+from cachecontrol.snapshot import (
+    SnapshotError,
+    export_snapshot,
+    import_snapshot,
+    read_snapshot,
+)
+
+TIME_FMT = "%a, %d %b %Y %H:%M:%S GMT"
+
+
+def get(url, headers=None):
+    return requests.Request("GET", url, headers=headers).prepare()
+
+
+def store(cache, url, headers, body, request_headers=None, record_url=True):
+    headers = {"Date": time.strftime(TIME_FMT, time.gmtime()), **headers}
+    response = HTTPResponse(
+        body=io.BytesIO(body), headers=headers, status=200, preload_content=False
+    )
+    controller = CacheController(cache, serializer=Serializer(record_url=record_url))
+    controller.cache_response(get(url, request_headers), response, body)
+
+
+def fill(cache):
+    store(cache, "http://a.com/fresh", {"Cache-Control": "max-age=3600"}, b"fresh")
+    store(
+        cache,
+        "http://a.com/stale",
+        {"Cache-Control": "max-age=0", "ETag": '"1"'},
+        b"stale",
+    )
+    store(
+        cache,
+        "http://a.com/dead",
+        {"Expires": time.strftime(TIME_FMT, time.gmtime(time.time() - 1))},
+        b"dead",
+    )
+    for accept in ["text/html", "application/json"]:
+        store(
+            cache,
+            "http://a.com/varied",
+            {"Cache-Control": "max-age=3600", "Vary": "Accept"},
+            accept.encode(),
+            {"Accept": accept},
+        )
+
+
+class TestSnapshot:
+    @pytest.mark.parametrize("cache_class", [FileCache, SeparateBodyFileCache])
+    def test_round_trip(self, tmp_path, cache_class):
+        fill(cache_class(tmp_path))
+        snapshot = io.BytesIO()
+        result = export_snapshot(FileCacheScanner(tmp_path), snapshot)
+        # The vary index isn't exported.
+        assert (result.entries, result.skipped) == (5, 1)
+
+        snapshot.seek(0)
+        controller = CacheController(DictCache())
+        result = import_snapshot(snapshot, controller)
+        # The dead entry's expiry is over.
+        assert (result.entries, result.skipped) == (4, 1)
+
+        resp = controller.cached_request(get("http://a.com/fresh"))
+        assert resp.read() == b"fresh"
+        assert controller.cached_request(get("http://a.com/stale")) is False
+        assert controller.cache.get(controller.cache_key("http://a.com/stale"))
+        for accept in ["text/html", "application/json"]:
+            resp = controller.cached_request(
+                get("http://a.com/varied", {"Accept": accept})
+            )
+            assert resp.read() == accept.encode()
+
+    def test_filter_and_rekey(self, tmp_path):
+        fill(FileCache(tmp_path))
+        snapshot = io.BytesIO()
+        export_snapshot(
+            FileCacheScanner(tmp_path), snapshot, lambda info: info.state == "fresh"
+        )
+        snapshot.seek(0)
+        assert sorted(header["url"] for header, _ in read_snapshot(snapshot)) == [
+            "http://a.com/fresh",
+            "http://a.com/varied",
+            "http://a.com/varied",
+        ]
+
+        snapshot.seek(0)
+        controller = CacheController(
+            DictCache(), key_builder=CacheKeyBuilder(drop_params=["utm_*"])
+        )
+        import_snapshot(snapshot, controller)
+        assert controller.cached_request(get("http://a.com/fresh?utm_source=x"))
+
+    def test_invalid(self):
+        with pytest.raises(SnapshotError):
+            list(read_snapshot(io.BytesIO(b"not a snapshot")))
+
+        snapshot = io.BytesIO()
+        cache = DictCache()
+        store(cache, "http://a.com/", {"Cache-Control": "max-age=60"}, b"body")
+        export_snapshot(_DictScanner(cache), snapshot)
+        with pytest.raises(SnapshotError):
+            list(read_snapshot(io.BytesIO(snapshot.getvalue()[:-1])))
+
+    def test_url_from_scanner(self):
+        cache = DictCache()
+        store(
+            cache,
+            "http://a.com/",
+            {"Cache-Control": "max-age=60"},
+            b"a",
+            record_url=False,
+        )
+        result = export_snapshot(_DictScanner(cache), io.BytesIO())
+        assert (result.entries, result.skipped, result.without_url) == (0, 1, 1)
+
+        snapshot = io.BytesIO()
+        result = export_snapshot(_KeyScanner(cache), snapshot)
+        assert (result.entries, result.without_url) == (1, 0)
+        snapshot.seek(0)
+        assert [header["url"] for header, _ in read_snapshot(snapshot)] == [
+            "http://a.com/"
+        ]
+
+
+class _DictScanner(CacheScanner):
+    def __init__(self, cache):
+        self.cache = cache
+
+    def handles(self):
+        return iter(list(self.cache.data))
+
+    def read(self, handle):
+        return self.cache.get(handle)
+
+
+class _KeyScanner(_DictScanner):
+    def url(self, handle):
+        return handle
+
+
+class TestCommand:
+    def test_export_import(self, tmp_path, capsys):
+        source, target = tmp_path / "source", tmp_path / "target"
+        fill(FileCache(source))
+        snapshot = str(tmp_path / "snapshot")
+
+        main(["--dir", str(source), "export", snapshot, "--pattern", "*/fresh"])
+        assert "Exported 1 entries" in capsys.readouterr().err
+
+        main(["--dir", str(target), "--separate-body", "import", snapshot])
+        assert "Imported 1 entries" in capsys.readouterr().err
+        controller = CacheController(SeparateBodyFileCache(target))
+        assert controller.cached_request(get("http://a.com/fresh")).read() == b"fresh"
+
+    def test_nothing_exported(self, tmp_path, capsys):
+        store(
+            FileCache(tmp_path),
+            "http://a.com/",
+            {"Cache-Control": "max-age=60"},
+            b"a",
+            record_url=False,
+        )
+        with pytest.raises(SystemExit, match="No entries were exported"):
+            main(["--dir", str(tmp_path), "export", str(tmp_path / "snapshot")])
+        assert "1 entries were not exported" in capsys.readouterr().err
+
+    def test_unknown_state(self, tmp_path):
+        with pytest.raises(SystemExit):
+            main(["--dir", str(tmp_path), "export", "-", "--states", "bogus"])
@@ -0,0 +1,199 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import time
+from urllib.parse import urljoin
+
+import pytest
+import requests
+
+from cachecontrol import AsyncCacheController, CacheControl, CacheController
+from cachecontrol.stats import (
+    CacheListener,
+    CacheStats,
+    Histogram,
+    ListenerGroup,
+    TimingHistograms,
+)
+
+from .utils import DummyRequest, DummyResponse
+
+TIME_FMT = "%a, %d %b %Y %H:%M:%S GMT"
+
+
+class TestCacheStats:
+    @pytest.fixture()
+    def sess(self):
+        self.stats = CacheStats()
+        return CacheControl(requests.Session(), listeners=[self.stats])
+
+    def test_hits_and_misses(self, sess, url):
+        sess.get(url)
+        resp = sess.get(url)
+        sess.get(url, stream=True).content  # noqa: B018
+
+        assert self.stats.misses == 1
+        assert self.stats.stores == 1
+        assert self.stats.hits == 2
+        assert self.stats.bytes_served == 2 * len(resp.content)
+        assert self.stats.hit_ratio == pytest.approx(2 / 3)
+
+    def test_revalidation(self, sess, url):
+        sess.get(urljoin(url, "etag"))
+        resp = sess.get(urljoin(url, "etag"))
+
+        assert resp.from_cache
+        assert self.stats.stale_hits == 1
+        assert self.stats.revalidations == 1
+
+    def test_uncacheable_reasons(self, sess, url):
+        sess.get(urljoin(url, "no_cache"))
+        sess.get(url, headers={"Cache-Control": "no-store"})
+
+        assert self.stats.uncacheable_reasons == {"no-freshness": 1, "no-store": 1}
+
+    def test_bypass_and_purge(self, sess, url):
+        sess.get(url)
+        sess.get(url, headers={"Cache-Control": "no-cache"})
+        sess.put(url)
+
+        assert self.stats.bypassed == 1
+        assert self.stats.purges == 1
+
+    def test_as_dict_and_reset(self, sess, url):
+        sess.get(url)
+        assert self.stats.as_dict()["misses"] == 1
+
+        self.stats.reset()
+        assert self.stats.as_dict() == {
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "bypassed": 0,
+            "revalidated": 0,
+            "stored": 0,
+            "purged": 0,
+            "bytes_served": 0,
+            "uncacheable": {},
+            "hit_ratio": 0.0,
+        }
+
+
+class TestListeners:
+    def test_no_listener_by_default(self):
+        assert CacheController().listener is None
+
+    def test_several_listeners(self):
+        first, second = CacheStats(), CacheStats()
+        controller = CacheController(listeners=[first])
+        assert controller.listener is first
+
+        controller.add_listener(second)
+        assert isinstance(controller.listener, ListenerGroup)
+        controller.cached_request(DummyRequest("http://example.com/", {}))
+        assert first.misses == second.misses == 1
+
+        controller.remove_listener(first)
+        controller.remove_listener(second)
+        assert controller.listener is None
+
+    def test_partial_listener(self):
+        class Hits(CacheListener):
+            hits = 0
+
+            def hit(self, request, size):
+                self.hits += 1
+
+        listener = Hits()
+        controller = CacheController(listeners=[listener])
+        resp = DummyResponse(
+            200,
+            {
+                "Cache-Control": "max-age=60",
+                "Date": time.strftime(TIME_FMT, time.gmtime()),
+            },
+        )
+        req = DummyRequest("http://example.com/", {})
+        controller.cache_response(req, resp, b"body")
+        assert controller.cached_request(req)
+        assert listener.hits == 1
+
+    def test_async_controller(self):
+        stats = CacheStats()
+        controller = AsyncCacheController(listeners=[stats])
+        req = DummyRequest("http://example.com/", {})
+        resp = DummyResponse(
+            200,
+            {
+                "Cache-Control": "max-age=60",
+                "Date": time.strftime(TIME_FMT, time.gmtime()),
+            },
+        )
+
+        async def go():
+            await controller.cached_request(req)
+            await controller.cache_response(req, resp, b"body")
+            await controller.cached_request(req)
+
+        asyncio.run(go())
+        assert (stats.misses, stats.stores, stats.hits) == (1, 1, 1)
+        assert stats.bytes_served == 4
+
+
+class TestHistogram:
+    def test_observe(self):
+        histogram = Histogram([1, 10, 100])
+        for value in [0.5, 1, 5, 50, 500]:
+            histogram.observe(value)
+
+        assert histogram.count == 5
+        assert histogram.sum == 556.5
+        assert histogram.cumulative() == [(1, 2), (10, 3), (100, 4), (float("inf"), 5)]
+        assert histogram.quantile(0.5) == 10
+        assert histogram.quantile(1.0) == float("inf")
+
+    def test_empty(self):
+        assert Histogram([1]).quantile(0.5) == 0.0
+
+
+class TestTimingHistograms:
+    def test_phases(self, url):
+        timings = TimingHistograms()
+        sess = CacheControl(requests.Session(), listeners=[timings])
+        sess.get(url)
+        sess.get(url)
+
+        assert set(timings.phases) == {
+            "lookup",
+            "backend_get",
+            "deserialize",
+            "build_response",
+            "store",
+            "serialize",
+            "backend_set",
+        }
+        assert timings.phases["lookup"].count == 2
+        assert timings.phases["deserialize"].count == 1
+        assert timings.hit_sizes.count == 1
+
+        summary = timings.summary()
+        assert summary["lookup"]["count"] == 2
+        assert 0 < summary["lookup"]["mean"] <= summary["lookup"]["p99"]
+
+    def test_prometheus(self):
+        timings = TimingHistograms(time_buckets=[0.001, 0.01])
+        timings.timing("lookup", 0.005)
+        timings.timing("lookup", 0.02)
+
+        text = timings.prometheus()
+        assert "# TYPE cachecontrol_phase_seconds histogram\n" in text
+        assert (
+            'cachecontrol_phase_seconds_bucket{phase="lookup",le="0.001"} 0\n' in text
+        )
+        assert 'cachecontrol_phase_seconds_bucket{phase="lookup",le="0.01"} 1\n' in text
+        assert 'cachecontrol_phase_seconds_bucket{phase="lookup",le="+Inf"} 2\n' in text
+        assert 'cachecontrol_phase_seconds_count{phase="lookup"} 2\n' in text
+        assert 'cachecontrol_hit_size_bytes_bucket{le="+Inf"} 0\n' in text
+        assert "cachecontrol_hit_size_bytes_count 0\n" in text
@@ -5,7 +5,11 @@
 from datetime import datetime, timezone
 from unittest.mock import Mock
 
-from cachecontrol.caches import RedisCache
+from cachecontrol.caches import (
+    RedisCache,
+    RedisInvalidationChannel,
+    SeparateBodyRedisCache,
+)
 
 
 class TestRedisCache:
@@ -24,3 +28,131 @@ class TestRedisCache:
     def test_set_expiration_int(self):
         self.cache.set("foo", "bar", expires=600)
         assert self.conn.setex.called
+
+    def test_prefix_is_applied_to_keys(self):
+        cache = RedisCache(self.conn, prefix="cc:")
+        cache.get("foo")
+        cache.set("foo", b"bar")
+        cache.delete("foo")
+        self.conn.get.assert_called_with("cc:foo")
+        self.conn.set.assert_called_with("cc:foo", b"bar")
+        self.conn.delete.assert_called_with("cc:foo")
+
+    def test_clear_scans_and_unlinks_in_batches(self):
+        self.conn.scan_iter.return_value = iter([b"a", b"b", b"c"])
+        pipe = self.conn.pipeline.return_value
+        cache = RedisCache(self.conn, prefix="cc:", clear_batch_size=2)
+        cache.clear()
+
+        self.conn.scan_iter.assert_called_once_with(match="cc:*", count=2)
+        assert not self.conn.keys.called
+        assert [c.args for c in pipe.unlink.call_args_list] == [
+            (b"a",),
+            (b"b",),
+            (b"c",),
+        ]
+        assert pipe.execute.call_count == 2
+
+    def test_clear_escapes_glob_characters_in_prefix(self):
+        self.conn.scan_iter.return_value = iter([])
+        RedisCache(self.conn, prefix="cc[1]*").clear()
+        self.conn.scan_iter.assert_called_once_with(match="cc\\[1\\]\\**", count=1000)
+
+    def test_hash_keys(self):
+        cache = RedisCache(self.conn, prefix="cc:", hash_keys=True)
+        cache.get("foo")
+        self.conn.get.assert_called_with(
+            "cc:0808f64e60d58979fcb676c96ec938270dea42445aeefcd3a4e6f8db"
+        )
+
+
+class TestSeparateBodyRedisCache:
+    def setup_method(self):
+        self.conn = Mock()
+        self.pipe = self.conn.pipeline.return_value
+        self.cache = SeparateBodyRedisCache(self.conn, prefix="cc:", body_chunk_size=4)
+
+    def test_set_keeps_body_ttl_in_step(self):
+        self.cache.set("foo", b"meta", expires=600)
+        self.pipe.setex.assert_called_once_with("cc:foo", 600, b"meta")
+        self.pipe.expire.assert_called_once_with("cc:foo:body", 600)
+        assert self.pipe.execute.called
+
+    def test_set_without_expiry_persists_body(self):
+        self.cache.set("foo", b"meta")
+        self.pipe.set.assert_called_once_with("cc:foo", b"meta")
+        self.pipe.persist.assert_called_once_with("cc:foo:body")
+
+    def test_set_body_copies_metadata_ttl(self):
+        self.conn.pttl.return_value = 5000
+        self.cache.set_body("foo", b"body")
+        self.conn.pttl.assert_called_once_with("cc:foo")
+        self.conn.set.assert_called_once_with("cc:foo:body", b"body", px=5000)
+
+    def test_set_body_without_metadata_ttl(self):
+        self.conn.pttl.return_value = -1
+        self.cache.set_body("foo", b"body")
+        self.conn.set.assert_called_once_with("cc:foo:body", b"body", px=None)
+
+    def test_get_body_missing(self):
+        self.conn.strlen.return_value = 0
+        self.conn.get.return_value = None
+        assert self.cache.get_body("foo") is None
+
+    def test_get_body_small_is_fetched_whole(self):
+        self.conn.strlen.return_value = 3
+        self.conn.get.return_value = b"abc"
+        assert self.cache.get_body("foo").read() == b"abc"
+        assert not self.conn.getrange.called
+
+    def test_get_body_large_is_streamed_in_chunks(self):
+        body = b"0123456789"
+        self.conn.strlen.return_value = len(body)
+        self.conn.getrange.side_effect = lambda key, start, end: body[start : end + 1]
+
+        fh = self.cache.get_body("foo")
+        assert fh.read(2) == b"01"
+        assert fh.read() == b"23456789"
+        assert [c.args[1:] for c in self.conn.getrange.call_args_list] == [
+            (0, 3),
+            (4, 7),
+            (8, 9),
+        ]
+
+    def test_delete_removes_metadata_and_body(self):
+        self.cache.delete("foo")
+        assert [c.args for c in self.pipe.delete.call_args_list] == [
+            ("cc:foo",),
+            ("cc:foo:body",),
+        ]
+
+
+class TestRedisInvalidationChannel:
+    def setup_method(self):
+        self.conn = Mock()
+        self.pubsub = self.conn.pubsub.return_value
+        self.channel = RedisInvalidationChannel(self.conn, channel="inv")
+
+    def test_publish(self):
+        self.channel.publish("http://example.com/")
+        self.conn.publish.assert_called_once_with("inv", "http://example.com/")
+
+    def test_subscribe_dispatches_messages(self):
+        received = []
+        self.channel.subscribe(received.append)
+        self.channel.subscribe(received.append)
+
+        # Only a single subscription and listener thread is used.
+        assert self.conn.pubsub.call_count == 1
+        assert self.pubsub.run_in_thread.call_count == 1
+        handler = self.pubsub.subscribe.call_args.kwargs["inv"]
+
+        handler({"type": "message", "data": b"http://example.com/"})
+        assert received == ["http://example.com/", "http://example.com/"]
+
+    def test_close_stops_listener(self):
+        self.channel.subscribe(lambda key: None)
+        thread = self.pubsub.run_in_thread.return_value
+        self.channel.close()
+        assert thread.stop.called
+        assert self.pubsub.close.called
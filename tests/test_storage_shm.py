@@ -0,0 +1,84 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Unit tests that verify the SharedMemoryCache works correctly.
+"""
+
+import multiprocessing
+
+import pytest
+
+pytest.importorskip("fcntl")
+
+from cachecontrol.caches.shm_cache import SharedMemoryCache  # noqa: E402
+
+
+def write_from_child(path, key, value):
+    cache = SharedMemoryCache(path)
+    cache.set(key, value)
+    cache.close()
+
+
+class TestSharedMemoryCache:
+    @pytest.fixture()
+    def cache(self, tmp_path):
+        self.path = str(tmp_path / "cache.shm")
+        cache = SharedMemoryCache(self.path, size=64 * 1024, slab_sizes=(64, 1024))
+        yield cache
+        cache.close()
+
+    def test_set_get_delete(self, cache):
+        assert cache.get("a") is None
+        cache.set("a", b"1")
+        assert cache.get("a") == b"1"
+        cache.delete("a")
+        assert cache.get("a") is None
+
+    def test_overwrite_moves_between_slab_classes(self, cache):
+        cache.set("a", b"small")
+        cache.set("a", b"x" * 500)
+        assert cache.get("a") == b"x" * 500
+        cache.set("a", b"small again")
+        assert cache.get("a") == b"small again"
+
+    def test_expired_entries_are_not_returned(self, cache):
+        cache.set("a", b"1", expires=-1)
+        assert cache.get("a") is None
+
+    def test_too_large_entries_are_not_cached(self, cache):
+        cache.set("a", b"1")
+        cache.set("a", b"x" * 2048)
+        assert cache.get("a") is None
+
+    def test_slabs_are_reused_when_full(self, cache):
+        for i in range(1000):
+            cache.set(f"key-{i}", str(i).encode())
+        # Everything that is still cached is returned correctly, and the
+        # most recent write always is.
+        for i in range(1000):
+            assert cache.get(f"key-{i}") in (None, str(i).encode())
+        assert cache.get("key-999") == b"999"
+
+    def test_reopen_uses_existing_layout(self, cache):
+        cache.set("a", b"1")
+        other = SharedMemoryCache(self.path, size=1024, slab_sizes=(16,))
+        assert other.classes == cache.classes
+        assert other.get("a") == b"1"
+        other.close()
+
+    def test_not_a_cache_file(self, tmp_path):
+        path = tmp_path / "garbage"
+        path.write_bytes(b"x" * 128)
+        with pytest.raises(ValueError):
+            SharedMemoryCache(path)
+
+    def test_shared_between_processes(self, cache):
+        proc = multiprocessing.Process(
+            target=write_from_child, args=(self.path, "a", b"from child")
+        )
+        proc.start()
+        proc.join()
+        assert proc.exitcode == 0
+        assert cache.get("a") == b"from child"
@@ -0,0 +1,117 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Unit tests that verify the TieredCache works correctly.
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+
+from cachecontrol.cache import DictCache
+from cachecontrol.caches import LocalInvalidationChannel, TieredCache
+
+
+class TestTieredCache:
+    def setup_method(self):
+        self.backend = DictCache()
+        self.cache = TieredCache(self.backend, max_entries=2)
+
+    def test_set_writes_through(self):
+        self.cache.set("a", b"1", expires=60)
+        assert self.backend.get("a") == b"1"
+        assert self.cache.get("a") == b"1"
+        assert self.cache.stats.l1_hits == 1
+
+    def test_get_promotes_from_backend(self):
+        self.backend.set("a", b"1")
+        assert self.cache.get("a") == b"1"
+        assert self.cache.get("a") == b"1"
+        assert self.cache.stats.l2_hits == 1
+        assert self.cache.stats.l1_hits == 1
+
+    def test_miss(self):
+        assert self.cache.get("a") is None
+        assert self.cache.stats.misses == 1
+        assert self.cache.stats.l1_hit_rate == 0.0
+
+    def test_delete_invalidates_both_tiers(self):
+        self.cache.set("a", b"1")
+        self.cache.delete("a")
+        assert self.backend.get("a") is None
+        assert self.cache.get("a") is None
+
+    def test_lru_eviction(self):
+        self.cache.set("a", b"1")
+        self.cache.set("b", b"2")
+        self.cache.get("a")
+        self.cache.set("c", b"3")
+
+        # "b" was the least recently used, so it has to come from the backend.
+        self.cache.get("b")
+        assert self.cache.stats.l2_hits == 1
+        assert self.cache.stats.l1_hits == 1
+
+    def test_max_bytes(self):
+        cache = TieredCache(self.backend, max_bytes=4)
+        cache.set("a", b"12")
+        cache.set("b", b"34")
+        cache.set("c", b"5")
+        cache.set("big", b"123456")
+        assert set(cache._entries) == {"b", "c"}
+        assert cache._size == 3
+
+    def test_expired_entries_are_not_served_from_memory(self):
+        backend = Mock()
+        backend.get.return_value = None
+        cache = TieredCache(backend)
+        cache.set("a", b"1", expires=datetime.now(timezone.utc) - timedelta(1))
+        assert cache.get("a") is None
+        assert backend.get.called
+
+    def test_ttl_bounds_promoted_entries(self):
+        cache = TieredCache(self.backend, ttl=-1)
+        self.backend.set("a", b"1")
+        cache.get("a")
+        cache.get("a")
+        assert cache.stats.l2_hits == 2
+
+    def test_hit_rates(self):
+        self.backend.set("a", b"1")
+        self.cache.get("a")
+        self.cache.get("a")
+        self.cache.get("missing")
+        assert self.cache.stats.lookups == 3
+        assert self.cache.stats.l1_hit_rate == 1 / 3
+        assert self.cache.stats.l2_hit_rate == 1 / 2
+
+    def test_close_closes_backend(self):
+        backend = Mock()
+        TieredCache(backend).close()
+        assert backend.close.called
+
+
+class TestInvalidationChannel:
+    def setup_method(self):
+        self.backend = DictCache()
+        self.channel = LocalInvalidationChannel()
+        self.worker1 = TieredCache(self.backend, channel=self.channel)
+        self.worker2 = TieredCache(self.backend, channel=self.channel)
+
+    def test_delete_evicts_other_workers(self):
+        self.worker1.set("a", b"1")
+        assert self.worker2.get("a") == b"1"
+        assert "a" in self.worker2._entries
+
+        self.worker1.delete("a")
+        assert "a" not in self.worker2._entries
+        assert self.worker2.get("a") is None
+
+    def test_invalidation_does_not_touch_backend(self):
+        backend = Mock()
+        cache = TieredCache(backend, channel=self.channel)
+        cache.set("a", b"1")
+        self.channel.publish("a")
+        assert "a" not in cache._entries
+        assert not backend.delete.called
@@ -0,0 +1,89 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+from contextlib import contextmanager
+from urllib.parse import urljoin
+
+import pytest
+import requests
+
+from cachecontrol import CacheControl
+from cachecontrol.cache import DictCache
+
+
+class FakeSpan:
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.events = []
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def add_event(self, name, attributes=None):
+        self.events.append((name, dict(attributes or {})))
+
+
+class FakeTracer:
+    def __init__(self):
+        self.spans = []
+
+    @contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        span = FakeSpan(name, attributes)
+        self.spans.append(span)
+        yield span
+
+
+class TestTracing:
+    @pytest.fixture()
+    def sess(self):
+        self.tracer = FakeTracer()
+        return CacheControl(requests.Session(), cache=DictCache(), tracer=self.tracer)
+
+    def spans(self, name):
+        return [span for span in self.tracer.spans if span.name == name]
+
+    def test_miss_store_and_hit(self, sess, url):
+        sess.get(url)
+        resp = sess.get(url)
+
+        miss, hit = self.spans("cachecontrol.send")
+        assert miss.attributes["cachecontrol.outcome"] == "miss"
+        assert miss.attributes["cachecontrol.backend"] == "DictCache"
+        assert miss.attributes["http.request.method"] == "GET"
+        assert "cachecontrol.backend_get_ms" in miss.attributes
+
+        assert hit.attributes["cachecontrol.outcome"] == "hit"
+        assert hit.attributes["cachecontrol.entry_size"] == len(resp.content)
+        assert hit.attributes["cachecontrol.deserialize_ms"] >= 0
+
+        (store,) = self.spans("cachecontrol.store")
+        assert store.attributes["cachecontrol.key"] == url
+        assert store.attributes["cachecontrol.entry_size"] == len(resp.content)
+        assert store.attributes["cachecontrol.serialize_ms"] >= 0
+        assert store.attributes["cachecontrol.backend_set_ms"] >= 0
+
+    def test_revalidation(self, sess, url):
+        sess.get(urljoin(url, "etag"))
+        sess.get(urljoin(url, "etag"))
+
+        span = self.spans("cachecontrol.send")[-1]
+        assert span.attributes["cachecontrol.outcome"] == "revalidated"
+
+    def test_uncacheable_and_purge(self, sess, url):
+        sess.get(urljoin(url, "no_cache"))
+        (store,) = self.spans("cachecontrol.store")
+        assert store.attributes["cachecontrol.uncacheable_reason"] == "no-freshness"
+
+        sess.get(url)
+        sess.put(url)
+        span = self.spans("cachecontrol.send")[-1]
+        assert span.events == [("cachecontrol.purge", {"cachecontrol.key": url})]
+
+    def test_events_outside_a_span_are_ignored(self, sess, url):
+        listener = sess.adapters["http://"].span_listener
+        listener.miss(None)
+        listener.timing("backend_get", 0.1)
+        assert self.tracer.spans == []
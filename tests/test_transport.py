@@ -0,0 +1,166 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Tests for the httpx caching transport.
+"""
+
+import asyncio
+import gzip
+import os
+import time
+
+import pytest
+import requests
+
+from cachecontrol import CacheControl
+from cachecontrol.cache import AsyncDictCache
+from cachecontrol.caches import AsyncFileCache, FileCache
+from cachecontrol.heuristics import ExpiresAfter
+from cachecontrol.stats import CacheStats
+
+httpx = pytest.importorskip("httpx")
+
+from cachecontrol.transport import AsyncCacheControlTransport  # noqa: E402
+
+TIME_FMT = "%a, %d %b %Y %H:%M:%S GMT"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class Origin:
+    """A mock origin server that counts its requests."""
+
+    def __init__(self, headers=None, content=b"hello", status_code=200):
+        self.headers = {"Date": time.strftime(TIME_FMT, time.gmtime())}
+        self.headers.update(headers or {})
+        self.content = content
+        self.status_code = status_code
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        return httpx.Response(
+            self.status_code, headers=self.headers, content=self.content
+        )
+
+
+def get(transport, url="http://example.com/", method="GET"):
+    async def go():
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.request(method, url)
+            await response.aread()
+            return response
+
+    return run(go())
+
+
+class TestAsyncCacheControlTransport:
+    def transport(self, origin, **kw):
+        kw.setdefault("cache", AsyncDictCache())
+        return AsyncCacheControlTransport(httpx.MockTransport(origin), **kw)
+
+    def test_fresh_response_is_served_from_cache(self):
+        origin = Origin({"Cache-Control": "max-age=60"})
+        transport = self.transport(origin)
+
+        first = get(transport)
+        second = get(transport)
+
+        assert len(origin.requests) == 1
+        assert first.extensions["from_cache"] is False
+        assert second.extensions["from_cache"] is True
+        assert second.status_code == 200
+        assert second.content == b"hello"
+
+    def test_uncacheable_response_is_not_stored(self):
+        origin = Origin({"Cache-Control": "no-store"})
+        transport = self.transport(origin)
+
+        get(transport)
+        response = get(transport)
+
+        assert len(origin.requests) == 2
+        assert response.extensions["from_cache"] is False
+        assert transport.cache.data == {}
+
+    def test_uncacheable_response_is_counted_once(self):
+        stats = CacheStats()
+        transport = self.transport(
+            Origin({"Cache-Control": "no-store"}), listeners=[stats]
+        )
+
+        get(transport)
+
+        assert stats.uncacheable_reasons == {"no-store": 1}
+
+    def test_etag_revalidation(self):
+        origin = Origin({"ETag": '"abc"'})
+        transport = self.transport(origin)
+        get(transport)
+
+        origin.status_code = 304
+        origin.content = b""
+        response = get(transport)
+
+        assert origin.requests[-1].headers["If-None-Match"] == '"abc"'
+        assert response.status_code == 200
+        assert response.content == b"hello"
+        assert response.extensions["from_cache"] is True
+
+    def test_encoded_body_is_cached_raw(self):
+        origin = Origin(
+            {"Cache-Control": "max-age=60", "Content-Encoding": "gzip"},
+            content=gzip.compress(b"hello"),
+        )
+        transport = self.transport(origin)
+
+        assert get(transport).content == b"hello"
+        response = get(transport)
+        assert response.extensions["from_cache"] is True
+        assert response.content == b"hello"
+
+    def test_heuristic(self):
+        origin = Origin()
+        transport = self.transport(origin, heuristic=ExpiresAfter(days=1))
+
+        assert "expires" in get(transport).headers
+        assert get(transport).extensions["from_cache"] is True
+        assert len(origin.requests) == 1
+
+    @pytest.mark.parametrize("method", ["PUT", "PATCH", "DELETE"])
+    def test_invalidating_methods(self, method):
+        origin = Origin({"Cache-Control": "max-age=60"})
+        transport = self.transport(origin)
+        get(transport)
+
+        get(transport, method=method)
+
+        assert transport.cache.data == {}
+
+
+class TestSharedCache:
+    """The transport and the requests adapter read each other's entries."""
+
+    def test_adapter_then_transport(self, url, tmp_path):
+        directory = os.fsdecode(tmp_path)
+        sess = CacheControl(requests.Session(), cache=FileCache(directory))
+        assert sess.get(url + "max_age").content
+
+        transport = AsyncCacheControlTransport(cache=AsyncFileCache(directory))
+        response = get(transport, url + "max_age")
+        assert response.extensions["from_cache"] is True
+        assert response.content == sess.get(url + "max_age").content
+
+    def test_transport_then_adapter(self, url, tmp_path):
+        directory = os.fsdecode(tmp_path)
+        transport = AsyncCacheControlTransport(cache=AsyncFileCache(directory))
+        content = get(transport, url + "max_age").content
+
+        sess = CacheControl(requests.Session(), cache=FileCache(directory))
+        response = sess.get(url + "max_age")
+        assert response.from_cache
+        assert response.content == content
@@ -2,14 +2,20 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import time
 from pprint import pprint
 from urllib.parse import urljoin
 
 import pytest
 import requests
 
-from cachecontrol import CacheControl
+from cachecontrol import CacheControl, CacheController
 from cachecontrol.cache import DictCache
+from cachecontrol.serialize import loads_vary_index
+
+from .utils import DummyRequest, DummyResponse
+
+TIME_FMT = "%a, %d %b %Y %H:%M:%S GMT"
 
 
 class TestVary:
@@ -55,9 +61,10 @@ class TestVary:
         in the Vary header are the same, it won't use the cached
         value.
         """
-        s = sess.adapters["http://"].controller.serializer
+        controller = sess.adapters["http://"].controller
+        s = controller.serializer
         r = sess.get(self.url)
-        c = s.loads(r.request, self.cache.get(self.url))
+        c = s.loads(r.request, self.cache.get(controller.entry_key(r.request)))
 
         # make sure we cached it
         assert self.cached_equal(c, r)
@@ -82,3 +89,111 @@ class TestVary:
         # whether or not to use the cached value.
         assert "vary" in r.headers
         assert len(r.headers["vary"].replace(" ", "").split(",")) == 2
+
+    def test_variants_do_not_overwrite_each_other(self, sess):
+        html = {"Accept": "text/html"}
+        plain = {"Accept": "text/plain"}
+
+        assert not sess.get(self.url, headers=html).from_cache
+        assert not sess.get(self.url, headers=plain).from_cache
+        assert sess.get(self.url, headers=html).from_cache
+        assert sess.get(self.url, headers=plain).from_cache
+
+        vary, variants = loads_vary_index(self.cache.get(self.url))
+        assert vary == ("accept", "accept-encoding")
+        assert len(variants) == 2
+
+
+class CountingCache(DictCache):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        return super().get(key)
+
+
+class TestVariants:
+    url = "http://example.com/"
+
+    def store(self, controller, headers, body=b"body"):
+        resp = DummyResponse(
+            200,
+            {
+                "Cache-Control": "max-age=60",
+                "Date": time.strftime(TIME_FMT, time.gmtime()),
+                "Vary": "Accept-Encoding",
+            },
+        )
+        controller.cache_response(DummyRequest(self.url, headers), resp, body)
+
+    def lookup(self, controller, headers):
+        cached = controller.cached_request(DummyRequest(self.url, headers))
+        return cached and cached.read()
+
+    def test_lookup_is_a_single_get(self):
+        controller = CacheController(CountingCache())
+        self.store(controller, {"Accept-Encoding": "gzip"})
+        controller.cache.gets = 0
+
+        assert self.lookup(controller, {"Accept-Encoding": "gzip"}) == b"body"
+        assert controller.cache.gets == 1
+
+    def test_shared_cache_reads_the_index(self):
+        cache = DictCache()
+        self.store(CacheController(cache), {"Accept-Encoding": "gzip"}, b"gzip")
+        self.store(CacheController(cache), {}, b"none")
+
+        controller = CacheController(cache)
+        assert self.lookup(controller, {"Accept-Encoding": "gzip"}) == b"gzip"
+        assert self.lookup(controller, {}) == b"none"
+        assert self.lookup(controller, {"Accept-Encoding": "br"}) is False
+
+    def test_header_values_are_normalized(self):
+        controller = CacheController()
+        self.store(controller, {"Accept-Encoding": "gzip,deflate"})
+        headers = {"Accept-Encoding": "gzip,  deflate"}
+        assert self.lookup(controller, headers) == b"body"
+
+    def test_delete_removes_every_variant(self):
+        controller = CacheController()
+        self.store(controller, {"Accept-Encoding": "gzip"})
+        self.store(controller, {"Accept-Encoding": "br"})
+        assert len(controller.cache.data) == 3
+
+        controller._cache_delete(controller.cache_url(self.url))
+        assert controller.cache.data == {}
+        assert self.lookup(controller, {"Accept-Encoding": "gzip"}) is False
+
+    def test_unvaried_response_replaces_the_index(self):
+        controller = CacheController()
+        self.store(controller, {"Accept-Encoding": "gzip"})
+        resp = DummyResponse(
+            200,
+            {
+                "Cache-Control": "max-age=60",
+                "Date": time.strftime(TIME_FMT, time.gmtime()),
+            },
+        )
+        controller.cache_response(DummyRequest(self.url, {}), resp, b"plain")
+
+        assert self.lookup(controller, {"Accept-Encoding": "gzip"}) == b"plain"
+        assert list(controller.cache.data) == [controller.cache_url(self.url)]
+
+    def test_variant_and_index_are_one_job(self):
+        jobs = []
+
+        class Writer:
+            def submit(self, job):
+                jobs.append(job)
+                return True
+
+        controller = CacheController(writer=Writer())
+        self.store(controller, {"Accept-Encoding": "gzip"})
+        assert len(jobs) == 1
+        assert controller.cache.data == {}
+
+        jobs[0]()
+        assert len(controller.cache.data) == 2
+        assert self.lookup(controller, {"Accept-Encoding": "gzip"}) == b"body"
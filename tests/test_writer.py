@@ -0,0 +1,130 @@
+# SPDX-FileCopyrightText: 2015 Eric Larson
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+import time
+
+import pytest
+from requests import Session
+
+from cachecontrol import CacheControl, CacheController
+from cachecontrol.cache import DictCache
+from cachecontrol.writer import BackgroundWriter
+
+from .utils import DummyRequest, DummyResponse
+
+TIME_FMT = "%a, %d %b %Y %H:%M:%S GMT"
+
+
+@pytest.fixture()
+def writer():
+    writer = BackgroundWriter(max_pending=1)
+    yield writer
+    writer.close()
+
+
+def stall(writer):
+    """Keep the writer thread busy until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def job():
+        started.set()
+        release.wait()
+
+    writer.submit(job)
+    started.wait()
+    return release
+
+
+class TestBackgroundWriter:
+    def test_flush_waits_for_writes(self, writer):
+        done = []
+        writer.submit(lambda: (time.sleep(0.05), done.append(True)))
+        writer.flush()
+        assert done == [True]
+        assert writer.written == 1
+
+    def test_drops_when_full(self, writer):
+        release = stall(writer)
+        assert writer.submit(lambda: None)
+        assert not writer.submit(lambda: None)
+        assert writer.dropped == 1
+        release.set()
+        writer.flush()
+        assert writer.written == 2
+
+    def test_failed_writes_are_counted(self, writer):
+        writer.submit(lambda: 1 / 0)
+        writer.flush()
+        assert writer.failed == 1
+
+    def test_writes_run_inline_after_close(self, writer):
+        writer.close()
+        done = []
+
+        assert writer.submit(lambda: done.append(1))
+        writer.flush()
+
+        assert done == [1]
+        assert writer.written == 1
+
+    def test_close_waits_for_queued_writes(self, writer):
+        release = stall(writer)
+        done = []
+        writer.submit(lambda: done.append(1))
+        release.set()
+
+        writer.close()
+
+        assert done == [1]
+
+
+class TestWriteBehindController:
+    url = "http://example.com/"
+
+    def store(self, controller):
+        resp = DummyResponse(
+            200,
+            {
+                "Cache-Control": "max-age=60",
+                "Date": time.strftime(TIME_FMT, time.gmtime()),
+            },
+        )
+        controller.cache_response(DummyRequest(self.url, {}), resp, b"body")
+
+    def test_store_is_deferred(self):
+        writer = BackgroundWriter()
+        controller = CacheController(DictCache(), writer=writer)
+        release = stall(writer)
+
+        self.store(controller)
+        assert controller.cache.data == {}
+
+        release.set()
+        writer.flush()
+        assert controller.cached_request(DummyRequest(self.url, {}))
+        writer.close()
+
+    def test_delete_wins_over_queued_write(self):
+        writer = BackgroundWriter()
+        controller = CacheController(DictCache(), writer=writer)
+        release = stall(writer)
+
+        self.store(controller)
+        controller._cache_delete(self.url)
+
+        release.set()
+        writer.flush()
+        assert controller.cache.data == {}
+        writer.close()
+
+
+def test_session_with_writer(url):
+    writer = BackgroundWriter()
+    sess = CacheControl(Session(), writer=writer)
+    sess.get(url)
+    writer.flush()
+    assert sess.get(url).from_cache
+    sess.close()
+    assert not writer._thread.is_alive()